@@ -0,0 +1,107 @@
+""" Bill of Materials Benchmark: Time the traversal and similarity functions across synthetic BoM scales
+
+Each scale is generated with 'j_prdctsim.synthetic.synthetic_bom' and compiled once. components, edges, sku_usage,
+leafcomponents_qp and ravisim are then timed on a fixed random sample of products (and of their leaf components for
+sku_usage) on a fresh compilation so memoized results of one function do not speed up another. Results are printed
+and recorded to JSON so runs can be compared for regressions.
+
+    python -m benchmarks.bench_bom [--scales small medium] [--sample 20] [--output bench_bom.json]
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import argparse
+import json
+import platform
+import time
+import numpy as np
+
+import j_prdctsim.bom
+import j_prdctsim.calc
+from j_prdctsim.compiled import CompiledBom
+from j_prdctsim.synthetic import synthetic_bom
+
+SCALES = {
+    "small": {"products": 100, "depth": 2, "sharing": 0.5},
+    "medium": {"products": 10000, "depth": 4, "sharing": 0.8, "skip": 0.05},
+    "large": {"products": 100000, "depth": 5, "sharing": 0.9, "skip": 0.05},
+    "xlarge": {"products": 1000000, "depth": 5, "sharing": 0.95, "skip": 0.05},
+}
+
+
+def fresh(bom):
+    """
+    Return a copy of a compiled BoM sharing its arrays but none of its caches
+    """
+    return CompiledBom(bom.skus, bom.offsets, bom.children, bom.qtys)
+
+
+def time_calls(function, calls):
+    """
+    Return the total and per call wall time in seconds of function over the inputted argument tuples
+    """
+    start = time.perf_counter()
+    for args in calls:
+        function(*args)
+    elapsed = time.perf_counter() - start
+
+    return {"seconds": elapsed, "per_call": elapsed / max(len(calls), 1), "calls": len(calls)}
+
+
+def run_scale(name, params, sample=20, seed=0):
+    """
+    Return the timings of every benchmarked function on one synthetic scale
+    """
+    start = time.perf_counter()
+    bom, product_skus = synthetic_bom(seed=seed, compiled=True, **params)
+    result = {"params": params, "skus": len(bom.skus), "lines": len(bom.children),
+              "generate_seconds": time.perf_counter() - start}
+
+    rng = np.random.default_rng(seed)
+    sample_skus = [str(sku) for sku in rng.choice(product_skus, min(sample, len(product_skus)), replace=False)]
+    leaves = [str(bom.skus[bom.leaf_vector(bom.code(sku))[0][0]]) for sku in sample_skus]
+    pairs = list(zip(sample_skus, sample_skus[1:] + sample_skus[:1]))
+
+    result["components"] = time_calls(j_prdctsim.bom.components, [(sku, fresh(bom)) for sku in sample_skus])
+    result["edges"] = time_calls(j_prdctsim.bom.edges, [(sku, fresh(bom)) for sku in sample_skus])
+    result["sku_usage"] = time_calls(j_prdctsim.bom.sku_usage, [(sku, fresh(bom)) for sku in leaves])
+
+    # Cold: every call explodes from scratch. Warm: calls share one compiled BoM and its caches
+    result["leafcomponents_qp_cold"] = time_calls(j_prdctsim.bom.leafcomponents_qp, [(sku, fresh(bom)) for sku in sample_skus])
+    warm = fresh(bom)
+    result["leafcomponents_qp_warm"] = time_calls(j_prdctsim.bom.leafcomponents_qp, [(sku, warm) for sku in sample_skus])
+    result["ravisim_cold"] = time_calls(j_prdctsim.calc.ravisim, [(sku1, sku2, fresh(bom)) for sku1, sku2 in pairs])
+    warm = fresh(bom)
+    result["ravisim_warm"] = time_calls(j_prdctsim.calc.ravisim, [(sku1, sku2, warm) for sku1, sku2 in pairs])
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", default=["small", "medium"], choices=list(SCALES))
+    parser.add_argument("--sample", type=int, default=20, help="Number of products timed per scale")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Path of a JSON file to record the results in")
+    args = parser.parse_args()
+
+    results = {"python": platform.python_version(), "numpy": np.__version__, "scales": {}}
+    for name in args.scales:
+        result = run_scale(name, SCALES[name], sample=args.sample, seed=args.seed)
+        results["scales"][name] = result
+        print("{name}: {skus} skus, {lines} lines generated in {seconds:.2f} s".format(
+            name=name, skus=result["skus"], lines=result["lines"], seconds=result["generate_seconds"]))
+        for key, timing in result.items():
+            if isinstance(timing, dict) and "per_call" in timing:
+                print("  {key:<24} {ms:10.3f} ms per call".format(key=key, ms=timing["per_call"] * 1000))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
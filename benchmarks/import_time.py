@@ -0,0 +1,64 @@
+""" Import Time Benchmark: Time importing the numeric modules of j_prdctsim in fresh interpreters
+
+The numeric path (components, leafcomponents_qp, ravisim) should only load numpy. This script imports each module
+in a new process, as a similarity worker would, and reports the median wall time and the heavy packages loaded.
+
+    python -m benchmarks.import_time [--repeat 5] [--output import_time.json]
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ["j_prdctsim.bom", "j_prdctsim.calc", "j_prdctsim.matrix", "j_prdctsim.render"]
+HEAVY = ["matplotlib", "networkx", "scipy", "pandas"]
+
+_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *sorted({{name.split('.')[0] for name in sys.modules}} & {heavy}))
+"""
+
+
+def time_import(module, repeat=5):
+    """
+    Return the median import time in seconds of the inputted module and the heavy packages it loads
+    """
+    times, loaded = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _SNIPPET.format(module=module, heavy=set(HEAVY))],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        loaded = out[1:]
+
+    return statistics.median(times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="Path of a JSON file to record the results in")
+    args = parser.parse_args()
+
+    results = {}
+    for module in MODULES:
+        seconds, loaded = time_import(module, args.repeat)
+        results[module] = {"seconds": seconds, "heavy_modules": loaded}
+        print("{module:<22} {ms:8.1f} ms  {loaded}".format(module=module, ms=seconds * 1000, loaded=" ".join(loaded)))
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
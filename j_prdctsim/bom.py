@@ -1,9 +1,13 @@
 """ Product Bill of Materials: Extract a product's component structure and by extension represent it visually
 
-This module deals with the structure of a product by extracting each layer of its components. Recursive functions are utilized 
-to traverse through the inputted Bill of Materials (BoM) and to extract the  component codes (sku) and the quantity needed per unit of product
+This module deals with the structure of a product by extracting each layer of its components. Iterative depth first
+traversals of the compiled BoM (see 'j_prdctsim.compiled') are utilized to traverse through the inputted Bill of Materials
+(BoM) and to extract the  component codes (sku) and the quantity needed per unit of product
 at each level (QtyPer).  Functions for generating tree images and pygraphiz GraphObjects utilize these DFS functions and are included in 
-this module.
+this module. matplotlib and networkx are imported on the first call to image so the numeric functions only need numpy.
+
+A numpy table passed as bom is compiled on its first use and later calls with the same table reuse the compiled form
+(see 'j_prdctsim.compiled.compile_bom'), so its memoized leaf explosions carry over between calls.
 
 Author: J Leon Batulayan <jleon.batulayan@gmail.com>
 
@@ -14,12 +18,9 @@ Created: 24th February, 2022
 import os
 from typing import Tuple
 import numpy as np
-import matplotlib.pyplot as plt
-import networkx as nx
 
-from matplotlib.pyplot import figure
-from networkx.drawing.nx_agraph import graphviz_layout
-from networkx.drawing.nx_pydot import graphviz_layout
+from j_prdctsim.compiled import CompiledBom, LeafVector, compile_bom, leaf_fingerprint
+from j_prdctsim.profiling import count
 
 
 def components(sku, bom):
@@ -30,7 +31,7 @@ def components(sku, bom):
     ---------
     sku : str or int
         The code of the item whose unique components we are extracting
-    bom : numpy.ndarray
+    bom : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data
 
     Returns
@@ -38,21 +39,13 @@ def components(sku, bom):
     out : list
         list of all sku component item codes
     """
+    bom = compile_bom(bom)
+    code = bom.code(sku)
+    if code < 0:
+        return []
 
-    sku = str(sku)
-    out = []
-    sku_table = bom[bom[:, 0] == sku]
-    sku_comp = sku_table[:, 1]
-    sku_comp = sku_comp[np.argsort(sku_comp)]
-
-    # Iterate over each SKU component
-    for comp in sku_comp:
-        comp = str(comp)
-        out.append(comp)
-        out = out + components(comp, bom)
-    out = list(dict.fromkeys(out))
-
-    return out
+    # Depth first in SKU order, each component listed the first time it is reached
+    return [str(bom.skus[comp]) for _, comp in bom.walk(code)]
 
 
 def leafcomponents(sku, bom):
@@ -82,7 +75,7 @@ def sku_usage(sku, bom):
     ---------
     sku : str or int
         The code of the item whose usage we are extracting
-    bom : numpy.ndarray
+    bom : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data
 
     Returns
@@ -90,27 +83,47 @@ def sku_usage(sku, bom):
     out : list
         list of all item codes that require the inputted sku
     """
-    sku = str(sku)
-    out = []
-    sku_table = bom[bom[:, 1] == sku]
-    sku_used = sku_table[:, 0]
-    sku_used = sku_used[np.argsort(sku_used)]
+    bom = compile_bom(bom)
+    code = bom.code(sku)
+    if code < 0:
+        return []
 
-    # Iterate over each SKU component
-    for comp in sku_used:
-        comp = str(comp)
-        out.append(comp)
-        out = out + sku_usage(comp, bom)
-    out = list(dict.fromkeys(out))
-
-    return out
+    # Depth first over the parents in SKU order, each item listed the first time it is reached
+    return [str(bom.skus[parent]) for _, parent in bom.walk(code, reverse=True)]
 
 
 def highestlevel_usage(sku, bom):
-    pass
+    """
+    Return a list of the top level items (finished goods) that require the inputted sku according to the inputted bom
+    If the inputted sku is not required by any item, it is its own highest level usage
 
+    Paramters
+    ---------
+    sku : str or int
+        The code of the item whose usage we are extracting
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data
 
-def leafcomponents_qp(sku, bom_qp, qty=1.0):
+    Returns
+    ---------
+    out : list
+        sorted list of the top level item codes that require the inputted sku
+    """
+    sku = str(sku)
+    bom = compile_bom(bom)
+    code = bom.code(sku)
+    if code < 0 or len(bom.parents_of(code)) == 0:
+        return [sku]
+
+    # Top level items are the ancestors that are not a component of anything
+    ancestors = bom.ancestor_set(code)
+    roffsets = bom.reverse_index()[0]
+    top = ancestors[roffsets[ancestors + 1] == roffsets[ancestors]]
+
+    return [str(item) for item in bom.skus[top]]
+
+
+def leafcomponents_qp(sku, bom_qp, qty=1.0, as_vector=False):
     """
     Returns the lowest level of components and their respective QtyPer for the inputted sku  based on input qty and the inputted bom
     If the inputted sku does not exist or is a leaf component, it returns the output with the sku as itself and qty as the inputted
@@ -118,71 +131,120 @@ def leafcomponents_qp(sku, bom_qp, qty=1.0):
     ---------
     sku : str or int
         The code of the item whose lowest level of components we are extracting
-    bom_qp : numpy.ndarray
+    bom_qp : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data and their respective quantity pers
     qty : number, default 1.0
         the quantity of the item we are accounting for
+    as_vector : bool, default False
+        Return a LeafVector of integer leaf codes and quantities instead of the dx2 ndarray. LeafVector.to_array
+        converts it to the dx2 ndarray
 
     Returns
     ---------
-    out : numpy.ndarray
+    out : numpy.ndarray or LeafVector
         dx2 ndarray of leaf component codes in the first column and their respective QtyPers (rounded to 3 decimal places) 
         in the second for d leaf components
     """
     sku = str(sku)
     qty = float(qty)
-    assert bom_qp.shape[1] >= 3, "The Bill of Materials has insufficient dimensions. Please format as [[Parent, Component, QtyPer]]"
-
-    # Recursively acquire leaf components and respective QtyPers
-    init_out = leaf_components_recursive_helper(sku, bom_qp, qty)
-    init_out[:, 1] = init_out[:, 1].astype(np.float64)
-
-    # Aggregate Sum Group By Leaf SKUs
-    leaves = np.unique(init_out[:, 0])
-    out = np.empty((len(leaves), 2), dtype=object)
-    for i in range(len(leaves)):
-        leaf = leaves[i]
-        leaf_qtys = init_out[init_out[:, 0] == leaf][:, 1]
-        sum = np.around(np.sum(leaf_qtys, axis=0), 6)
-        out[i] = np.array([leaf, sum], dtype=object)
+    if not isinstance(bom_qp, CompiledBom):
+        assert bom_qp.shape[1] >= 3, "The Bill of Materials has insufficient dimensions. Please format as [[Parent, Component, QtyPer]]"
+    bom_qp = compile_bom(bom_qp)
+
+    # Explode the sku once per shared subassembly and scale by the inputted qty
+    code = bom_qp.code(sku)
+    count("explosions")
+    if code < 0:  # Not in the BoM : treated as a leaf
+        out = LeafVector(np.zeros(1, dtype=np.int32), np.around(np.array([qty]), 6), np.array([sku]))
+    else:
+        out = LeafVector(*bom_qp.rounded_leaf_vector(code, qty), bom_qp.skus)
+    if as_vector:
+        return out
 
     # Sort by increasing QtyPer
-    out = out[np.argsort(out[:, -1])]
+    return out.to_array()
 
-    return out
 
+def fingerprint(sku, bom, names=False, qtys=True, ordered=True):
+    """
+    Return the Merkle fingerprint of the inputted sku as a hex string, hashed bottom up over the (component, QtyPer)
+    lines of its tree. Items with equal fingerprints have identical leaf components and QtyPers
 
-def leaf_components_recursive_helper(sku: str, bom: np.ndarray, qty=1.0):
+    Paramters
+    ---------
+    sku : str or int
+        The code of the item we are fingerprinting
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    names : bool, default False
+        Include the SKU code of every item of the tree, not only of its leaf components
+    qtys : bool, default True
+        Include the QtyPers
+    ordered : bool, default True
+        Include the order of the lines of every item, as the explosions summed in that order do
+
+    Returns
+    ---------
+    out : str
+        32 character hex digest
     """
-    Recursive helper function for leaf_components
-    returns the lowest level of components for the input sku and the QtyPer
+    sku = str(sku)
+    bom = compile_bom(bom)
+    code = bom.code(sku)
+    if code < 0:  # Not in the BoM : fingerprinted as a leaf
+        out = leaf_fingerprint([sku])[0]
+    else:
+        out = bom.fingerprints([code], names=names, qtys=qtys, ordered=ordered)[0]
+
+    return "{0:016x}{1:016x}".format(*out.tolist())
+
+
+def duplicate_products(bom, skus=None):
     """
-    sku_table = bom[bom[:, 0] == sku]  # Subset of BoM with sku as the parent
-    total_comp = np.empty((0, 2), dtype=object)
+    Return the groups of items with identical leaf components and QtyPers, found by their fingerprints. The order of
+    the lines of an item does not matter, so only one item of each group needs to be compared
 
-    if len(sku_table) == 0:  # Terminate : sku is a leaf
-        total_comp = np.append(total_comp, [[sku, qty]], axis=0)
+    Paramters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the items to group. All top level products when None
+
+    Returns
+    ---------
+    out : list
+        sorted lists of the item codes of every group of two or more identical items
+    """
+    bom = compile_bom(bom)
+    if skus is None:
+        roffsets = bom.reverse_index()[0]
+        codes = np.flatnonzero((np.diff(roffsets) == 0) & (np.diff(bom.offsets) > 0))
     else:
-        # Components and respective QtypPers for given sku
-        sku_comp = sku_table[:, [1, 2]]
-        for comp, qty_per in sku_comp:
-            comp_leaves = leaf_components_recursive_helper(
-                str(comp), bom, float(qty_per)*qty)
-            total_comp = np.append(total_comp, comp_leaves, axis=0)
+        codes = np.unique([bom.code(str(sku)) for sku in skus])
+        codes = codes[codes >= 0]  # Items that are not in the BoM are only identical to themselves
+    if len(codes) == 0:
+        return []
 
-    return total_comp
+    hashes, inverse, counts = np.unique(bom.fingerprints(codes, ordered=False), axis=0, return_inverse=True,
+                                        return_counts=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    groups = np.split(codes[order], np.cumsum(counts)[:-1])
+
+    return sorted([str(sku) for sku in bom.skus[group]] for group in groups if len(group) > 1)
 
 
 def edges(sku, bom):
     """
-    Recursuively acquire all edges from Bill of Materials tree. Returns a list of edges represented by
+    Acquire all edges from Bill of Materials tree. Returns a list of edges represented by
     each vertix making up the edge in a tuple according to the inputted bom
 
     Paramters
     ---------
     sku : str or int
         The code of the item whose Bill of Material tree edges we are extracting
-    bom : numpy.ndarray
+    bom : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data and their respective quantity pers
 
     Returns
@@ -199,20 +261,13 @@ def edges(sku, bom):
 
     This BoM tree rooted at P001 will return edges [(P001, L1), (P001, L2), (P001, L3)] 
     """
-    sku = str(sku)
-    tree_edges = []
-    sku_table = bom[bom[:, 0] == sku]
-    sku_comp = sku_table[:, 1]
-    sku_comp = sku_comp[np.argsort(sku_comp)]
+    bom = compile_bom(bom)
+    code = bom.code(sku)
+    if code < 0:
+        return []
 
-    # Iterate over each SKU component
-    for comp in sku_comp:
-        comp = str(comp)
-        temp_edge = (sku, comp)
-        tree_edges.append(temp_edge)
-        tree_edges = tree_edges + edges(comp, bom)
-
-    return tree_edges
+    # Every path is followed so a shared subassembly contributes its edges once per use
+    return [(str(bom.skus[p]), str(bom.skus[c])) for p, c in bom.walk(code, unique=False)]
 
 
 def image(sku, bom, name=None, save_path=None, img_type='jpeg', verbose=1):
@@ -224,7 +279,7 @@ def image(sku, bom, name=None, save_path=None, img_type='jpeg', verbose=1):
     ---------
     sku : str or int
         The code of the item which the returned Bill of Materials tree is rooted on
-    bom : numpy.ndarray
+    bom : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data and their respective quantity pers
     name : str, default None
         Name image is to be saved as  
@@ -240,6 +295,12 @@ def image(sku, bom, name=None, save_path=None, img_type='jpeg', verbose=1):
     None
 
     """
+    # The plotting stack is only loaded once an image is drawn
+    import matplotlib.pyplot as plt
+    import networkx as nx
+    from matplotlib.pyplot import figure
+    from networkx.drawing.nx_pydot import graphviz_layout
+
     sku = str(sku)
     G = nx.DiGraph()
     G.add_node(sku)  # Root
@@ -272,7 +333,6 @@ def image(sku, bom, name=None, save_path=None, img_type='jpeg', verbose=1):
     else:
         fig_path = os.path.join(save_path, fig_name)
 
-    print(fig_path)
     plt.savefig(fig_path)
     plt.close()
     if verbose == 1:
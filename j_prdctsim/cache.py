@@ -0,0 +1,186 @@
+""" Explosion Cache: Keep leaf explosions on disk between runs
+
+Batch jobs run many times against a Bill of Materials (BoM) that rarely changes, and every run explodes every
+product again. An ExplosionCache stores the rounded leaf explosion of each item in a directory, keyed by the Merkle
+fingerprint of the item's subtree and the rounding. An item keeps its key while nothing below it changes, so after
+a BoM edit only the items above the edited lines are exploded again. Entries are small binary files:
+
+    8 byte magic, number of leaves and width of the names (uint64), the UTF-8 leaf SKU codes padded to the width,
+    float64 quantities
+
+so an entry is read back into numpy arrays without parsing.
+
+Writers create each entry under a temporary name and rename it into place, so concurrent readers see a complete
+entry or none. Reading an entry marks it as recently used, and once the directory grows past max_bytes the least
+recently used entries are evicted under an exclusive lock file.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+from contextlib import contextmanager
+import os
+import struct
+import threading
+import numpy as np
+
+from j_prdctsim.profiling import count
+
+try:
+    import fcntl
+except ImportError:  # Windows, where eviction runs without the lock
+    fcntl = None
+
+ENTRY_MAGIC = b"JPRDLEAF"
+ENTRY_SUFFIX = ".leaves"
+LOCK_NAME = ".lock"
+
+
+class ExplosionCache:
+    """
+    Directory of leaf explosions keyed by subtree fingerprint, shared by every process on a machine
+
+    Parameters
+    ---------
+    path : str
+        Directory of the cache, created when missing
+    max_bytes : int, default 1073741824
+        Size the entries are evicted down to, least recently used first. Unbounded when None
+    """
+
+    def __init__(self, path, max_bytes=1 << 30):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return "ExplosionCache(path={path!r}, max_bytes={max_bytes})".format(path=self.path, max_bytes=self.max_bytes)
+
+    def keys(self, bom, codes, decimals=6):
+        """
+        Return the key of the explosion of every code of the inputted compiled BoM rounded to decimals
+        """
+        rounding = "raw" if decimals is None else str(int(decimals))
+        return ["{high:016x}{low:016x}_{rounding}".format(high=high, low=low, rounding=rounding)
+                for high, low in bom.fingerprints(codes).tolist()]
+
+    def get(self, key):
+        """
+        Return the (UTF-8 encoded leaf skus, quantities) stored under key, or None
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:  # Missing or evicted meanwhile
+            count("explosion_cache_misses")
+            return None
+        try:
+            os.utime(path)  # Most recently used
+        except OSError:  # Read only cache, or evicted since it was read
+            pass
+        out = _decode(data)
+        count("explosion_cache_hits" if out is not None else "explosion_cache_misses")
+
+        return out
+
+    def put(self, key, leaf_skus, qtys):
+        """
+        Store the leaf explosion (leaf skus as str or UTF-8 encoded, quantities) under key. Does not evict, see
+        evict
+        """
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = "{path}.{pid}.{thread}.tmp".format(path=path, pid=os.getpid(), thread=threading.get_ident())
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(_encode(leaf_skus, qtys))
+            os.replace(temp_path, path)
+        except BaseException:  # Disk full or interrupted, evict only sees complete entries
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is at most max_bytes. Returns the number removed
+        """
+        if self.max_bytes is None:
+            return 0
+        with self._lock():
+            entries = []
+            for shard in os.scandir(self.path):
+                if shard.is_dir():
+                    for entry in os.scandir(shard.path):
+                        if entry.name.endswith(ENTRY_SUFFIX):
+                            try:
+                                stat = entry.stat()
+                            except OSError:
+                                continue
+                            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            size = sum(entry[1] for entry in entries)
+            removed = 0
+            for mtime, entry_size, path in sorted(entries):
+                if size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                size -= entry_size
+                removed += 1
+        count("explosion_cache_evictions", removed)
+
+        return removed
+
+    def clear(self):
+        """
+        Remove every entry
+        """
+        with self._lock():
+            for shard in os.scandir(self.path):
+                if shard.is_dir():
+                    for entry in os.scandir(shard.path):
+                        os.remove(entry.path)
+                    os.rmdir(shard.path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key[:2], key + ENTRY_SUFFIX)
+
+    @contextmanager
+    def _lock(self):
+        with open(os.path.join(self.path, LOCK_NAME), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _encode(leaf_skus, qtys):
+    names = np.asarray(leaf_skus)
+    if names.dtype.kind != "S":
+        names = np.char.encode(names.astype(str), "utf-8")
+    return ENTRY_MAGIC + struct.pack("<QQ", len(qtys), names.dtype.itemsize) + names.tobytes() + \
+        np.ascontiguousarray(qtys, dtype="<f8").tobytes()
+
+
+def _decode(data):
+    """
+    Return the (leaf skus, quantities) of an encoded entry, or None if it is not one
+    """
+    header = len(ENTRY_MAGIC) + 16
+    if len(data) < header or data[:len(ENTRY_MAGIC)] != ENTRY_MAGIC:
+        return None
+    n, width = struct.unpack("<QQ", data[len(ENTRY_MAGIC):header])
+    if len(data) != header + n * (width + 8) or (n and not width):
+        return None
+
+    return (np.frombuffer(data, dtype="S{width}".format(width=max(width, 1)), count=n, offset=header),
+            np.frombuffer(data, dtype="<f8", count=n, offset=header + n * width))
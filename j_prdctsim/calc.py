@@ -2,6 +2,9 @@
 
 Given two product codes return a similarity proportion by calculating the overlap. A scaling function is also included
 
+A numpy table passed as bom is compiled on its first use and later calls with the same table reuse the compiled form
+(see 'j_prdctsim.compiled.compile_bom'), so its memoized explosions and similarities carry over between calls.
+
 Author: J Leon Batulayan <jleon.batulayan@gmail.com>
 
 Created: 24th February, 2022
@@ -9,10 +12,12 @@ Created: 24th February, 2022
 """
 
 # imports
+from contextlib import contextmanager
 import numpy as np
-import pandas as pd
 
 from j_prdctsim.bom import leafcomponents_qp
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.profiling import count, phase
 
 def ravisim(sku1, sku2, bom, verbose=0):
     """
@@ -25,7 +30,7 @@ def ravisim(sku1, sku2, bom, verbose=0):
         Code of first item to compare
     sku2 : str or int
         Code of second item to compare
-    bom : numpy.ndarray
+    bom : numpy.ndarray or CompiledBom
         Bill of Materials - The table contining the parent component data and their respective quantity pers
     verbose : {0, 1, 2}, default 0
         verbosity of function
@@ -43,25 +48,360 @@ def ravisim(sku1, sku2, bom, verbose=0):
     # Trivial Case       
     if sku1 == sku2 : return float(1.0)                     
 
+    # Previously calculated proportions are kept on the compiled bom
+    bom = compile_bom(bom)
+    code1, code2 = bom.code(sku1), bom.code(sku2)
+    cacheable = code1 >= 0 and code2 >= 0
+    if cacheable and verbose != 2:
+        cached = bom.cached_similarity(code1, code2)
+        if cached is not None: return cached
+
     # Get Leaf Components and qtypers of each sku
-    leaves1 = leafcomponents_qp(sku1, bom)    
-    leaves2 = leafcomponents_qp(sku2, bom)
+    with phase("explosion"):
+        leaves1 = leafcomponents_qp(sku1, bom, as_vector=True)
+        # Items with the same fingerprint have the same leaf components
+        if cacheable and bom.identical(code1, code2):
+            leaves2 = leaves1
+        else:
+            leaves2 = leafcomponents_qp(sku2, bom, as_vector=True)
 
     # Calculate the Overlapping Material
-    overlap_mat = np.intersect1d(leaves1[:,0], leaves2[:,0])
-    overlap = 0
-    for mat in overlap_mat:
-        qty1 = leaves1[leaves1[:,0]==mat][0][1]
-        qty2 = leaves2[leaves2[:,0]==mat][0][1]
-        overlap += np.minimum(qty1, qty2)
-
-    # Calculate the output (overlap/totalqty -> proportion)
-    total = (np.sum(leaves1[:,1], axis=0) + np.sum(leaves2[:,1], axis=0)) - overlap
-    proportion = float(np.around(overlap/total, 2))
+    with phase("overlap"):
+        overlap = leaves1.min_sum(leaves2)
+
+        # Calculate the output (overlap/totalqty -> proportion)
+        total = (leaves1.total() + leaves2.total()) - overlap
+        proportion = float(np.around(overlap/total, 2))
+    count("pairs_scored")
     if verbose == 2: verbose_printer(overlap, total, round(proportion*100), proportion)
+    if cacheable: bom.cache_similarity(code1, code2, proportion)
+
+    return proportion
+
+def ravisim_matrix(skus, bom, block_size=256, workers=None):
+    """
+    Return the ravisim similarity proportion between every pair of the inputted skus. Rows are compared in blocks
+    against sparse leaf vectors so no pair is exploded or masked individually. Values match ravisim exactly
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to compare
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    block_size : int, default 256
+        Number of rows compared at once, bounding the memory of each block
+    workers : int, default None
+        Number of processes comparing row blocks in parallel. Blocks are compared in this process when None
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        len(skus) x len(skus) array where out[i, j] is ravisim(skus[i], skus[j], bom)
+    """
+    from j_prdctsim.matrix import leaf_matrix, row_totals  # scipy is only loaded by the batch functions
+
+    skus = [str(sku).strip("['']") for sku in skus]
+    blocks = [(start, min(start + block_size, len(skus))) for start in range(0, len(skus), block_size)]
+    count("pairs_scored", len(skus) ** 2)
+    if workers is None:
+        total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+        args = (total, total.tocsc(), row_totals(total), row_skus)
+        out = [ravisim_block(*args, start, stop) for start, stop in blocks]
+    else:
+        with shared_pool(bom, workers, skus=skus, columns=True) as pool:
+            out = list(pool.map(shared_block, *zip(*blocks))) if blocks else []
+
+    return np.concatenate(out) if out else np.empty((0, 0))
+
+
+def ravisim_pairs(skus1, skus2, bom, workers=None, chunksize=100000):
+    """
+    Return the ravisim similarity proportion of many pairs of items at once. Each distinct item is exploded once.
+    Values match ravisim exactly
+
+    Parameters
+    ---------
+    skus1 : list-like
+        Code of the first item of each pair
+    skus2 : list-like
+        Code of the second item of each pair
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    workers : int, default None
+        Number of processes scoring chunks of pairs in parallel from a shared_pool. Pairs are scored in this
+        process when None
+    chunksize : int, default 100000
+        Number of pairs per task sent to the workers
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        out[i] is ravisim(skus1[i], skus2[i], bom)
+    """
+    from j_prdctsim.matrix import leaf_matrix, row_totals
+
+    skus1 = np.array([str(sku).strip("['']") for sku in skus1])
+    skus2 = np.array([str(sku).strip("['']") for sku in skus2])
+    skus, inverse = np.unique(np.concatenate([skus1, skus2]), return_inverse=True)
+    if workers is not None:
+        chunks = range(0, len(skus1), chunksize)
+        with shared_pool(bom, workers, skus=skus) as pool:
+            out = list(pool.map(shared_ravisim, [skus1[i:i + chunksize] for i in chunks],
+                                [skus2[i:i + chunksize] for i in chunks]))
+        return np.concatenate(out) if out else np.empty(0)
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+
+    return ravisim_rows(total, row_totals(total), inverse[:len(skus1)], inverse[len(skus1):])
+
+
+def ravisim_lookup(skus1, skus2, bom, total, totals, rows):
+    """
+    Return the ravisim similarity proportion of many pairs of items, reading the items already exploded in a leaf
+    requirement matrix from it and exploding the others together. Values match ravisim exactly
+
+    Parameters
+    ---------
+    skus1 : list-like
+        Code of the first item of each pair
+    skus2 : list-like
+        Code of the second item of each pair
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    total : scipy.sparse.csr_matrix
+        Leaf requirement matrix rounded to 6 decimals, as returned by leaf_matrix(bom, decimals=6)
+    totals : numpy.ndarray
+        Row sums of total, as returned by row_totals
+    rows : dict
+        sku -> row of total
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        out[i] is ravisim(skus1[i], skus2[i], bom)
+    """
+    skus1 = [str(sku).strip("['']") for sku in skus1]
+    skus2 = [str(sku).strip("['']") for sku in skus2]
+    rows1 = np.array([rows.get(sku, -1) for sku in skus1], dtype=np.int64)
+    rows2 = np.array([rows.get(sku, -1) for sku in skus2], dtype=np.int64)
+    found = (rows1 >= 0) & (rows2 >= 0)
+
+    out = np.empty(len(skus1), dtype=np.float64)
+    out[found] = ravisim_rows(total, totals, rows1[found], rows2[found])
+    others = np.flatnonzero(~found)
+    if len(others):
+        out[others] = ravisim_pairs([skus1[i] for i in others], [skus2[i] for i in others], bom)
+
+    return out
+
+
+def ravisim_profile(sku1, sku2, bom, depth=3, weights=None):
+    """
+    Return the ravisim similarity proportion of two items at every depth of their Bill of Materials trees and a
+    weighted combination of them. See ravisim_profile_pairs
+
+    Parameters
+    ---------
+    sku1 : str
+        Code of the first item
+    sku2 : str
+        Code of the second item
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    depth : int, default 3
+        Number of depths compared before the leaves
+    weights : list-like, default None
+        Weight of each of the depth + 1 proportions. Equal weights when None
+
+    Returns
+    ---------
+    profile : numpy.ndarray
+        depth + 1 proportions, the direct components first and the leaves last
+    combined : float
+        Weighted mean of the defined proportions of profile rounded to 2 decimals
+    """
+    profiles, combined = ravisim_profile_pairs([sku1], [sku2], bom, depth=depth, weights=weights)
+
+    return profiles[0], float(combined[0])
+
+
+def ravisim_profile_pairs(skus1, skus2, bom, depth=3, weights=None):
+    """
+    Return the ravisim similarity proportion of many pairs of items at every depth of their Bill of Materials trees
+    and a weighted combination of them. Depth d compares the items d lines below each item, so two products built
+    from the same subassemblies score high at depth 1 even when their leaves differ. All depths and the leaves come
+    from one explosion of each distinct item
+
+    Parameters
+    ---------
+    skus1 : list-like
+        Code of the first item of each pair
+    skus2 : list-like
+        Code of the second item of each pair
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    depth : int, default 3
+        Number of depths compared before the leaves
+    weights : list-like, default None
+        Weight of each of the depth + 1 proportions. Equal weights when None
+
+    Returns
+    ---------
+    profiles : numpy.ndarray
+        len(skus1) x (depth + 1). profiles[i, d] is the proportion of the items d + 1 lines below both items of pair
+        i, and profiles[i, depth] is ravisim(skus1[i], skus2[i], bom). nan when neither item reaches depth d + 1,
+        even when both items are the same
+    combined : numpy.ndarray
+        Weighted mean of the defined proportions of each row of profiles rounded to 2 decimals
+    """
+    from j_prdctsim.matrix import level_matrices, row_totals
+
+    weights = np.ones(depth + 1) if weights is None else np.asarray(weights, dtype=np.float64)
+    if weights.shape != (depth + 1,):
+        raise ValueError("weights has {n} values for {depth} depths and the leaves".format(n=weights.size, depth=depth))
+    skus1 = np.array([str(sku).strip("['']") for sku in skus1])
+    skus2 = np.array([str(sku).strip("['']") for sku in skus2])
+    skus, inverse = np.unique(np.concatenate([skus1, skus2]), return_inverse=True)
+    levels, leaves, row_skus, leaf_skus = level_matrices(bom, skus=skus, depth=depth, decimals=6)
+    rows1, rows2 = inverse[:len(skus1)], inverse[len(skus1):]
+
+    profiles = np.empty((len(skus1), depth + 1), dtype=np.float64)
+    with np.errstate(invalid="ignore"):  # Depths neither item reaches are 0 / 0
+        for d, total in enumerate(levels + [leaves]):
+            profiles[:, d] = ravisim_rows(total, row_totals(total), rows1, rows2)
+            reached = np.diff(total.indptr) > 0
+            profiles[~reached[rows1] & ~reached[rows2], d] = np.nan  # Including identical items
+
+    defined = ~np.isnan(profiles)
+    combined = np.around(np.where(defined, profiles, 0) @ weights / (defined @ weights), 2)
+
+    return profiles, combined
+
+
+def ravisim_rows(total, totals, rows1, rows2):
+    """
+    Return the ravisim proportions between pairs of rows of a leaf requirement matrix with row sums totals
+    """
+    from j_prdctsim.matrix import overlap_pairs
+
+    count("pairs_scored", len(rows1))
+    with phase("overlap"):
+        overlap = overlap_pairs(total, rows1, rows2)
+    union = (totals[rows1] + totals[rows2]) - overlap
+    proportion = np.around(overlap / union, 2)
+
+    # Trivial Case
+    proportion[rows1 == rows2] = 1.0
+
+    return proportion
+
+
+def ravisim_block(total, total_csc, totals, row_skus, start, stop, col_start=0):
+    """
+    Return the ravisim proportions between rows start:stop of a leaf requirement matrix and every row of total_csc,
+    the matrix or its rows from col_start on in compressed sparse column form
+    """
+    from j_prdctsim.matrix import overlap_block
+
+    col_stop = col_start + total_csc.shape[0]
+    with phase("overlap"):
+        overlap = overlap_block(total, total_csc, start, stop)
+    union = (totals[start:stop, None] + totals[None, col_start:col_stop]) - overlap
+    proportion = np.around(overlap / union, 2)
+
+    # Trivial Case
+    proportion[row_skus[start:stop, None] == row_skus[None, col_start:col_stop]] = 1.0
 
     return proportion
 
+
+@contextmanager
+def shared_pool(bom, workers, skus=None, columns=False):
+    """
+    Yield a concurrent.futures.ProcessPoolExecutor whose workers attach one copy of the compiled Bill of Materials
+    and of the leaf requirement matrix of skus from shared memory instead of unpickling or exploding their own. The
+    matrix is computed once in this process and the blocks are removed when the pool shuts down. Submit
+    shared_ravisim or shared_block to it. Requires Python 3.8
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    workers : int
+        Number of worker processes
+    skus : list-like, default None
+        Codes of the items in the shared matrix. All top level products when None
+    columns : bool, default False
+        Also share the matrix in compressed sparse column form, which shared_block needs
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from j_prdctsim.fileio import leaf_matrix_arrays, share_arrays, share_bom
+    from j_prdctsim.matrix import leaf_matrix, row_totals
+
+    bom = compile_bom(bom)
+    if skus is None and bom.leaf_matrix_cache is not None:
+        matrix = bom.leaf_matrix_cache
+    else:
+        matrix = leaf_matrix(bom, skus=skus, decimals=6)
+    total = matrix[0]
+    arrays = {"totals": row_totals(total)}
+    if skus is not None:  # Only the matrix of all top level products belongs in the BoM's leaf_matrix_cache
+        arrays.update(leaf_matrix_arrays(matrix))
+    if columns:
+        total_csc = total.tocsc()
+        arrays.update({"indptr": total_csc.indptr, "indices": total_csc.indices, "data": total_csc.data})
+
+    memories = [share_bom(bom, leaf_matrix=matrix if skus is None else None),
+                share_arrays(arrays, {"shape": list(total.shape)})]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_shared_worker,
+                                 initargs=tuple(memory.name for memory in memories)) as pool:
+            yield pool
+    finally:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+
+def shared_ravisim(skus1, skus2):
+    """
+    Return the ravisim proportion of many pairs of items in a shared_pool worker. Items outside of the shared
+    matrix are exploded by the worker
+    """
+    bom, total, total_csc, totals, row_skus, rows, memory = _shared
+    return ravisim_lookup(skus1, skus2, bom, total, totals, rows)
+
+
+def shared_block(start, stop):
+    """
+    Return the ravisim proportions between rows start:stop and every row of the shared matrix in a shared_pool
+    worker started with columns=True
+    """
+    bom, total, total_csc, totals, row_skus, rows, memory = _shared
+    return ravisim_block(total, total_csc, totals, row_skus, start, stop)
+
+
+_shared = None
+
+
+def _init_shared_worker(bom_name, arrays_name):
+    global _shared
+    import scipy.sparse as sp
+    from j_prdctsim.fileio import attach_arrays, attach_bom, leaf_matrix_view
+
+    bom = attach_bom(bom_name)
+    memory, meta, arrays = attach_arrays(arrays_name)
+    total, row_skus, leaf_skus = leaf_matrix_view(arrays) if "leaf_indptr" in arrays else bom.leaf_matrix_cache
+    total_csc = None
+    if "indptr" in arrays:
+        total_csc = sp.csc_matrix(tuple(meta["shape"]), dtype=arrays["data"].dtype)
+        total_csc.data, total_csc.indices, total_csc.indptr = arrays["data"], arrays["indices"], arrays["indptr"]
+        total_csc.has_sorted_indices = True
+    rows = {sku: row for row, sku in enumerate(row_skus.tolist())}
+    # memory stays open while its arrays are used
+    _shared = (bom, total, total_csc, arrays["totals"], row_skus, rows, memory)
+
+
 def verbose_printer(overlap, total, percent, proportion):
     print(" ")
     print(f" Overlap Qty:  {overlap}")
@@ -0,0 +1,277 @@
+""" Command Line: The j_prdctsim console script for batch jobs
+
+Scoring a large list of product pairs used to mean a hand written loop around 'j_prdctsim.calc.ravisim'. The
+similarity command streams a pairs CSV in chunks and scores them in a pool of worker processes sharing one loaded
+Bill of Materials (BoM). Every product is exploded once, and the workers read the pairs of every chunk from those
+explosions in shared memory. Scores are appended to the output CSV in input order as chunks complete. Only a bounded
+number of chunks is in flight, so memory does not grow with the number of pairs, and an interrupted job restarted
+with --resume skips the pairs already in the output. The matrix command writes the similarity matrix of a whole
+catalog to disk with 'j_prdctsim.tiles' and resumes when rerun. With --cache, leaf explosions are kept on disk with
+'j_prdctsim.cache' so later runs against an unchanged BoM skip them.
+
+    j_prdctsim similarity --bom bom.csv --pairs pairs.csv --out scores.csv --workers 8 [--resume]
+    j_prdctsim matrix --bom bom.csv --out ravisim_matrix/ --workers 8 [--threshold 0.5] [--cache explosions/]
+    j_prdctsim serve --bom bom.csv --port 8765
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import argparse
+from collections import deque
+import csv
+import itertools
+import os
+import sys
+
+from j_prdctsim.calc import ravisim_lookup, ravisim_pairs, shared_pool, shared_ravisim
+
+OUTPUT_HEADER = ["sku1", "sku2", "proportion"]
+
+
+def read_pairs(path, chunksize=100000, header=True, skip=0):
+    """
+    Yield the pairs of a two column CSV as (skus1, skus2) lists of at most chunksize pairs
+
+    Parameters
+    ---------
+    path : str
+        Path to the pairs CSV, the first two columns are the codes of the items to compare
+    chunksize : int, default 100000
+        Number of pairs per chunk
+    header : bool, default True
+        The first row of the file is a header
+    skip : int, default 0
+        Number of pairs to skip, for example the ones already scored
+
+    Raises
+    ---------
+    ValueError
+        If a row has fewer than two columns, naming its line
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        rows = ((reader.line_num, row) for row in reader if row)
+        rows = itertools.islice(rows, int(header) + skip, None)
+        while True:
+            chunk = list(itertools.islice(rows, chunksize))
+            if not chunk:
+                return
+            for line, row in chunk:
+                if len(row) < 2:
+                    raise ValueError("{path} line {line}: expected two SKU codes, got {row}".format(
+                        path=path, line=line, row=",".join(row)))
+            yield [row[0] for line, row in chunk], [row[1] for line, row in chunk]
+
+
+def read_skus(path, header=True):
+    """
+    Return the codes in the first column of a CSV
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        rows = [row[0] for row in csv.reader(f) if row]
+
+    return rows[int(header):]
+
+
+def scored_pairs(path):
+    """
+    Return the number of pairs already written to an output CSV, cutting off a row left incomplete by an interruption
+    """
+    if not os.path.exists(path):
+        return 0
+    lines, end = 0, 0
+    with open(path, "rb+") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            newlines = block.count(b"\n")
+            if newlines:
+                lines += newlines
+                end = f.tell() - len(block) + block.rfind(b"\n") + 1
+        f.truncate(end)
+
+    return max(lines - 1, 0)
+
+
+def similarity(bom, pairs_path, out_path, workers=1, chunksize=100000, header=True, resume=False, catalog=True,
+               verbose=1):
+    """
+    Write the ravisim proportion of every pair of a pairs CSV to an output CSV with columns sku1, sku2, proportion
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    pairs_path : str
+        Path to the pairs CSV
+    out_path : str
+        Path to the output CSV
+    workers : int, default 1
+        Number of scoring processes. Chunks are scored in this process when 1
+    chunksize : int, default 100000
+        Number of pairs scored at once
+    header : bool, default True
+        The first row of the pairs CSV is a header
+    resume : bool, default False
+        Keep the pairs already in the output and score the rest. The output is overwritten when False
+    catalog : bool, default True
+        Explode every top level product once, shared by the workers, and read pairs of products from those
+        explosions instead of exploding the items of every chunk
+    verbose : 0, 1, default 1
+        verbosity of function
+
+    Returns
+    ---------
+    out : int
+        Number of pairs scored by this call
+    """
+    from j_prdctsim.compiled import compile_bom
+
+    bom = compile_bom(bom)
+    done = scored_pairs(out_path) if resume else 0
+    chunks = read_pairs(pairs_path, chunksize=chunksize, header=header, skip=done)
+    if verbose == 1 and done:
+        print("Resuming after {n} scored pairs".format(n=done), file=sys.stderr)
+
+    scored = 0
+    with open(out_path, "a" if resume else "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(OUTPUT_HEADER)
+        for skus1, skus2, proportions in _score_chunks(chunks, bom, workers, catalog):
+            writer.writerows(zip(skus1, skus2, proportions.tolist()))
+            f.flush()  # Every written chunk is complete, so an interrupted job resumes after it
+            scored += len(skus1)
+            if verbose == 1:
+                print("Scored {n} pairs".format(n=done + scored), file=sys.stderr)
+
+    return scored
+
+
+def _score_chunks(chunks, bom, workers, catalog=True):
+    """
+    Yield (skus1, skus2, proportions) of every chunk in order, keeping at most 2 x workers chunks in flight
+    """
+    if workers <= 1:
+        _init_score_worker(bom, catalog)
+        for skus1, skus2 in chunks:
+            yield skus1, skus2, _score_worker(skus1, skus2)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Workers attach one shared catalog instead of exploding every product each
+    if catalog:
+        pool, worker = shared_pool(bom, workers), shared_ravisim
+    else:
+        pool, worker = ProcessPoolExecutor(max_workers=workers, initializer=_init_score_worker,
+                                           initargs=(bom, catalog)), _score_worker
+    with pool as pool:
+        pending = deque()
+        for skus1, skus2 in chunks:
+            pending.append((skus1, skus2, pool.submit(worker, skus1, skus2)))
+            if len(pending) >= 2 * workers:
+                skus1, skus2, future = pending.popleft()
+                yield skus1, skus2, future.result()
+        while pending:
+            skus1, skus2, future = pending.popleft()
+            yield skus1, skus2, future.result()
+
+
+def product_catalog(bom):
+    """
+    Return the rounded leaf requirement matrix of every top level product, its row sums and sku -> row
+    """
+    from j_prdctsim.matrix import leaf_matrix, row_totals
+
+    total, row_skus, leaf_skus = leaf_matrix(bom, decimals=6)
+    return total, row_totals(total), {sku: row for row, sku in enumerate(row_skus.tolist())}
+
+
+_score_bom = None
+_score_catalog = None
+
+
+def _init_score_worker(bom, catalog):
+    global _score_bom, _score_catalog
+    _score_bom = bom
+    _score_catalog = product_catalog(bom) if catalog else None
+
+
+def _score_worker(skus1, skus2):
+    if _score_catalog is None:
+        return ravisim_pairs(skus1, skus2, _score_bom)
+    return ravisim_lookup(skus1, skus2, _score_bom, *_score_catalog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="j_prdctsim", description="Product similarity from Bills of Materials")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    command = commands.add_parser("similarity", help="Score the ravisim proportion of every pair of a CSV")
+    command.add_argument("--bom", required=True, help="[[Parent, Component, QtyPer]] CSV or a file written by save_bom")
+    command.add_argument("--pairs", required=True, help="CSV whose first two columns are the pairs to compare")
+    command.add_argument("--out", required=True, help="CSV the sku1, sku2, proportion rows are written to")
+    command.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    command.add_argument("--chunksize", type=int, default=100000)
+    command.add_argument("--no-header", dest="header", action="store_false", help="The pairs CSV has no header row")
+    command.add_argument("--resume", action="store_true", help="Continue an interrupted job instead of restarting it")
+    command.add_argument("--no-catalog", dest="catalog", action="store_false",
+                         help="Explode the items of every chunk instead of every product once, for short jobs")
+    command.add_argument("--cache", default=None, help="Directory keeping leaf explosions between runs")
+    command.add_argument("--quiet", action="store_true")
+
+    command = commands.add_parser("matrix", help="Write the ravisim matrix of a list of products to disk in tiles")
+    command.add_argument("--bom", required=True, help="[[Parent, Component, QtyPer]] CSV or a file written by save_bom")
+    command.add_argument("--skus", default=None,
+                         help="CSV whose first column lists the products. All top level products by default")
+    command.add_argument("--out", required=True, help="Directory the matrix is written to, rerun to resume")
+    command.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    command.add_argument("--tile-size", type=int, default=4096)
+    command.add_argument("--threshold", type=float, default=None, help="Only keep proportions at or above it, sparsely")
+    command.add_argument("--no-header", dest="header", action="store_false", help="The skus CSV has no header row")
+    command.add_argument("--cache", default=None, help="Directory keeping leaf explosions between runs")
+    command.add_argument("--quiet", action="store_true")
+
+    command = commands.add_parser("serve", help="Serve similarity requests over HTTP")
+    command.add_argument("--bom", required=True, help="[[Parent, Component, QtyPer]] CSV or a file written by save_bom")
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args(argv)
+    from j_prdctsim.fileio import open_bom
+
+    bom = open_bom(args.bom)
+    if getattr(args, "cache", None) is not None:
+        from j_prdctsim.cache import ExplosionCache
+
+        bom.explosion_cache = ExplosionCache(args.cache)
+    if args.command == "similarity":
+        try:
+            similarity(bom, args.pairs, args.out, workers=args.workers, chunksize=args.chunksize,
+                       header=args.header, resume=args.resume, catalog=args.catalog, verbose=0 if args.quiet else 1)
+        except ValueError as error:  # A malformed pairs file, the pairs scored before it are kept for --resume
+            print("j_prdctsim: error: {error}".format(error=error), file=sys.stderr)
+            return 1
+    elif args.command == "matrix":
+        from j_prdctsim.matrix import products
+        from j_prdctsim.tiles import ravisim_tiles
+
+        if args.skus is None:
+            skus = bom.skus[products(bom)].tolist()
+        else:
+            skus = read_skus(args.skus, header=args.header)
+        ravisim_tiles(skus, bom, args.out, tile_size=args.tile_size, threshold=args.threshold,
+                      workers=args.workers if args.workers > 1 else None, verbose=0 if args.quiet else 1)
+    else:
+        from j_prdctsim.server import serve
+
+        serve(bom, args.host, args.port)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
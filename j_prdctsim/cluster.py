@@ -0,0 +1,352 @@
+""" Product Clustering: Group products into families from a sparse ravisim similarity graph
+
+Clustering a catalog from its dense pairwise ravisim matrix stops scaling at a few thousand products. The functions
+in this module work on a similarity graph that only holds the pairs at or above a threshold, as a scipy sparse
+matrix. similarity_graph builds it from the Bill of Materials (BoM) one tile at a time, and the sparse output of
+'j_prdctsim.tiles' can be used as well (see as_graph). Three clusterings are provided:
+
+    connected_components    products linked by a chain of pairs at or above a cutoff (single linkage)
+    average_linkage         agglomerative clustering merging the pair of clusters with the highest average
+                            similarity until it falls below a cutoff. Pairs missing from the graph count as 0
+    medoid_clusters         greedy star clustering: the best connected unassigned product becomes a medoid and
+                            takes every unassigned product at or above the cutoff from it
+
+Clusters are returned as compact arrays: an int32 label per product, numbered in order of their first product, and
+the int32 row of a representative (medoid) product per cluster.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import heapq
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components as _components
+
+from j_prdctsim.calc import ravisim_block
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.matrix import leaf_matrix, row_totals
+
+
+def similarity_graph(skus, bom, threshold=0.5, block_size=1024):
+    """
+    Return the ravisim similarity proportions at or above threshold between the inputted skus as a sparse graph.
+    Pairs are compared in tiles of block_size x block_size, so the dense matrix is never built. Since ravisim(x, y)
+    <= min(total x, total y) / max(total x, total y), rows are compared in order of their total leaf quantity and
+    the tiles of products too different in size to reach threshold are skipped
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to compare
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    threshold : float, default 0.5
+        Smallest proportion kept. Must be above 0
+    block_size : int, default 1024
+        Number of rows and columns of each tile
+
+    Returns
+    ---------
+    graph : scipy.sparse.csr_matrix
+        Symmetric float64 matrix of the proportions between different items, without the diagonal
+    row_skus : numpy.ndarray
+        SKU code of each row
+    """
+    assert threshold > 0, "threshold must be above 0, the graph of a 0 threshold is the dense matrix"
+    bom = compile_bom(bom)
+    skus = [str(sku).strip("['']") for sku in skus]
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+    order = np.argsort(row_totals(total), kind="stable")
+    total = total[order]
+    totals = row_totals(total)
+    n = len(row_skus)
+
+    rows, cols, values = [], [], []
+    for col_start in range(0, n, block_size):
+        col_stop = min(col_start + block_size, n)
+        block_csc = total[col_start:col_stop].tocsc()
+        # Tiles on and above the diagonal, from the diagonal towards the smallest totals
+        for start in range(col_start, -1, -block_size):
+            stop = min(start + block_size, n)
+            if totals[stop - 1] < (threshold - 0.01) * totals[col_start]:  # Rounded proportions stay below threshold
+                break
+            proportion = ravisim_block(total, block_csc, totals, row_skus[order], start, stop, col_start)
+            tile_rows, tile_cols = np.nonzero(proportion >= threshold)
+            tile_rows, tile_cols = tile_rows + start, tile_cols + col_start
+            upper = tile_rows < tile_cols
+            rows.append(order[tile_rows[upper]])
+            cols.append(order[tile_cols[upper]])
+            values.append(proportion[tile_rows[upper] - start, tile_cols[upper] - col_start])
+
+    rows, cols, values = (np.concatenate(array) if array else np.empty(0, dtype=dtype)
+                          for array, dtype in ((rows, np.int64), (cols, np.int64), (values, np.float64)))
+    graph = sp.coo_matrix((np.concatenate([values, values]),
+                           (np.concatenate([rows, cols]), np.concatenate([cols, rows]))), shape=(n, n)).tocsr()
+
+    return graph, row_skus
+
+
+def as_graph(matrix, threshold=None, block_size=4096):
+    """
+    Return a similarity graph from a matrix of proportions: the dense output of ravisim_matrix or the sparse or
+    memory mapped output of j_prdctsim.tiles.read_tiles (uint8 hundredths). Dense matrices are read in blocks of
+    rows
+
+    Parameters
+    ---------
+    matrix : numpy.ndarray or scipy.sparse matrix
+        Square matrix of proportions
+    threshold : float, default None
+        Smallest proportion kept. Every nonzero proportion when None
+    block_size : int, default 4096
+        Number of rows of a dense matrix read at once
+
+    Returns
+    ---------
+    out : scipy.sparse.csr_matrix
+        Symmetric float64 matrix of the proportions between different items, without the diagonal
+    """
+    from j_prdctsim.tiles import UNDEFINED
+
+    if sp.issparse(matrix):
+        blocks = [(0, sp.coo_matrix(matrix))]
+    else:
+        blocks = ((start, sp.coo_matrix(np.asarray(matrix[start:start + block_size])))
+                  for start in range(0, matrix.shape[0], block_size))
+
+    rows, cols, values = [], [], []
+    for start, block in blocks:
+        block_values = block.data.astype(np.float64)
+        keep = (block.row + start != block.col) & (block_values > 0)
+        if matrix.dtype == np.uint8:
+            keep &= block.data != UNDEFINED
+            block_values = block_values / 100
+        if threshold is not None:
+            keep &= block_values >= threshold
+        rows.append(block.row[keep] + start)
+        cols.append(block.col[keep])
+        values.append(block_values[keep])
+
+    return sp.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))), shape=matrix.shape)
+
+
+def connected_components(graph, threshold=None):
+    """
+    Return the cluster label of every product: products are in the same cluster when a chain of pairs at or above
+    threshold links them (single linkage)
+
+    Parameters
+    ---------
+    graph : scipy.sparse matrix
+        Symmetric similarity graph, see similarity_graph
+    threshold : float, default None
+        Smallest proportion linking two products. Every pair of the graph when None
+
+    Returns
+    ---------
+    labels : numpy.ndarray
+        int32 cluster of each row, numbered in order of their first row
+    """
+    graph = sp.csr_matrix(graph)
+    if threshold is not None:
+        graph = sp.csr_matrix(graph.multiply(graph >= threshold))
+    labels = _components(graph, directed=False)[1]
+
+    return _compact(labels)
+
+
+def average_linkage(graph, threshold):
+    """
+    Return the cluster label of every product from agglomerative clustering: the two clusters with the highest
+    average similarity between their products are merged until that average is below threshold. Pairs missing
+    from the graph count as 0, so only the clusters linked by the graph are ever compared
+
+    Parameters
+    ---------
+    graph : scipy.sparse matrix
+        Symmetric similarity graph, see similarity_graph
+    threshold : float
+        Smallest average similarity of two clusters that are merged
+
+    Returns
+    ---------
+    labels : numpy.ndarray
+        int32 cluster of each row, numbered in order of their first row
+    """
+    graph = sp.coo_matrix(graph)
+    n = graph.shape[0]
+    upper = graph.row < graph.col
+    size = [1] * n
+    parent = list(range(n))
+    links = [dict() for _ in range(n)]  # cluster -> {neighbour cluster: sum of the similarities between them}
+    for i, j, value in zip(graph.row[upper].tolist(), graph.col[upper].tolist(), graph.data[upper].tolist()):
+        links[i][j] = links[i].get(j, 0.0) + value
+        links[j][i] = links[j].get(i, 0.0) + value
+
+    heap = [(-value / (size[i] * size[j]), i, j) for i in range(n) for j, value in links[i].items() if i < j]
+    heapq.heapify(heap)
+    while heap:
+        average, i, j = heapq.heappop(heap)
+        if -average < threshold:
+            break
+        # Entries of merged clusters or of changed averages are stale
+        if parent[i] != i or parent[j] != j or j not in links[i] or links[i][j] / (size[i] * size[j]) != -average:
+            continue
+
+        # The larger cluster absorbs the smaller one
+        keep, drop = (i, j) if (size[i], j) >= (size[j], i) else (j, i)
+        parent[drop] = keep
+        size[keep] += size[drop]
+        del links[keep][drop]
+        for other, value in links[drop].items():
+            if other == keep:
+                continue
+            del links[other][drop]
+            links[keep][other] = links[keep].get(other, 0.0) + value
+            links[other][keep] = links[keep][other]
+        links[drop] = {}
+        for other, value in links[keep].items():
+            heapq.heappush(heap, (-value / (size[keep] * size[other]), min(keep, other), max(keep, other)))
+
+    roots = np.array(parent, dtype=np.int64)
+    while True:  # Follow every row up to the root of its cluster
+        above = roots[roots]
+        if np.array_equal(above, roots):
+            break
+        roots = above
+
+    return _compact(roots)
+
+
+def medoid_clusters(graph, threshold=None):
+    """
+    Return the cluster label of every product and the medoid of every cluster from greedy star clustering. The
+    unassigned product with the highest total similarity to the other unassigned products at or above threshold
+    becomes a medoid, and those products join its cluster. Every product is at or above threshold from its medoid
+
+    Parameters
+    ---------
+    graph : scipy.sparse matrix
+        Symmetric similarity graph, see similarity_graph
+    threshold : float, default None
+        Smallest proportion between a product and its medoid. Every pair of the graph when None
+
+    Returns
+    ---------
+    labels : numpy.ndarray
+        int32 cluster of each row, numbered in order of their first row
+    medoids : numpy.ndarray
+        int32 row of the medoid of each cluster
+    """
+    graph = sp.csr_matrix(graph)
+    if threshold is not None:
+        graph = sp.csr_matrix(graph.multiply(graph >= threshold))
+    graph.eliminate_zeros()
+    n = graph.shape[0]
+    strength = np.asarray(graph.sum(axis=1)).reshape(-1)
+    assigned = np.full(n, -1, dtype=np.int64)
+
+    # The total similarity of a candidate only counts unassigned products, so candidates are rescored lazily
+    heap = [(-value, row) for row, value in enumerate(strength.tolist())]
+    heapq.heapify(heap)
+    while heap:
+        score, row = heapq.heappop(heap)
+        if assigned[row] >= 0:
+            continue
+        start, end = graph.indptr[row], graph.indptr[row + 1]
+        neighbours = graph.indices[start:end]
+        free = assigned[neighbours] < 0
+        current = float(graph.data[start:end][free].sum())
+        if current < -score:
+            heapq.heappush(heap, (-current, row))
+            continue
+        assigned[row] = row
+        assigned[neighbours[free]] = row
+
+    labels = _compact(assigned)
+    medoids = np.empty(labels.max() + 1 if n else 0, dtype=np.int32)
+    medoids[labels[assigned == np.arange(n)]] = np.flatnonzero(assigned == np.arange(n))
+
+    return labels, medoids
+
+
+def representatives(graph, labels):
+    """
+    Return the medoid of every cluster: the product with the highest total similarity to the other products of its
+    cluster, the first of them on ties
+
+    Parameters
+    ---------
+    graph : scipy.sparse matrix
+        Symmetric similarity graph, see similarity_graph
+    labels : numpy.ndarray
+        Cluster of each row, numbered from 0
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        int32 row of the representative of each cluster
+    """
+    graph = sp.coo_matrix(graph)
+    labels = np.asarray(labels)
+    n = len(labels)
+    within = labels[graph.row] == labels[graph.col]
+    score = np.bincount(graph.row[within], weights=graph.data[within], minlength=n)
+    order = np.lexsort((np.arange(n), -score, labels))
+    first = np.flatnonzero(np.diff(np.concatenate([[-1], labels[order]])))
+
+    return order[first].astype(np.int32)
+
+
+def cluster_products(skus, bom, threshold=0.5, method="average", block_size=1024):
+    """
+    Cluster products into families by ravisim similarity
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the products to cluster
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    threshold : float, default 0.5
+        Similarity cutoff of the clustering
+    method : 'components', 'average', 'medoid', default 'average'
+        connected_components, average_linkage or medoid_clusters
+    block_size : int, default 1024
+        Number of rows and columns of each tile of the similarity graph
+
+    Returns
+    ---------
+    labels : numpy.ndarray
+        int32 cluster of each product
+    representatives : numpy.ndarray
+        int32 position in skus of the medoid of each cluster
+    row_skus : numpy.ndarray
+        SKU code of each product
+    """
+    graph, row_skus = similarity_graph(skus, bom, threshold=threshold, block_size=block_size)
+    if method == "components":
+        labels = connected_components(graph)
+    elif method == "average":
+        labels = average_linkage(graph, threshold)
+    elif method == "medoid":
+        labels, medoids = medoid_clusters(graph)
+        return labels, medoids, row_skus
+    else:
+        raise ValueError("Unknown clustering method {method}".format(method=method))
+
+    return labels, representatives(graph, labels), row_skus
+
+
+def _compact(roots):
+    """
+    Return int32 labels numbered in order of the first row of each group of equal roots
+    """
+    unique, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+    rank = np.empty(len(unique), dtype=np.int32)
+    rank[np.argsort(first)] = np.arange(len(unique), dtype=np.int32)
+
+    return rank[inverse.reshape(-1)]
@@ -0,0 +1,1008 @@
+""" Compiled Bill of Materials: Index a BoM table once for fast repeated traversal
+
+The functions in 'j_prdctsim.bom' traverse the Bill of Materials (BoM) one parent at a time. Scanning the whole
+[[Parent, Component, QtyPer]] table for every step makes a single explosion cost O(nodes x rows). This module
+compiles the table once into integer SKU codes and CSR style (compressed sparse row) parent -> children offsets
+so that each child lookup is a slice costing O(fan-out).
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+from collections import OrderedDict
+import hashlib
+import threading
+import numpy as np
+
+from j_prdctsim.profiling import count, enabled, phase
+
+
+class BomCycleError(ValueError):
+    """
+    Raised when a Bill of Materials traversal reaches an item that (indirectly) requires itself
+
+    Parameters
+    ---------
+    cycle : list-like
+        SKU codes along the cycle from parent to component, starting and ending with the same SKU
+    """
+
+    def __init__(self, cycle):
+        self.cycle = [str(sku) for sku in cycle]
+        super().__init__("The Bill of Materials contains a cycle: {path}".format(path=" -> ".join(self.cycle)))
+
+
+class CompiledBom:
+    """
+    Integer coded, CSR indexed Bill of Materials. SKU codes are sorted so code i is the i-th SKU in lexical order
+
+    Parameters
+    ---------
+    skus : numpy.ndarray
+        Sorted unique SKU codes; the integer code of an item is its position in this array
+    offsets : numpy.ndarray
+        int64 array of length len(skus) + 1. The children of code i are children[offsets[i]:offsets[i+1]]
+    children : numpy.ndarray
+        int32 component codes grouped by parent, in Bill of Materials row order
+    qtys : numpy.ndarray
+        float64 QtyPer of each entry in children
+
+    Use CompiledBom.from_array (or compile_bom) to build one from a [[Parent, Component, QtyPer]] table.
+    Traversals are iterative, so the depth of a BoM is not bounded by the recursion limit, and raise BomCycleError
+    naming the cycle when an item (indirectly) requires itself. low_level_codes levelizes the BoM for bottom up
+    explosions.
+    Leaf explosions and usage (ancestor) sets are memoized per code in least recently used caches bounded by
+    leaf_cache_size entries.
+    ravisim proportions between compiled codes are memoized in similarity_cache, bounded by similarity_cache_size.
+    apply_changes edits the BoM in place and only invalidates the cached results of the affected items.
+    fingerprints hashes every item bottom up (Merkle style) over its ordered (component, QtyPer) lines, so items
+    with equal fingerprints have identical leaf explosions, or with ordered=False over the lines in any order.
+    leaf_matrix_cache optionally holds the rounded (matrix, row_skus, leaf_skus) of all top level products, as
+    returned by j_prdctsim.matrix.leaf_matrix(bom, decimals=6), and explosion_cache optionally a
+    j_prdctsim.cache.ExplosionCache that leaf_matrix reads rows from and stores them to
+    """
+
+    leaf_cache_size = 65536
+    similarity_cache_size = 1000000
+
+    def __init__(self, skus, offsets, children, qtys):
+        self.skus = skus
+        self.offsets = offsets
+        self.children = children
+        self.qtys = qtys
+        self._reverse = None
+        self._leaf_cache = OrderedDict()
+        self._ancestor_cache = OrderedDict()
+        self._content_hash = None
+        self.similarity_cache = OrderedDict()
+        self.leaf_matrix_cache = None
+        self.explosion_cache = None
+        self._levels = None
+        self._fingerprints = {}
+        self._buffer = None  # Shared memory block the arrays are views of, see j_prdctsim.fileio.attach_bom
+
+    @classmethod
+    def from_array(cls, bom):
+        """
+        Compile a [[Parent, Component, QtyPer]] table. A table without a QtyPer column is compiled with QtyPers of 1
+
+        Parameters
+        ---------
+        bom : numpy.ndarray
+            Bill of Materials - The table contining the parent component data and their respective quantity pers
+
+        Returns
+        ---------
+        out : CompiledBom
+        """
+        bom = np.asarray(bom)
+        assert bom.ndim == 2 and bom.shape[1] >= 2, \
+            "The Bill of Materials has insufficient dimensions. Please format as [[Parent, Component, QtyPer]]"
+        if bom.shape[1] >= 3:
+            qtys = bom[:, 2].astype(np.float64)
+        else:
+            qtys = np.ones(len(bom), dtype=np.float64)
+
+        skus, codes = np.unique(np.concatenate([bom[:, 0].astype(str), bom[:, 1].astype(str)]), return_inverse=True)
+        codes = codes.astype(np.int32)
+        return cls.from_edges(skus, codes[:len(bom)], codes[len(bom):], qtys)
+
+    @classmethod
+    def from_edges(cls, skus, parents, components, qtys):
+        """
+        Build the CSR index from integer coded edges
+
+        Parameters
+        ---------
+        skus : numpy.ndarray
+            Sorted unique SKU codes
+        parents : numpy.ndarray
+            Parent code of each BoM line
+        components : numpy.ndarray
+            Component code of each BoM line
+        qtys : numpy.ndarray
+            QtyPer of each BoM line
+
+        Returns
+        ---------
+        out : CompiledBom
+        """
+        # A stable sort keeps each parent's children in Bill of Materials row order
+        order = np.argsort(parents, kind="stable")
+        counts = np.bincount(parents, minlength=len(skus))
+        offsets = np.zeros(len(skus) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        children = np.asarray(components, dtype=np.int32)[order]
+        qtys = np.asarray(qtys, dtype=np.float64)[order]
+
+        return cls(skus, offsets, children, qtys)
+
+    def __len__(self):
+        return len(self.skus)
+
+    def __repr__(self):
+        return "CompiledBom(skus={n}, lines={e})".format(n=len(self.skus), e=len(self.children))
+
+    def content_hash(self):
+        """
+        Return a hex digest of the SKU codes, structure and QtyPers of the Bill of Materials
+        """
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for array in (self.skus, self.offsets, self.children, self.qtys):
+                array = np.ascontiguousarray(array)
+                digest.update("{dtype}{shape}".format(dtype=array.dtype.str, shape=array.shape).encode())
+                digest.update(array.view(np.uint8))
+            self._content_hash = digest.hexdigest()
+
+        return self._content_hash
+
+    def code(self, sku):
+        """
+        Return the integer code of the inputted sku or -1 if it is not in the Bill of Materials
+        """
+        sku = str(sku)
+        i = int(np.searchsorted(self.skus, sku))
+        if i < len(self.skus) and self.skus[i] == sku:
+            return i
+        return -1
+
+    def children_of(self, code):
+        """
+        Return the component codes and respective QtyPers of the inputted code as array views
+        """
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return self.children[start:end], self.qtys[start:end]
+
+    def parents_of(self, code):
+        """
+        Return the codes of the items that directly require the inputted code, one entry per BoM line
+        """
+        roffsets, rparents = self.reverse_index()
+        return rparents[roffsets[code]:roffsets[code + 1]]
+
+    def is_leaf(self, code):
+        """
+        Return True if the inputted code has no components
+        """
+        return self.offsets[code] == self.offsets[code + 1]
+
+    def parent_codes(self):
+        """
+        Return the parent code of every entry of children (the CSR row index expanded per line)
+        """
+        return np.repeat(np.arange(len(self.skus), dtype=np.int32), np.diff(self.offsets))
+
+    def reverse_index(self):
+        """
+        Return the component -> parents CSR index (offsets, parent codes), building it on first use
+        """
+        if self._reverse is None:
+            parents = self.parent_codes()
+            order = np.argsort(self.children, kind="stable")
+            counts = np.bincount(self.children, minlength=len(self.skus))
+            roffsets = np.zeros(len(self.skus) + 1, dtype=np.int64)
+            np.cumsum(counts, out=roffsets[1:])
+            self._reverse = (roffsets, parents[order])
+
+        return self._reverse
+
+    def lines_of(self, codes):
+        """
+        Return the positions in children of the BoM lines of every inputted code, grouped by code
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        starts = self.offsets[codes]
+        counts = self.offsets[codes + 1] - starts
+        return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+
+    def low_level_codes(self):
+        """
+        Return the low level code of every item: the length of the longest path from a top level item down to it.
+        Every component has a larger low level code than all of its parents, so exploding the levels from the
+        deepest up reaches each item after all of its components. Computed once and reused
+
+        Returns
+        ---------
+        out : numpy.ndarray
+            int32 low level code of each SKU code
+
+        Raises
+        ---------
+        BomCycleError
+            If the Bill of Materials contains a cycle
+        """
+        if self._levels is None:
+            with phase("levelize"):
+                self._levels = self._levelize()
+
+        return self._levels
+
+    def _levelize(self, within=None):
+        """
+        Kahn's algorithm over the whole BoM, or over the lines between the items of the within mask, one level of
+        items at a time
+        """
+        n = len(self.skus)
+        if within is None:
+            items = n
+            indegree = np.bincount(self.children, minlength=n)
+            frontier = np.flatnonzero(indegree == 0)
+        else:
+            nodes = np.flatnonzero(within)
+            items = len(nodes)
+            below = self.children[self.lines_of(nodes)]
+            indegree = np.bincount(below[within[below]], minlength=n)
+            frontier = nodes[indegree[nodes] == 0]
+        levels = np.zeros(n, dtype=np.int32)
+        level, done = 0, 0
+
+        # An item joins the frontier once every line using it has been visited
+        while len(frontier):
+            levels[frontier] = level
+            done += len(frontier)
+            below = self.children[self.lines_of(frontier)]
+            if within is not None:
+                below = below[within[below]]
+            indegree -= np.bincount(below, minlength=n)
+            frontier = np.unique(below[indegree[below] == 0])
+            level += 1
+
+        if done < items:
+            raise self._cycle_error(indegree > 0)
+        return levels
+
+    def _cycle_error(self, unvisited):
+        """
+        Return a BomCycleError naming a cycle among the unvisited items of low_level_codes. Each of them has an
+        unvisited parent, so following those parents upwards must come back to an item already seen
+        """
+        node = int(np.flatnonzero(unvisited)[0])
+        seen = {}
+        while node not in seen:
+            seen[node] = len(seen)
+            parents = self.parents_of(node)
+            node = int(parents[unvisited[parents]][0])
+        cycle = list(seen)[seen[node]:][::-1]
+
+        return BomCycleError(self.skus[cycle + cycle[:1]])
+
+    def walk(self, code, reverse=False, unique=True):
+        """
+        Iterate depth first over the items below (or above) the inputted code without recursion
+
+        Parameters
+        ---------
+        code : int
+            Integer code of the item to start from
+        reverse : bool, default False
+            Walk up to the items requiring code instead of down to its components
+        unique : bool, default True
+            Visit every item once. When False every path is followed, so a shared subassembly is walked once per use
+
+        Yields
+        ---------
+        out : tuple of int
+            (item, neighbour) codes of each step in depth first order, neighbours in SKU order
+
+        Raises
+        ---------
+        BomCycleError
+            If a cycle is reached
+        """
+        neighbours = self.parents_of if reverse else (lambda item: self.children_of(item)[0])
+        path, on_path, visited = [code], {code}, {code}
+        stack = [iter(np.sort(neighbours(code)))]
+        steps, lines = 0, len(neighbours(code))
+
+        try:
+            while stack:
+                item = next(stack[-1], None)
+                if item is None:  # Every neighbour of the end of the path is done
+                    stack.pop()
+                    on_path.discard(path.pop())
+                    continue
+                if item in on_path:
+                    cycle = path[path.index(item):] + [item]
+                    raise BomCycleError(self.skus[cycle[::-1] if reverse else cycle])
+                if unique and item in visited:
+                    continue
+
+                visited.add(item)
+                steps += 1
+                yield path[-1], item
+                path.append(item)
+                on_path.add(item)
+                below = neighbours(item)
+                lines += len(below)
+                stack.append(iter(np.sort(below)))
+        finally:
+            if enabled():
+                count("nodes_visited", steps)
+                count("lines_scanned", lines)
+
+    def _memoized(self, code, cache, needs, combine, reverse=False, name="leaf"):
+        """
+        Evaluate combine(item, values) for code after every item it needs, without recursion. values maps the code of
+        each needed item to its result. Results are kept in the inputted least recently used cache, whose hits and
+        misses are counted as name_cache_hits and name_cache_misses
+        """
+        cached = cache.get(code)
+        if cached is not None:
+            cache.move_to_end(code)
+            return cached
+
+        computed = {}
+        path, on_path = [code], {code}
+        stack = [iter(needs(code))]
+        hits, lines = 0, len(needs(code))
+
+        while stack:
+            item = next(stack[-1], None)
+            if item is None:  # Everything the end of the path needs is computed
+                stack.pop()
+                current = path.pop()
+                on_path.discard(current)
+                computed[current] = combine(current, computed)
+                cache[current] = computed[current]
+                if len(cache) > self.leaf_cache_size:
+                    cache.popitem(last=False)
+                continue
+
+            item = int(item)
+            if item in computed:
+                continue
+            if item in cache:
+                computed[item] = cache[item]
+                hits += 1
+                continue
+            if item in on_path:
+                cycle = path[path.index(item):] + [item]
+                raise BomCycleError(self.skus[cycle[::-1] if reverse else cycle])
+
+            path.append(item)
+            on_path.add(item)
+            below = needs(item)
+            lines += len(below)
+            stack.append(iter(below))
+
+        if enabled():
+            count(name + "_cache_hits", hits)
+            count(name + "_cache_misses", len(computed) - hits)
+            count("nodes_visited", len(computed) - hits)
+            count("lines_scanned", lines)
+        return computed[code]
+
+    def leaf_vector(self, code):
+        """
+        Return the leaf requirements for one unit of the inputted code. Each node is exploded once and its
+        vector is reused (scaled by QtyPer) by every parent sharing it. Calls passing the same numpy table share the
+        cache through compile_bom
+
+        Parameters
+        ---------
+        code : int
+            Integer code of the item whose lowest level of components we are extracting
+
+        Returns
+        ---------
+        out : tuple of numpy.ndarray
+            (leaf codes in increasing order, respective quantities per unit of code)
+        """
+        cached = self._leaf_cache.get(code)
+        if cached is not None:
+            self._leaf_cache.move_to_end(code)
+            if enabled():
+                count("leaf_cache_hits")
+            return cached
+
+        return self._memoized(code, self._leaf_cache, lambda item: self.children_of(item)[0], self._merge_leaves)
+
+    def _merge_leaves(self, code, values):
+        """
+        Combine the leaf vectors of the components of code into the leaf vector of code
+        """
+        comps, qty_pers = self.children_of(code)
+        if len(comps) == 0:  # code is a leaf
+            return np.array([code], dtype=np.int32), np.ones(1, dtype=np.float64)
+
+        vectors = [values[comp] for comp in comps]
+        leaf_codes = np.concatenate([vector[0] for vector in vectors])
+        leaf_qtys = np.concatenate([vector[1] * qty_per for vector, qty_per in zip(vectors, qty_pers)])
+
+        # Aggregate Sum Group By Leaf codes
+        leaves, inverse = np.unique(leaf_codes, return_inverse=True)
+        return leaves.astype(np.int32), np.bincount(inverse, weights=leaf_qtys, minlength=len(leaves))
+
+    def rounded_leaf_vector(self, code, qty=1.0, decimals=6):
+        """
+        Return the leaf requirements for qty units of the inputted code rounded to the inputted decimals
+
+        Scaling a memoized vector associates the products and sums differently to a path by path explosion.
+        The two only round differently when a quantity lies within float error of a rounding tie, so those
+        quantities are recomputed path by path to keep the output identical
+
+        Parameters
+        ---------
+        code : int
+            Integer code of the item whose lowest level of components we are extracting
+        qty : float, default 1.0
+            the quantity of the item we are accounting for
+        decimals : int, default 6
+            Number of decimal places to round to
+
+        Returns
+        ---------
+        out : tuple of numpy.ndarray
+            (leaf codes in increasing order, respective rounded quantities)
+        """
+        leaf_codes, unit_qtys = self.leaf_vector(code)
+        leaf_qtys = unit_qtys * qty
+
+        scaled = leaf_qtys * 10.0 ** decimals
+        ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9 * np.maximum(1.0, np.abs(scaled))
+        if ties.any():
+            leaf_qtys[ties] = self.path_sums(code, leaf_codes[ties], qty)
+        if enabled():
+            count("rounding_ties", int(np.count_nonzero(ties)))
+
+        return leaf_codes, np.around(leaf_qtys, decimals)
+
+    def path_sum(self, code, leaf, qty=1.0):
+        """
+        Return the quantity of leaf needed for qty units of code, multiplying QtyPers from the top down along
+        each path and adding the paths in depth first order
+        """
+        total = None
+        stack = [(code, float(qty))]
+
+        while stack:
+            current, current_qty = stack.pop()
+            if current == leaf:
+                total = current_qty if total is None else total + current_qty
+                continue
+
+            # Only descend into paths reaching leaf, pushed in reverse so they are popped in BoM row order
+            below = []
+            for comp, qty_per in zip(*self.children_of(current)):
+                comp_leaves = self.leaf_vector(comp)[0]
+                i = np.searchsorted(comp_leaves, leaf)
+                if i < len(comp_leaves) and comp_leaves[i] == leaf:
+                    below.append((comp, float(qty_per)*current_qty))
+            stack.extend(below[::-1])
+
+        return total
+
+    def path_sums(self, code, leaves, qty=1.0, max_paths=1000000):
+        """
+        Return path_sum(code, leaf, qty) of each of the inputted increasing leaf codes from one vectorized expansion
+        of every path below code.
+        Paths are expanded one level at a time and put in depth first order by their sequence of BoM line positions.
+        Falls back to path_sum per leaf for a few leaves or when a level holds more than max_paths paths
+        """
+        leaves = np.asarray(leaves, dtype=np.int64)
+        if len(leaves) < 4:  # Searching the paths of each leaf is cheaper than expanding them all
+            return np.array([self.path_sum(code, leaf, qty) for leaf in leaves], dtype=np.float64)
+        nodes = np.array([code], dtype=np.int64)
+        qtys = np.array([float(qty)])
+        keys = np.zeros((1, 0), dtype=np.int64)
+        ended = []
+
+        while len(nodes):
+            starts = self.offsets[nodes]
+            counts = self.offsets[nodes + 1] - starts
+            is_leaf = counts == 0
+            ended.append((nodes[is_leaf], qtys[is_leaf], keys[is_leaf]))
+            nodes, qtys, keys, starts, counts = (
+                nodes[~is_leaf], qtys[~is_leaf], keys[~is_leaf], starts[~is_leaf], counts[~is_leaf])
+            if counts.sum() > max_paths:
+                return np.array([self.path_sum(code, leaf, qty) for leaf in leaves])
+
+            # Multiply the QtyPers top down like the legacy explosion
+            lines = self.lines_of(nodes)
+            parent = np.repeat(np.arange(len(nodes)), counts)
+            qtys = self.qtys[lines] * qtys[parent]
+            keys = np.column_stack([keys[parent], lines - starts[parent]])
+            nodes = self.children[lines].astype(np.int64)
+
+        depth = max(key.shape[1] for _, _, key in ended)
+        leaf_nodes = np.concatenate([node for node, _, _ in ended])
+        leaf_qtys = np.concatenate([leaf_qty for _, leaf_qty, _ in ended])
+        leaf_keys = np.concatenate([np.pad(key, ((0, 0), (0, depth - key.shape[1])), constant_values=-1)
+                                    for _, _, key in ended])
+
+        # Add the paths reaching each requested leaf one at a time in depth first order
+        order = np.lexsort(leaf_keys.T[::-1]) if depth else np.arange(len(leaf_nodes))
+        leaf_nodes, leaf_qtys = leaf_nodes[order], leaf_qtys[order]
+        position = np.minimum(np.searchsorted(leaves, leaf_nodes), max(len(leaves) - 1, 0))
+        requested = (leaves[position] == leaf_nodes) if len(leaves) else np.zeros(len(leaf_nodes), dtype=bool)
+        out = np.zeros(len(leaves), dtype=np.float64)
+        np.add.at(out, position[requested], leaf_qtys[requested])
+
+        return out
+
+    def ancestor_set(self, code):
+        """
+        Return the sorted codes of every item that requires the inputted code, directly or through subassemblies.
+        Each item's set is built once from its parents' sets and kept in a least recently used cache
+
+        Parameters
+        ---------
+        code : int
+            Integer code of the item whose usage we are extracting
+
+        Returns
+        ---------
+        out : numpy.ndarray
+            int32 codes of the items requiring code
+        """
+        return self._memoized(code, self._ancestor_cache, self.parents_of, self._merge_ancestors, reverse=True,
+                              name="ancestor")
+
+    def _merge_ancestors(self, code, values):
+        """
+        Combine the ancestor sets of the parents of code into the ancestor set of code
+        """
+        parents = self.parents_of(code)
+        return np.unique(np.concatenate([parents] + [values[parent] for parent in parents])).astype(np.int32)
+
+    def ancestors(self, codes):
+        """
+        Return the codes of every item that requires any of the inputted codes, directly or through subassemblies
+        """
+        sets = [self.ancestor_set(int(code)) for code in codes]
+        return np.unique(np.concatenate(sets)).astype(np.int32) if sets else np.empty(0, dtype=np.int32)
+
+    def fingerprints(self, codes=None, names=False, qtys=True, ordered=True):
+        """
+        Return the 128 bit Merkle fingerprint of every inputted code. A leaf is fingerprinted by its SKU code and a
+        parent by the fingerprints and QtyPers of its BoM lines in row order, so two items with equal fingerprints
+        have the same leaf components reached along the same paths in the same order, and identical explosions.
+        Only the items below the inputted codes are hashed, one level at a time, and the results are kept
+
+        Parameters
+        ---------
+        codes : list-like, default None
+            Integer codes of the items to fingerprint. Every item when None
+        names : bool, default False
+            Include the SKU code of every item, not only of the leaves, so equal fingerprints mean identical trees
+        qtys : bool, default True
+            Include the QtyPers of the lines
+        ordered : bool, default True
+            Include the position of every line. Without it items whose trees only differ in the order of their lines
+            have equal fingerprints and the same leaf components, though their explosions may differ in the last bit
+            as the quantities are summed in another order
+
+        Returns
+        ---------
+        out : numpy.ndarray
+            len(codes) x 2 uint64 array
+
+        Raises
+        ---------
+        BomCycleError
+            If the Bill of Materials contains a cycle
+        """
+        n = len(self.skus)
+        key = (bool(names), bool(qtys), bool(ordered))
+        if key not in self._fingerprints:
+            self._fingerprints[key] = (np.zeros((n, 2), dtype=np.uint64), np.zeros(n, dtype=bool))
+        hashes, done = self._fingerprints[key]
+        codes = np.arange(n) if codes is None else np.asarray(codes, dtype=np.int64)
+
+        # Items below the inputted codes that are not fingerprinted yet
+        reached = np.zeros(n, dtype=bool)
+        frontier = np.unique(codes[~done[codes]])
+        while len(frontier):
+            reached[frontier] = True
+            below = self.children[self.lines_of(frontier)]
+            frontier = np.unique(below[~reached[below] & ~done[below]])
+        nodes = np.flatnonzero(reached)
+
+        # Deepest level first: the components of every item are hashed before the item itself. Without the low
+        # level codes of the whole BoM only the reached items are levelized
+        if len(nodes):
+            levels = (self._levels if self._levels is not None else self._levelize(reached))[nodes]
+            order = nodes[np.argsort(-levels, kind="stable")]
+            bounds = np.flatnonzero(np.diff(np.concatenate([[-1], np.sort(levels)[::-1], [-1]])))
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                items = order[start:stop]
+                hashes[items] = self._hash_lines(items, hashes, names, qtys, ordered)
+                done[items] = True
+
+        return hashes[codes]
+
+    def identical(self, code1, code2):
+        """
+        Return True if two codes have equal fingerprints, so the same leaf explosion. Items whose own lines differ in
+        number or QtyPers are told apart without hashing their trees
+        """
+        qtys1, qtys2 = self.children_of(code1)[1], self.children_of(code2)[1]
+        if len(qtys1) != len(qtys2) or not np.array_equal(qtys1, qtys2):
+            return False
+        return bool(np.array_equal(*self.fingerprints([code1, code2])))
+
+    def _hash_lines(self, items, hashes, names, qtys, ordered):
+        """
+        Return the fingerprints of items whose components are already fingerprinted in hashes. The line hashes are
+        summed, so without their positions the fingerprint does not depend on the order of the lines
+        """
+        counts = self.offsets[items + 1] - self.offsets[items]
+        lines = self.lines_of(items)
+        positions = np.arange(len(lines)) - np.repeat(np.cumsum(counts) - counts, counts)
+        position_bits = (positions + 1).astype(np.uint64) * _GOLDEN
+        if not ordered:
+            position_bits[:] = 0
+        qty_bits = self.qtys[lines].astype(np.float64).view(np.uint64)
+        if not qtys:
+            qty_bits = np.zeros(len(lines), dtype=np.uint64)
+        base = np.tile(_PARENT_HASH, (len(items), 1))
+        named = np.ones(len(items), dtype=bool) if names else counts == 0  # Leaves are always told apart by SKU
+        base[named] = _name_hashes(self.skus[items[named]])
+
+        child_hashes = hashes[self.children[lines]]
+        has_lines = counts > 0
+        out = np.empty((len(items), 2), dtype=np.uint64)
+        for lane in range(2):
+            terms = _mix64(child_hashes[:, lane] + _mix64(qty_bits + _SEEDS[lane]) + position_bits)
+            sums = np.zeros(len(items), dtype=np.uint64)
+            if len(lines):
+                sums[has_lines] = np.add.reduceat(terms, (np.cumsum(counts) - counts)[has_lines])
+            out[:, lane] = _finish_hash(base[:, lane], sums, counts.astype(np.uint64), lane)
+
+        return out
+
+    def cached_similarity(self, code1, code2):
+        """
+        Return the memoized ravisim proportion between two codes or None. Calls passing the same numpy table share
+        the cache through compile_bom
+        """
+        key = (min(code1, code2), max(code1, code2))
+        out = self.similarity_cache.get(key)
+        if out is not None:
+            self.similarity_cache.move_to_end(key)
+        if enabled():
+            count("similarity_cache_hits" if out is not None else "similarity_cache_misses")
+        return out
+
+    def cache_similarity(self, code1, code2, proportion):
+        """
+        Memoize the ravisim proportion between two codes
+        """
+        self.similarity_cache[(min(code1, code2), max(code1, code2))] = proportion
+        if len(self.similarity_cache) > self.similarity_cache_size:
+            self.similarity_cache.popitem(last=False)
+
+    def apply_changes(self, changes):
+        """
+        Edit the Bill of Materials in place and invalidate only the cached leaf explosions and similarities of the
+        changed parents and the items that require them. Results computed afterwards are identical to compiling
+        the edited table from scratch
+
+        Parameters
+        ---------
+        changes : iterable of tuple
+            Each change is one of
+                ("add", parent, component, qty_per) : append a BoM line
+                ("remove", parent, component) : remove every line of component in parent
+                ("set", parent, component, qty_per) : replace the lines of component in parent by one line of qty_per
+
+        Returns
+        ---------
+        out : numpy.ndarray
+            SKU codes whose leaf components may have changed (the dirty set)
+        """
+        changes = [tuple(change) for change in changes]
+        for change in changes:
+            if change[0] not in ("add", "remove", "set"):
+                raise ValueError("Unknown Bill of Materials change {change}".format(change=change))
+
+        # The BoM is only changed once every change is valid and no cycle is closed, else it is left as it was
+        state = dict(self.__dict__)
+        try:
+            rebuilt, changed = self._edited(changes)
+            # Only the changed parents and the items requiring them can have different leaf components
+            dirty = np.union1d(np.array(sorted(changed), dtype=np.int32), rebuilt.ancestors(changed))
+        except Exception:
+            self.__dict__.update(state)
+            raise
+
+        _forget_compiled(self)  # No longer the compiled form of its table
+        self.offsets, self.children, self.qtys = rebuilt.offsets, rebuilt.children, rebuilt.qtys
+        self._reverse = rebuilt._reverse
+        self._levels = None
+        self._ancestor_cache = rebuilt._ancestor_cache
+        self._content_hash = None
+        self.leaf_matrix_cache = None
+
+        dirty_set = set(dirty.tolist())
+        for code in dirty_set:
+            self._leaf_cache.pop(code, None)
+        for hashes, done in self._fingerprints.values():
+            done[dirty] = False
+        for key in [key for key in self.similarity_cache if key[0] in dirty_set or key[1] in dirty_set]:
+            del self.similarity_cache[key]
+
+        return self.skus[dirty]
+
+    def _edited(self, changes):
+        """
+        Return the BoM with the changes applied as a new CompiledBom and the codes of the changed parents. New SKUs
+        are added to this BoM's dictionary first
+        """
+        # Recode if the changes introduce new SKUs, keeping codes in SKU order
+        new_skus = {str(sku) for change in changes for sku in change[1:3]}
+        new_skus = np.array(sorted(sku for sku in new_skus if self.code(sku) < 0), dtype=str)
+        if len(new_skus):
+            self._recode(np.union1d(self.skus, new_skus))
+
+        parents = self.parent_codes()
+        children = np.array(self.children, dtype=np.int32)
+        qtys = np.array(self.qtys, dtype=np.float64)
+        keep = np.ones(len(children), dtype=bool)
+        added = []  # [parent, component, qty_per, kept] lines appended after the existing ones
+        changed = set()
+
+        for op, parent, component, *qty_per in changes:
+            p, c = self.code(parent), self.code(component)
+            start, end = self.offsets[p], self.offsets[p + 1]
+            lines = start + np.flatnonzero((children[start:end] == c) & keep[start:end])
+            added_lines = [line for line in added if line[0] == p and line[1] == c and line[3]]
+            if op != "add" and len(lines) + len(added_lines) == 0:
+                raise ValueError("{component} is not a component of {parent}".format(
+                    component=component, parent=parent))
+
+            if op == "add":
+                added.append([p, c, float(qty_per[0]), True])
+            elif op == "remove":
+                keep[lines] = False
+                for line in added_lines:
+                    line[3] = False
+            else:
+                keep[lines] = False
+                for line in added_lines:
+                    line[3] = False
+                if len(lines):  # The line stays in its original position
+                    keep[lines[0]] = True
+                    qtys[lines[0]] = float(qty_per[0])
+                else:
+                    added_lines[0][2], added_lines[0][3] = float(qty_per[0]), True
+            changed.add(p)
+
+        added = [line for line in added if line[3]]
+        rebuilt = CompiledBom.from_edges(
+            self.skus,
+            np.concatenate([parents[keep], np.array([line[0] for line in added], dtype=np.int32)]),
+            np.concatenate([children[keep], np.array([line[1] for line in added], dtype=np.int32)]),
+            np.concatenate([qtys[keep], np.array([line[2] for line in added], dtype=np.float64)]))
+        rebuilt.leaf_cache_size = self.leaf_cache_size  # Its usage sets are kept
+
+        return rebuilt, changed
+
+    def _recode(self, skus):
+        """
+        Move to a larger sorted SKU dictionary, translating the structure and caches to the new codes
+        """
+        remap = np.searchsorted(skus, self.skus).astype(np.int32)
+        self.skus = skus
+        self.children = remap[self.children]
+        offsets = np.zeros(len(skus) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(np.repeat(remap, np.diff(self.offsets)), minlength=len(skus)), out=offsets[1:])
+        self.offsets = offsets
+        self._levels = None
+        self._fingerprints = {}
+        self._ancestor_cache.clear()
+        self._leaf_cache = OrderedDict(
+            (int(remap[code]), (remap[leaves], leaf_qtys)) for code, (leaves, leaf_qtys) in self._leaf_cache.items())
+        self.similarity_cache = OrderedDict(
+            ((int(remap[key[0]]), int(remap[key[1]])), value) for key, value in self.similarity_cache.items())
+
+    def clear_cache(self):
+        """
+        Drop every memoized leaf explosion, usage set and similarity
+        """
+        self._leaf_cache.clear()
+        self._ancestor_cache.clear()
+        self.similarity_cache.clear()
+
+
+class LeafVector:
+    """
+    Leaf requirements of one item: sorted int32 leaf codes and their float64 quantities
+
+    Parameters
+    ---------
+    codes : numpy.ndarray
+        Increasing leaf codes
+    qtys : numpy.ndarray
+        Quantity of each leaf code
+    skus : numpy.ndarray
+        SKU code of every leaf code, usually the skus of the compiled BoM the codes come from
+
+    Vectors sharing the same skus array are compared on their integer codes, any others on their SKU codes.
+    to_array returns the dx2 [[leaf, qty]] object array of leafcomponents_qp.
+    """
+
+    __slots__ = ("codes", "qtys", "skus")
+
+    def __init__(self, codes, qtys, skus):
+        self.codes = codes
+        self.qtys = qtys
+        self.skus = skus
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __repr__(self):
+        return "LeafVector(leaves={n}, total={total})".format(n=len(self.codes), total=self.total())
+
+    def leaf_skus(self):
+        """
+        Return the SKU code of each leaf, in SKU order
+        """
+        return self.skus[self.codes]
+
+    def total(self):
+        """
+        Return the sum of the quantities, added in increasing order like ravisim adds a leafcomponents_qp output
+        """
+        if len(self.qtys) == 0:
+            return 0.0
+        return np.cumsum(np.sort(self.qtys))[-1]
+
+    def intersection(self, other):
+        """
+        Return the positions in self and in other of the leaves they share, in leaf SKU order
+        """
+        if self.skus is other.skus:
+            keys, other_keys = self.codes, other.codes
+        else:
+            keys, other_keys = self.leaf_skus(), other.leaf_skus()
+
+        # Both are sorted, so each leaf of self is looked up in other by binary search
+        found = np.minimum(np.searchsorted(other_keys, keys), max(len(other_keys) - 1, 0))
+        shared = np.flatnonzero(other_keys[found] == keys) if len(other_keys) else np.empty(0, dtype=np.int64)
+
+        return shared, found[shared]
+
+    def min_sum(self, other):
+        """
+        Return the overlap with other: the sum of the smaller quantity of each shared leaf, added in leaf SKU order
+        """
+        positions, other_positions = self.intersection(other)
+        if len(positions) == 0:
+            return 0.0
+        return np.cumsum(np.minimum(self.qtys[positions], other.qtys[other_positions]))[-1]
+
+    def to_array(self):
+        """
+        Return the dx2 ndarray of leaf component codes and their quantities sorted by increasing quantity,
+        the format returned by leafcomponents_qp
+        """
+        out = np.empty((len(self.codes), 2), dtype=object)
+        out[:, 0] = [str(leaf) for leaf in self.leaf_skus()]
+        out[:, 1] = list(self.qtys)
+
+        return out[np.argsort(out[:, -1])]
+
+
+_MIX = (np.uint64(0xbf58476d1ce4e5b9), np.uint64(0x94d049bb133111eb))
+_GOLDEN = np.uint64(0x9e3779b97f4a7c15)
+_SEEDS = (np.uint64(0x243f6a8885a308d3), np.uint64(0x13198a2e03707344))
+_PARENT_HASH = np.array([0xa4093822299f31d0, 0x082efa98ec4e6c89], dtype=np.uint64)
+
+
+def _mix64(x):
+    """
+    splitmix64 finalizer of a uint64 array
+    """
+    x = x ^ (x >> np.uint64(30))
+    x = x * _MIX[0]
+    x = x ^ (x >> np.uint64(27))
+    x = x * _MIX[1]
+    return x ^ (x >> np.uint64(31))
+
+
+def _name_hashes(skus):
+    """
+    Return the 128 bit hash of every SKU code as a len(skus) x 2 uint64 array
+    """
+    digests = b"".join(hashlib.blake2b(str(sku).encode(), digest_size=16).digest() for sku in np.asarray(skus).tolist())
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64).reshape(-1, 2)
+
+
+def _finish_hash(base, sums, counts, lane):
+    """
+    Combine the base hash of items with the sum of their line hashes, in one lane of the fingerprint
+    """
+    return _mix64(base + _mix64(sums ^ (counts * _GOLDEN + _SEEDS[lane])))
+
+
+def leaf_fingerprint(skus):
+    """
+    Return the fingerprint of items without components, also of SKU codes that are not in a Bill of Materials
+    """
+    base = _name_hashes(skus)
+    zeros = np.zeros(len(base), dtype=np.uint64)
+    return np.stack([_finish_hash(base[:, lane], zeros, zeros, lane) for lane in range(2)], axis=1)
+
+
+def compile_bom(bom, cache=True):
+    """
+    Return the inputted bom as a CompiledBom, compiling it if it is a [[Parent, Component, QtyPer]] table.
+    The compiled forms of the last COMPILED_CACHE_SIZE tables are kept, keyed by the content of the table, so the
+    functions of j_prdctsim.bom, j_prdctsim.calc and the other modules compile a table once and share its leaf
+    explosion and similarity caches between calls. A table edited in place is compiled again
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    cache : bool, default True
+        Reuse the kept compiled form of the table. Pass False for a private CompiledBom whose attributes (such as
+        explosion_cache) do not carry over to later calls with the same table
+
+    Returns
+    ---------
+    out : CompiledBom
+    """
+    if isinstance(bom, CompiledBom):
+        return bom
+    if not cache:
+        count("compilations")
+        with phase("compile"):
+            return CompiledBom.from_array(bom)
+
+    # Object tables are keyed by the addresses of their cells, which the kept copy holds on to so they are not reused
+    table = np.ascontiguousarray(bom)
+    key = (table.dtype.str, table.shape, hashlib.blake2b(table.tobytes(), digest_size=16).digest())
+    with _compiled_lock:
+        if key in _compiled:
+            _compiled.move_to_end(key)
+            return _compiled[key][1]
+
+    count("compilations")
+    with phase("compile"):
+        compiled = CompiledBom.from_array(table)
+    with _compiled_lock:
+        _compiled[key] = (table.copy(), compiled)
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+
+    return compiled
+
+
+def _forget_compiled(bom):
+    """
+    Stop handing out bom for the table it was compiled from, once it no longer matches it
+    """
+    with _compiled_lock:
+        for key in [key for key, (table, compiled) in _compiled.items() if compiled is bom]:
+            del _compiled[key]
+
+
+COMPILED_CACHE_SIZE = 4
+_compiled = OrderedDict()  # Content key of a table -> (copy of the table, CompiledBom)
+_compiled_lock = threading.Lock()
@@ -0,0 +1,364 @@
+""" Bill of Materials Files: Load large Bill of Materials extracts straight into a CompiledBom
+
+pd.read_csv(...).to_numpy() materializes the whole Bill of Materials (BoM) as an object array of Python strings,
+which for a large ERP extract costs many times the size of the file. The loader in this module streams the CSV in
+chunks, interns Parent and Component into integer codes with one shared dictionary and keeps QtyPer as float64,
+so memory stays proportional to the compiled output.
+
+A compiled BoM can also be saved to a binary file whose arrays are memory mapped on load. Worker processes then
+start without parsing anything and share the same pages of the operating system's file cache.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from j_prdctsim.compiled import CompiledBom, compile_bom
+
+
+def read_bom_csv(path, chunksize=1000000, usecols=(0, 1, 2), **kwargs):
+    """
+    Stream a [[Parent, Component, QtyPer]] CSV into a CompiledBom without materializing the full table
+
+    Parameters
+    ---------
+    path : str or file-like
+        Path to the Bill of Materials CSV
+    chunksize : int, default 1000000
+        Number of rows parsed at once
+    usecols : tuple, default (0, 1, 2)
+        Positions (or names) of the Parent, Component and QtyPer columns. Pass two columns for a BoM without QtyPers
+    **kwargs
+        Passed on to pandas.read_csv (for example sep or encoding)
+
+    Returns
+    ---------
+    out : CompiledBom
+    """
+    index = {}
+    parents, components, qtys = [], [], []
+    chunks = pd.read_csv(path, chunksize=chunksize, usecols=list(usecols), dtype=str, keep_default_na=False, **kwargs)
+
+    for chunk in chunks:
+        columns = [_column(chunk, usecols, col) for col in usecols]
+
+        # Intern each distinct SKU of the chunk once into the shared dictionary
+        chunk_codes, uniques = pd.factorize(pd.concat([columns[0], columns[1]], ignore_index=True))
+        mapping = np.array([index.setdefault(sku, len(index)) for sku in uniques], dtype=np.int32)
+        chunk_codes = mapping[chunk_codes]
+        parents.append(chunk_codes[:len(chunk)])
+        components.append(chunk_codes[len(chunk):])
+
+        if len(usecols) >= 3:
+            qtys.append(columns[2].to_numpy().astype(np.float64))
+        else:
+            qtys.append(np.ones(len(chunk), dtype=np.float64))
+
+    # Recode in SKU order so code i is the i-th SKU in lexical order
+    skus = np.array(list(index), dtype=str)
+    order = np.argsort(skus, kind="stable")
+    recode = np.empty(len(skus), dtype=np.int32)
+    recode[order] = np.arange(len(skus), dtype=np.int32)
+
+    return CompiledBom.from_edges(
+        skus[order],
+        recode[np.concatenate(parents)] if parents else np.empty(0, dtype=np.int32),
+        recode[np.concatenate(components)] if components else np.empty(0, dtype=np.int32),
+        np.concatenate(qtys) if qtys else np.empty(0, dtype=np.float64))
+
+
+def _column(chunk, usecols, col):
+    """
+    Return the inputted column of a chunk. pandas orders the columns of a chunk as they are in the file
+    """
+    if isinstance(col, str):
+        return chunk[col]
+    return chunk.iloc[:, sorted(usecols).index(col)]
+
+
+FORMAT_MAGIC = b"JPRDBOM\x00"
+FORMAT_VERSION = 1
+_ALIGN = 64
+
+
+def save_bom(bom, path, leaf_matrix=None, source=None):
+    """
+    Save a compiled Bill of Materials to a binary file that load_bom memory maps without parsing or copying
+
+    The file is an 8 byte magic string, the length of a JSON header and the header itself followed by 64 byte
+    aligned arrays. The header holds the format version, the content hash of the BoM and the offset, dtype and
+    shape of every array
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    path : str
+        Path of the file to write
+    leaf_matrix : tuple, default None
+        (matrix, row_skus, leaf_skus) as returned by j_prdctsim.matrix.leaf_matrix(bom, decimals=6) to store
+        alongside the BoM. It is loaded into CompiledBom.leaf_matrix_cache
+    source : str, default None
+        Path of the file the BoM was read from. Its size and modification time are recorded so load_bom can
+        detect that the source has changed since
+    """
+    bom = compile_bom(bom)
+    arrays = _bom_arrays(bom, leaf_matrix)
+    encoded, start, size = _layout(arrays, {"content_hash": bom.content_hash(), "source": _source_stamp(source)})
+
+    # Write to a temporary file and rename so readers never map a partially written file
+    temp_path = "{path}.{pid}.tmp".format(path=path, pid=os.getpid())
+    with open(temp_path, "wb") as f:
+        f.truncate(size)
+    buffer = np.memmap(temp_path, dtype=np.uint8, mode="r+")
+    _write(buffer, arrays, encoded, start)
+    buffer.flush()
+    del buffer
+    os.replace(temp_path, path)
+
+
+def load_bom(path, source=None, expected_hash=None, verify=False):
+    """
+    Memory map a Bill of Materials saved with save_bom. Processes loading the same file share its pages
+
+    Parameters
+    ---------
+    path : str
+        Path of the file written by save_bom
+    source : str, default None
+        Path of the file the BoM was read from. Raises ValueError if it changed since the BoM was saved
+    expected_hash : str, default None
+        Raises ValueError if the content hash of the saved BoM is not expected_hash
+    verify : bool, default False
+        Recompute the content hash from the mapped arrays and raise ValueError if the file is corrupt
+
+    Returns
+    ---------
+    out : CompiledBom
+        Compiled BoM whose arrays are read only views of the file
+    """
+    header, arrays = _read(np.memmap(path, dtype=np.uint8, mode="r"), path)
+    if expected_hash is not None and header["content_hash"] != expected_hash:
+        raise ValueError("{path} holds a different Bill of Materials than expected".format(path=path))
+    if source is not None and header["source"] != _source_stamp(source):
+        raise ValueError("{path} is stale, {source} has changed since it was saved".format(path=path, source=source))
+    bom = _bom_from_arrays(arrays)
+    if verify and bom.content_hash() != header["content_hash"]:
+        raise ValueError("{path} is corrupt, its content hash does not match its header".format(path=path))
+    bom._content_hash = header["content_hash"]
+
+    return bom
+
+
+def share_bom(bom, leaf_matrix=None):
+    """
+    Publish a compiled Bill of Materials to a block of shared memory that attach_bom maps in other processes
+    without pickling or copying. The block holds the same layout as a file written by save_bom. Requires Python 3.8
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    leaf_matrix : tuple, default None
+        (matrix, row_skus, leaf_skus) as returned by j_prdctsim.matrix.leaf_matrix(bom, decimals=6) to publish
+        alongside the BoM. It is attached as CompiledBom.leaf_matrix_cache
+
+    Returns
+    ---------
+    out : multiprocessing.shared_memory.SharedMemory
+        The published block. Pass out.name to attach_bom, and close and unlink it once no process needs it
+    """
+    bom = compile_bom(bom)
+    arrays = _bom_arrays(bom, leaf_matrix)
+
+    return share_arrays(arrays, {"content_hash": bom.content_hash(), "source": None})
+
+
+def attach_bom(name):
+    """
+    Return the Bill of Materials published by share_bom under name. Its arrays are read only views of the shared
+    block, which stays open as long as the returned CompiledBom exists
+
+    Parameters
+    ---------
+    name : str
+        Name of the shared memory block
+
+    Returns
+    ---------
+    out : CompiledBom
+    """
+    memory, header, arrays = attach_arrays(name)
+    bom = _bom_from_arrays(arrays)
+    bom._content_hash = header["content_hash"]
+    bom._buffer = memory
+
+    return bom
+
+
+def share_arrays(arrays, meta=None):
+    """
+    Publish a dict of numpy arrays and JSON serializable meta data to a new block of shared memory
+
+    Returns
+    ---------
+    out : multiprocessing.shared_memory.SharedMemory
+    """
+    from multiprocessing import shared_memory
+
+    encoded, start, size = _layout(arrays, meta or {})
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    _write(np.frombuffer(memory.buf, dtype=np.uint8), arrays, encoded, start)
+
+    return memory
+
+
+def attach_arrays(name):
+    """
+    Return the (SharedMemory, meta data, dict of read only arrays) of a block published by share_arrays. The
+    arrays are views of the block, so the SharedMemory must stay referenced while they are used
+    """
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(name=name)
+    buffer = np.frombuffer(memory.buf, dtype=np.uint8)
+    buffer.flags.writeable = False
+    header, arrays = _read(buffer, name)
+
+    return memory, header, arrays
+
+
+def _bom_arrays(bom, leaf_matrix):
+    roffsets, rparents = bom.reverse_index()
+    arrays = {
+        "skus": bom.skus, "offsets": bom.offsets, "children": bom.children, "qtys": bom.qtys,
+        "roffsets": roffsets, "rparents": rparents,
+    }
+    if leaf_matrix is not None:
+        arrays.update(leaf_matrix_arrays(leaf_matrix))
+
+    return arrays
+
+
+def _bom_from_arrays(arrays):
+    bom = CompiledBom(arrays["skus"], arrays["offsets"], arrays["children"], arrays["qtys"])
+    bom._reverse = (arrays["roffsets"], arrays["rparents"])
+    if "leaf_indptr" in arrays:
+        bom.leaf_matrix_cache = leaf_matrix_view(arrays)
+
+    return bom
+
+
+def leaf_matrix_arrays(leaf_matrix):
+    """
+    Return the arrays share_arrays publishes a (matrix, row_skus, leaf_skus) leaf requirement matrix as
+    """
+    total, row_skus, leaf_skus = leaf_matrix
+    return {
+        "leaf_indptr": total.indptr, "leaf_indices": total.indices, "leaf_data": total.data,
+        "leaf_rows": np.asarray(row_skus, dtype=str), "leaf_cols": np.asarray(leaf_skus, dtype=str),
+    }
+
+
+def leaf_matrix_view(arrays):
+    """
+    Return the (matrix, row_skus, leaf_skus) leaf requirement matrix stored by leaf_matrix_arrays, as views of arrays
+    """
+    # The constructor copies views much smaller than their buffer, so the arrays are assigned after it
+    total = sp.csr_matrix((len(arrays["leaf_rows"]), len(arrays["leaf_cols"])), dtype=arrays["leaf_data"].dtype)
+    total.data, total.indices, total.indptr = arrays["leaf_data"], arrays["leaf_indices"], arrays["leaf_indptr"]
+    total.has_sorted_indices = True
+
+    return total, arrays["leaf_rows"], arrays["leaf_cols"]
+
+
+def _layout(arrays, meta):
+    """
+    Return the encoded header of arrays, the offset of the first array and the total size in bytes
+    """
+    header = dict(meta, version=FORMAT_VERSION, arrays={})
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += _aligned(array.nbytes)
+    encoded = json.dumps(header).encode()
+    start = _aligned(len(FORMAT_MAGIC) + 8 + len(encoded))
+
+    return encoded, start, start + offset
+
+
+def _write(buffer, arrays, encoded, start):
+    """
+    Write the magic string, header and arrays laid out by _layout to a uint8 buffer
+    """
+    header = json.loads(encoded.decode())
+    prefix = FORMAT_MAGIC + struct.pack("<Q", len(encoded)) + encoded
+    buffer[:len(prefix)] = np.frombuffer(prefix, dtype=np.uint8)
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        begin = start + header["arrays"][name]["offset"]
+        buffer[begin:begin + len(array)] = array
+
+
+def _read(buffer, path):
+    """
+    Return the header and the arrays of a uint8 buffer written by _write. The arrays are views of the buffer
+    """
+    if bytes(buffer[:len(FORMAT_MAGIC)]) != FORMAT_MAGIC:
+        raise ValueError("{path} is not a j_prdctsim Bill of Materials file".format(path=path))
+    length = struct.unpack("<Q", bytes(buffer[len(FORMAT_MAGIC):len(FORMAT_MAGIC) + 8]))[0]
+    header = json.loads(bytes(buffer[len(FORMAT_MAGIC) + 8:len(FORMAT_MAGIC) + 8 + length]).decode())
+    if header["version"] != FORMAT_VERSION:
+        raise ValueError("{path} has format version {version}, expected {expected}".format(
+            path=path, version=header["version"], expected=FORMAT_VERSION))
+
+    start = _aligned(len(FORMAT_MAGIC) + 8 + length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        begin = start + spec["offset"]
+        arrays[name] = buffer[begin:begin + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+    return header, arrays
+
+
+def open_bom(path, **kwargs):
+    """
+    Return the CompiledBom of a file written by save_bom (memory mapped) or of a [[Parent, Component, QtyPer]] CSV
+
+    Parameters
+    ---------
+    path : str
+        Path of the Bill of Materials file
+    **kwargs
+        Passed on to read_bom_csv when the file is a CSV
+
+    Returns
+    ---------
+    out : CompiledBom
+    """
+    with open(path, "rb") as f:
+        binary = f.read(len(FORMAT_MAGIC)) == FORMAT_MAGIC
+
+    return load_bom(path) if binary else read_bom_csv(path, **kwargs)
+
+
+def _aligned(nbytes):
+    return -(-nbytes // _ALIGN) * _ALIGN
+
+
+def _source_stamp(source):
+    if source is None:
+        return None
+    stat = os.stat(source)
+    return [stat.st_size, stat.st_mtime_ns]
@@ -0,0 +1,144 @@
+""" Similarity Index: Answer top-k most similar product queries without scoring the whole catalog
+
+The leaf explosion of every product is computed once and inverted into leaf component -> (product, qty) postings.
+A query only touches the products sharing at least one of its leaf components. Since the overlap of two products
+can not exceed the smaller of their total leaf quantities, ravisim(x, y) <= min(total x, total y) / max(total x,
+total y). Postings are sorted by product total so a query first scans a narrow window of similarly sized products
+and only widens it when fewer than k products are certain to beat everything outside the window.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import numpy as np
+
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.matrix import leaf_matrix, row_totals
+
+
+class SimilarityIndex:
+    """
+    Inverted leaf component index over a catalog of products for top-k ravisim queries
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the products to index. All top level products of the bom when None
+    """
+
+    windows = (0.5, 0.2, 0.0)
+
+    def __init__(self, bom, skus=None):
+        self.bom = compile_bom(bom)
+        if skus is not None:
+            skus = [str(sku).strip("['']") for sku in skus]
+        self.total, self.skus, self.leaf_skus = leaf_matrix(self.bom, skus=skus, decimals=6)
+        self.totals = row_totals(self.total)
+        self.rows = {sku: i for i, sku in enumerate(self.skus)}
+        self.n_bom_leaves = int(np.count_nonzero(np.diff(self.bom.offsets) == 0))
+
+        # Postings of each leaf sorted by product total
+        csc = self.total.tocsc()
+        cols = np.repeat(np.arange(csc.shape[1]), np.diff(csc.indptr))
+        order = np.lexsort((self.totals[csc.indices], cols))
+        self.offsets = csc.indptr
+        self.products = csc.indices[order]
+        self.qtys = csc.data[order]
+        self.product_totals = self.totals[self.products]
+
+    def __len__(self):
+        return len(self.skus)
+
+    def leaves(self, sku):
+        """
+        Return the leaf columns, rounded quantities and total of the inputted sku
+        """
+        row = self.rows.get(sku)
+        if row is None:
+            total = leaf_matrix(self.bom, skus=[sku], decimals=6)[0]
+            cols, qtys = total.indices, total.data
+            sku_total = row_totals(total)[0]
+            keep = cols < self.n_bom_leaves  # Items missing from the bom share no leaf with the catalog
+            return cols[keep], qtys[keep], sku_total
+
+        start, end = self.total.indptr[row], self.total.indptr[row + 1]
+        return self.total.indices[start:end], self.total.data[start:end], self.totals[row]
+
+    def query(self, sku, k=20, min_score=0.0):
+        """
+        Return the k products most similar to the inputted sku by ravisim, excluding the sku itself
+
+        Parameters
+        ---------
+        sku : str or int
+            Code of the item to compare against the catalog
+        k : int, default 20
+            Number of products to return
+        min_score : float, default 0.0
+            Only return products whose proportion is at least min_score
+
+        Returns
+        ---------
+        skus : numpy.ndarray
+            Codes of the most similar products in decreasing order of similarity
+        proportions : numpy.ndarray
+            ravisim proportion of each returned product with the inputted sku
+
+        Raises
+        ---------
+        ValueError
+            If k is less than 1
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1, got {k}".format(k=k))
+        sku = str(sku).strip("['']")
+        cols, qtys, sku_total = self.leaves(sku)
+
+        for window in self.windows:
+            window = max(window, min_score - 0.005)
+            candidates, raw = self._score_window(sku, cols, qtys, sku_total, window)
+            # Products outside the window score below it, so k products at or above it are the top k
+            if np.count_nonzero(raw >= window) >= k or window <= max(min_score - 0.005, 0.0):
+                break
+
+        # Rank by proportion then SKU, only sorting the products tied with or above the k-th
+        if len(raw) > k:
+            kth = np.partition(raw, len(raw) - k)[len(raw) - k]
+            candidates, raw = candidates[raw >= kth], raw[raw >= kth]
+        order = np.lexsort((self.skus[candidates], -raw))[:k]
+        proportions = np.around(raw[order], 2)
+        keep = (proportions >= min_score) & (raw[order] > 0)
+
+        return self.skus[candidates[order]][keep], proportions[keep]
+
+    def _score_window(self, sku, cols, qtys, sku_total, window):
+        """
+        Return the products whose total is within the bound of the window and their unrounded proportions
+        """
+        low, high = sku_total * window, (sku_total / window if window > 0 else np.inf)
+        spans = []
+        for col in cols:
+            start, end = self.offsets[col], self.offsets[col + 1]
+            span_totals = self.product_totals[start:end]
+            spans.append((start + np.searchsorted(span_totals, low, side="left"),
+                          start + np.searchsorted(span_totals, high, side="right")))
+        spans = np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+        # Gather the posting windows of every query leaf, in leaf order
+        counts = spans[:, 1] - spans[:, 0]
+        gather = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - spans[:, 0], counts)
+        products = self.products[gather]
+        mins = np.minimum(np.repeat(qtys, counts), self.qtys[gather])
+
+        overlap = np.bincount(products, weights=mins, minlength=len(self.skus))
+        candidates = np.flatnonzero(np.bincount(products, minlength=len(self.skus)))
+        overlap = overlap[candidates]
+        union = (sku_total + self.totals[candidates]) - overlap
+        raw = overlap / union
+
+        keep = candidates != self.rows.get(sku, -1)
+        return candidates[keep], raw[keep]
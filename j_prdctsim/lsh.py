@@ -0,0 +1,215 @@
+""" Approximate Similarity: Weighted MinHash sketches and LSH candidate pairs for very large catalogs
+
+ravisim is the weighted Jaccard similarity sum(min) / sum(max) of the quantity weighted leaf components of two
+products. Consistent weighted sampling (Ioffe, 2010) draws one (leaf, level) sample per hash function so that two
+products draw the same sample with probability equal to their weighted Jaccard similarity. Banding the sketches
+(locality sensitive hashing) yields the candidate pairs likely to be above a threshold and exact ravisim is only
+computed for those.
+
+The random values of each hash function depend only on the leaf SKU code and the seed. A product's sketch row
+therefore only changes when its own leaf components change, so sketch arrays can be saved with numpy.save and
+updated incrementally by re-sketching the changed products.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import hashlib
+import numpy as np
+
+from j_prdctsim.calc import ravisim_rows
+from j_prdctsim.matrix import leaf_matrix, row_totals
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """
+    SplitMix64 finalizer: a well distributed uint64 -> uint64 hash, applied elementwise
+    """
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _uniform(x):
+    """
+    Map uint64 hashes to floats in the open interval (0, 1)
+    """
+    return ((x >> np.uint64(11)).astype(np.float64) + 0.5) / 2.0 ** 53
+
+
+def sku_hashes(skus):
+    """
+    Return a stable uint64 hash of each SKU code, independent of the catalog it appears in
+    """
+    return np.array([int.from_bytes(hashlib.blake2b(str(sku).encode(), digest_size=8).digest(), "little")
+                     for sku in skus], dtype=np.uint64)
+
+
+def weighted_minhash(total, leaf_skus, num_perm=128, seed=0, block_size=4096):
+    """
+    Return the consistent weighted sampling sketch of each row of a leaf requirement matrix
+
+    Parameters
+    ---------
+    total : scipy.sparse.csr_matrix
+        Leaf requirement matrix, see j_prdctsim.matrix.leaf_matrix
+    leaf_skus : numpy.ndarray
+        SKU code of each column of total
+    num_perm : int, default 128
+        Number of hash functions (sketch length)
+    seed : int, default 0
+        Seed of the hash functions. Sketches are only comparable when made with the same seed and num_perm
+    block_size : int, default 4096
+        Number of rows sketched at once, bounding memory to about block_size x leaves per row x num_perm
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        rows x num_perm uint64 array. Equal entries in a column are a sampled (leaf, level) collision
+    """
+    leaf_hashes = sku_hashes(leaf_skus)
+    perms = _mix(np.arange(num_perm, dtype=np.uint64) + np.uint64(seed) * _GOLDEN)
+    out = np.zeros((total.shape[0], num_perm), dtype=np.uint64)
+
+    for start in range(0, total.shape[0], block_size):
+        block = total[start:start + block_size]
+        rows = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        positive = block.data > 0
+        rows, cols, weights = rows[positive], block.indices[positive], block.data[positive]
+
+        # Per (leaf, hash function) random values r, c ~ Gamma(2, 1) and beta ~ Uniform(0, 1)
+        with np.errstate(over="ignore"):
+            base = _mix(leaf_hashes[cols][:, None] ^ perms[None, :])
+            u = [_uniform(_mix(base + np.uint64(i) * _GOLDEN)) for i in range(5)]
+        r = -np.log(u[0] * u[1])
+        c = -np.log(u[2] * u[3])
+        beta = u[4]
+
+        level = np.floor(np.log(weights)[:, None] / r + beta)
+        log_a = np.log(c) - r * (level - beta) - r
+
+        # Keep the sample with the smallest a for each row and hash function
+        best = np.full((block.shape[0], num_perm), np.inf)
+        sketched, starts = np.unique(rows, return_index=True)
+        if len(sketched):
+            best[sketched] = np.minimum.reduceat(log_a, starts, axis=0)
+        entry, perm = np.nonzero(log_a == best[rows])
+        with np.errstate(over="ignore"):
+            sample = _mix(base[entry, perm] ^ level[entry, perm].astype(np.int64).astype(np.uint64))
+        out[start + rows[entry], perm] = sample
+
+    return out
+
+
+def lsh_bands(num_perm, threshold, recall=0.95):
+    """
+    Return the number of bands and rows per band with the fewest false candidates among those that pair two
+    products of similarity threshold with probability 1 - (1 - threshold^rows)^bands of at least recall
+    """
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    probability = {option: 1.0 - (1.0 - threshold ** option[1]) ** option[0] for option in options}
+    meeting = [option for option in options if probability[option] >= recall]
+    if not meeting:
+        return max(options, key=lambda option: probability[option])
+
+    return max(meeting, key=lambda option: option[1])
+
+
+def lsh_candidates(sketches, threshold=0.5, bands=None, recall=0.95, max_bucket=1000):
+    """
+    Return the pairs of rows whose sketches collide in at least one LSH band
+
+    Parameters
+    ---------
+    sketches : numpy.ndarray
+        rows x num_perm sketch array, see weighted_minhash
+    threshold : float, default 0.5
+        Similarity of the pairs that should become candidates, used to choose the bands
+    bands : int, default None
+        Number of bands, overriding the choice from threshold. Must divide num_perm
+    recall : float, default 0.95
+        Probability with which a pair of similarity threshold becomes a candidate, used to choose the bands
+    max_bucket : int, default 1000
+        Rows sharing a band bucket with more than max_bucket others are only paired with their max_bucket
+        nearest neighbours in bucket order, bounding the work for very common sketches
+
+    Returns
+    ---------
+    rows1, rows2 : numpy.ndarray
+        Unique candidate pairs with rows1 < rows2
+    """
+    n, num_perm = sketches.shape
+    if bands is None:
+        bands = lsh_bands(num_perm, threshold, recall)[0]
+    width = num_perm // bands
+    pairs = []
+
+    for band in range(bands):
+        # Combine the band's sketch values into one bucket key per row
+        key = np.zeros(n, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for value in sketches[:, band * width:(band + 1) * width].T:
+                key = _mix(key * _GOLDEN + value)
+        order = np.argsort(key, kind="stable")
+        key = key[order]
+
+        # Rows d apart in bucket order are a pair when they share the bucket
+        for d in range(1, min(max_bucket, n - 1) + 1):
+            same = np.flatnonzero(key[d:] == key[:-d])
+            if len(same) == 0:
+                break
+            pairs.append(np.sort(np.stack([order[same], order[same + d]]), axis=0))
+
+    if not pairs:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pairs = np.concatenate(pairs, axis=1).astype(np.int64)
+    pairs = np.unique(pairs[0] * n + pairs[1])
+
+    return pairs // n, pairs % n
+
+
+def similar_pairs(skus, bom, threshold=0.5, num_perm=128, seed=0, recall=0.95, sketches=None):
+    """
+    Return the pairs of the inputted skus with a ravisim proportion of at least threshold, scoring only LSH candidates.
+    Pairs below threshold are always excluded, pairs above it are found with high probability
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to compare
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    threshold : float, default 0.5
+        Minimum ravisim proportion of a returned pair
+    num_perm : int, default 128
+        Number of hash functions of each sketch
+    seed : int, default 0
+        Seed of the hash functions
+    recall : float, default 0.95
+        Probability with which a pair of similarity threshold is found, higher values score more candidates
+    sketches : numpy.ndarray, default None
+        Previously computed sketches of the unique skus in SKU order (for example loaded with numpy.load).
+        Computed when None
+
+    Returns
+    ---------
+    skus1, skus2 : numpy.ndarray
+        Codes of each similar pair
+    proportions : numpy.ndarray
+        ravisim proportion of each pair
+    """
+    skus = np.unique([str(sku).strip("['']") for sku in skus])
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+    if sketches is None:
+        sketches = weighted_minhash(total, leaf_skus, num_perm=num_perm, seed=seed)
+
+    rows1, rows2 = lsh_candidates(sketches, threshold=threshold, recall=recall)
+    proportions = ravisim_rows(total, row_totals(total), rows1, rows2)
+    keep = proportions >= threshold
+
+    return row_skus[rows1[keep]], row_skus[rows2[keep]], proportions[keep]
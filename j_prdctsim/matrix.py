@@ -0,0 +1,454 @@
+""" Catalog Matrices: Sparse linear algebra over the whole Bill of Materials
+
+Rather than exploding one product at a time this module expresses the Bill of Materials (BoM) as a sparse
+direct usage matrix A where A[p, c] is the QtyPer of component c in parent p. The total requirements of every
+item are the power series I + A + A^2 + ... = (I - A)^-1, which terminates because a BoM is acyclic. The series is
+evaluated bottom up one low level code at a time: the leaf requirements of a level are its rows of A times the
+already exploded deeper levels, so every item is exploded once however many products share it.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import numpy as np
+import scipy.sparse as sp
+
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.profiling import count, phase
+
+
+def usage_matrix(bom):
+    """
+    Return the sparse direct usage matrix of the inputted bom. Repeated BoM lines are summed
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+
+    Returns
+    ---------
+    out : scipy.sparse.csr_matrix
+        n x n matrix over the integer SKU codes of the compiled bom with QtyPers as entries
+    """
+    bom = compile_bom(bom)
+    n = len(bom.skus)
+    out = sp.csr_matrix((bom.qtys.copy(), bom.children.copy(), bom.offsets.copy()), shape=(n, n))
+    out.sum_duplicates()  # Sorts in place, so the compiled arrays are copied above
+
+    return out
+
+
+def products(bom):
+    """
+    Return the integer codes of the top level items (parents that are not a component of anything)
+    """
+    bom = compile_bom(bom)
+    roffsets = bom.reverse_index()[0]
+    return np.flatnonzero((np.diff(roffsets) == 0) & (np.diff(bom.offsets) > 0)).astype(np.int32)
+
+
+def leaf_matrix(bom, skus=None, decimals=None, usage=None):
+    """
+    Return the leaf requirements of many items at once as a sparse matrix. Row i holds the same quantities as
+    leafcomponents_qp(row_skus[i], bom) for the leaf components in leaf_skus
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the items whose leaf components we are extracting. All top level products when None
+    decimals : int, default None
+        Round quantities the same way as leafcomponents_qp (which uses 6) when not None. Rows are read from and
+        stored to bom.explosion_cache when it is set
+    usage : scipy.sparse.csr_matrix, default None
+        usage_matrix(bom), to reuse across calls on the same BoM. Built by the call when None
+
+    Returns
+    ---------
+    out : scipy.sparse.csr_matrix
+        rows x leaves matrix of leaf component quantities per unit of each row item
+    row_skus : numpy.ndarray
+        SKU code of each row
+    leaf_skus : numpy.ndarray
+        SKU code of each column. BoM leaves in SKU order followed by requested items that are not in the BoM
+
+    Raises
+    ---------
+    BomCycleError
+        If the Bill of Materials contains a cycle
+    """
+    bom = compile_bom(bom)
+    if skus is None and decimals == 6 and bom.leaf_matrix_cache is not None:
+        total, row_skus, leaf_skus = bom.leaf_matrix_cache
+        return total.copy(), row_skus, leaf_skus
+
+    if skus is None:
+        row_skus = bom.skus[products(bom)]
+    else:
+        row_skus = np.array([str(sku) for sku in skus])
+    if bom.explosion_cache is not None:
+        return _cached_leaf_matrix(bom, row_skus, decimals, usage)
+
+    return _leaf_matrix(bom, row_skus, decimals, usage)
+
+
+def _leaf_matrix(bom, row_skus, decimals, usage=None):
+    """
+    Explode the rows of leaf_matrix
+    """
+    n = len(bom.skus)
+    row_codes = np.array([bom.code(sku) for sku in row_skus], dtype=np.int64)
+
+    # Items with the same fingerprint have identical rows, only the first of each is exploded and rounded
+    distinct, copies = distinct_rows(bom, row_codes)
+    requested_skus, row_skus, row_codes = row_skus, row_skus[distinct], row_codes[distinct]
+
+    # Items that are not in the BoM are their own leaf component
+    leaf_codes = np.flatnonzero(np.diff(bom.offsets) == 0)
+    missing = np.unique(row_skus[row_codes < 0])
+    leaf_skus = np.concatenate([bom.skus[leaf_codes], missing]).astype(str)
+
+    leaf_column = np.full(n, -1, dtype=np.int64)
+    leaf_column[leaf_codes] = np.arange(len(leaf_codes))
+
+    # Only the items below the requested rows are exploded
+    reached = np.zeros(n, dtype=bool)
+    frontier = np.unique(row_codes[row_codes >= 0])
+    while len(frontier):
+        reached[frontier] = True
+        below = bom.children[bom.lines_of(frontier)]
+        frontier = np.unique(below[~reached[below]])
+    nodes = np.flatnonzero(reached)
+    levels = bom.low_level_codes()[nodes] if len(nodes) else np.empty(0, dtype=np.int32)
+
+    # Deepest level first: the components of every item are exploded before the item itself
+    order = nodes[np.argsort(-levels, kind="stable")]
+    bounds = np.flatnonzero(np.diff(np.concatenate([[-1], np.sort(levels)[::-1], [-1]])))
+    position = np.full(n, -1, dtype=np.int64)
+    position[order] = np.arange(len(order))
+    A = (usage_matrix(bom) if usage is None else usage)[order][:, order].tocsr()
+
+    count("explosions", len(row_skus))
+    count("nodes_visited", len(order))
+    with phase("explosion"):
+        exploded = sp.csr_matrix((0, len(leaf_skus)))
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            codes = order[start:stop]
+            is_leaf = leaf_column[codes] >= 0
+            block = A[start:stop, :start] @ exploded + sp.csr_matrix(
+                (np.ones(np.count_nonzero(is_leaf)), (np.flatnonzero(is_leaf), leaf_column[codes[is_leaf]])),
+                shape=(stop - start, len(leaf_skus)))
+            exploded = sp.vstack([exploded, block], format="csr")
+
+    # Items that are not in the BoM only require themselves
+    found = row_codes >= 0
+    missing_rows = sp.csr_matrix(
+        (np.ones(len(missing)), (np.arange(len(missing)), len(leaf_codes) + np.arange(len(missing)))),
+        shape=(len(missing), len(leaf_skus)))
+    rows = np.where(found, position[np.maximum(row_codes, 0)], len(order) + np.searchsorted(missing, row_skus))
+    total = sp.vstack([exploded, missing_rows], format="csr")[rows]
+
+    total = total.tocsr()
+    total.sort_indices()
+    if decimals is not None:
+        with phase("rounding"):
+            round_leaf_matrix(total, row_codes, leaf_codes, bom, decimals)
+    if len(distinct) < len(copies):
+        total = total[copies]
+        total.sort_indices()
+
+    return total, requested_skus, leaf_skus
+
+
+def level_matrices(bom, skus=None, depth=3, decimals=6):
+    """
+    Return the requirements of many items at every depth of their Bill of Materials trees and their leaf
+    requirements from one top down explosion. The items d lines below an item are reached by multiplying the items
+    d - 1 lines below it by the usage matrix, and the leaf requirements are the leaves reached at any depth
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the items whose requirements we are extracting. All top level products when None
+    depth : int, default 3
+        Number of depths returned: the direct components, their components and so on
+    decimals : int, default 6
+        Round quantities the same way as leafcomponents_qp
+
+    Returns
+    ---------
+    levels : list
+        depth scipy.sparse.csr_matrix, rows x len(bom.skus). levels[d][i, j] is the quantity of item j required
+        d + 1 lines below row_skus[i], summed over the paths of that length
+    leaves : scipy.sparse.csr_matrix
+        Leaf requirement matrix, identical to leaf_matrix(bom, skus, decimals)[0]
+    row_skus : numpy.ndarray
+        SKU code of each row
+    leaf_skus : numpy.ndarray
+        SKU code of each column of leaves. BoM leaves in SKU order followed by requested items that are not in the BoM
+
+    Raises
+    ---------
+    BomCycleError
+        If the Bill of Materials contains a cycle
+    """
+    bom = compile_bom(bom)
+    bom.low_level_codes()  # Raises on cycles, the explosion below only ends on acyclic BoMs
+    n = len(bom.skus)
+    if skus is None:
+        row_skus = bom.skus[products(bom)]
+    else:
+        row_skus = np.array([str(sku) for sku in skus])
+    row_codes = np.array([bom.code(sku) for sku in row_skus], dtype=np.int64)
+    found = np.flatnonzero(row_codes >= 0)
+    leaf_codes = np.flatnonzero(np.diff(bom.offsets) == 0)
+    missing = np.unique(row_skus[row_codes < 0])
+    leaf_skus = np.concatenate([bom.skus[leaf_codes], missing]).astype(str)
+
+    # Depth 0 holds the items themselves, every depth is reached from the one above it
+    A = usage_matrix(bom)
+    reached = sp.csr_matrix((np.ones(len(found)), (found, row_codes[found])), shape=(len(row_skus), n))
+    total = reached
+    levels = []
+    count("explosions", len(row_skus))
+    with phase("explosion"):
+        while reached.nnz:
+            reached = reached @ A
+            total = total + reached
+            if len(levels) < depth:
+                level = reached.copy()
+                level.data = np.around(level.data, decimals)
+                level.eliminate_zeros()
+                levels.append(level)
+    while len(levels) < depth:
+        levels.append(sp.csr_matrix((len(row_skus), n)))
+
+    # Items that are not in the BoM only require themselves
+    missing_rows = np.flatnonzero(row_codes < 0)
+    leaves = sp.hstack([total[:, leaf_codes], sp.csr_matrix(
+        (np.ones(len(missing_rows)), (missing_rows, np.searchsorted(missing, row_skus[missing_rows]))),
+        shape=(len(row_skus), len(missing)))], format="csr")
+    leaves.sort_indices()
+    with phase("rounding"):
+        round_leaf_matrix(leaves, row_codes, leaf_codes, bom, decimals)
+
+    return levels, leaves, row_skus, leaf_skus
+
+
+def _cached_leaf_matrix(bom, row_skus, decimals, usage=None):
+    """
+    Read the rows of leaf_matrix from bom.explosion_cache, exploding and storing only the items it does not hold
+    """
+    cache = bom.explosion_cache
+    row_codes = np.array([bom.code(sku) for sku in row_skus], dtype=np.int64)
+    found = np.flatnonzero(row_codes >= 0)
+    keys = cache.keys(bom, row_codes[found], decimals)
+    first = {}
+    for row, key in zip(found.tolist(), keys):
+        first.setdefault(key, row)
+    entries = {key: cache.get(key) for key in first}
+
+    # Columns are laid out as in _leaf_matrix, items that are not in the BoM are their own leaf component
+    leaf_codes = np.flatnonzero(np.diff(bom.offsets) == 0)
+    missing = np.unique(row_skus[row_codes < 0])
+    leaf_skus = np.concatenate([bom.skus[leaf_codes], missing]).astype(str)
+    encoded_leaves = np.char.encode(bom.skus[leaf_codes], "utf-8")  # Sorted like the stored leaf codes
+    columns = {key: (np.searchsorted(encoded_leaves, entry[0]), entry[1])
+               for key, entry in entries.items() if entry is not None}
+
+    missed = [key for key, entry in entries.items() if entry is None]
+    if missed:
+        missed_skus = row_skus[[first[key] for key in missed]]
+        total, exploded_skus, exploded_leaves = _leaf_matrix(bom, missed_skus, decimals, usage)
+        for row, key in enumerate(missed):
+            start, stop = total.indptr[row], total.indptr[row + 1]
+            columns[key] = (total.indices[start:stop], total.data[start:stop])
+            cache.put(key, encoded_leaves[columns[key][0]], columns[key][1])
+        cache.evict()
+
+    key_of = dict(zip(found.tolist(), keys))
+    indices, data = [], []
+    for row, sku in enumerate(row_skus.tolist()):
+        key = key_of.get(row)
+        if key is None:
+            indices.append([len(leaf_codes) + np.searchsorted(missing, sku)])
+            data.append([1.0])
+        else:
+            indices.append(columns[key][0])
+            data.append(columns[key][1])
+    indptr = np.concatenate([[0], np.cumsum([len(row) for row in indices])])
+    total = sp.csr_matrix((np.concatenate(data) if data else np.empty(0),
+                           np.concatenate(indices).astype(np.int32) if indices else np.empty(0, dtype=np.int32),
+                           indptr), shape=(len(row_skus), len(leaf_skus)))
+    total.sort_indices()
+
+    return total, row_skus, leaf_skus
+
+
+def distinct_rows(bom, row_codes):
+    """
+    Return the positions of the first of every group of row codes with the same fingerprint and the position in
+    them of every row. Codes that are not in the BoM (-1) are kept as their own group
+    """
+    found = np.flatnonzero(row_codes >= 0)
+    first = np.arange(len(row_codes))
+    if len(found):
+        unique, index, inverse = np.unique(bom.fingerprints(row_codes[found]), axis=0,
+                                           return_index=True, return_inverse=True)
+        first[found] = found[index][inverse.reshape(-1)]
+    distinct, copies = np.unique(first, return_inverse=True)
+
+    return distinct, copies.reshape(-1)
+
+
+def round_leaf_matrix(total, row_codes, leaf_codes, bom, decimals=6):
+    """
+    Round a leaf requirement matrix in place, settling rounding ties in the same way as leafcomponents_qp
+    """
+    rows = np.repeat(np.arange(total.shape[0]), np.diff(total.indptr))
+    scaled = total.data * 10.0 ** decimals
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-9 * np.maximum(1.0, np.abs(scaled))
+    ties = np.flatnonzero(ties & (row_codes[rows] >= 0) & (total.indices < len(leaf_codes)))
+
+    # Rows are sorted by leaf column, so the tied leaf codes of each row are increasing
+    for row_ties in np.split(ties, np.flatnonzero(np.diff(rows[ties])) + 1) if len(ties) else []:
+        total.data[row_ties] = bom.path_sums(row_codes[rows[row_ties[0]]], leaf_codes[total.indices[row_ties]])
+    total.data = np.around(total.data, decimals)
+
+
+def row_totals(total):
+    """
+    Return the sum of each row of a leaf requirement matrix, added in increasing order of quantity.
+    This is the order a sorted leafcomponents_qp output is summed in by ravisim
+    """
+    counts = np.diff(total.indptr)
+    rows = np.repeat(np.arange(total.shape[0]), counts)
+    values = total.data[np.lexsort((total.data, rows))]
+
+    # One pass per position in the row keeps the additions sequential within each row
+    out = np.zeros(total.shape[0], dtype=np.float64)
+    starts = total.indptr[:-1]
+    for k in range(counts.max() if len(counts) else 0):
+        has = counts > k
+        out[has] += values[starts[has] + k]
+
+    return out
+
+
+def overlap_block(total, total_csc, start, stop):
+    """
+    Return the overlapping leaf quantity (sum of the elementwise minimum) between rows start:stop and every row
+
+    Parameters
+    ---------
+    total : scipy.sparse.csr_matrix
+        Leaf requirement matrix with sorted indices
+    total_csc : scipy.sparse.csc_matrix
+        The same matrix, or a block of its rows, in compressed sparse column form (the inverted leaf -> row index)
+    start, stop : int
+        Row block to compare against every row of total_csc
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        (stop - start) x total_csc.shape[0] dense array of overlaps
+    """
+    n = total_csc.shape[0]
+    block = total[start:stop]
+    block_rows = np.repeat(np.arange(stop - start), np.diff(block.indptr))
+
+    # Pair every block entry with every entry sharing its leaf column
+    col_starts = total_csc.indptr[block.indices]
+    col_counts = total_csc.indptr[block.indices + 1] - col_starts
+    offsets = np.cumsum(col_counts) - col_counts
+    gather = np.arange(col_counts.sum()) - np.repeat(offsets - col_starts, col_counts)
+    pair_rows = np.repeat(block_rows, col_counts)
+    mins = np.minimum(np.repeat(block.data, col_counts), total_csc.data[gather])
+
+    # Entries arrive in increasing leaf order per pair, bincount adds them sequentially
+    out = np.bincount(pair_rows * n + total_csc.indices[gather], weights=mins, minlength=(stop - start) * n)
+
+    return out.reshape(stop - start, n)
+
+
+def overlap_pairs(total, rows1, rows2):
+    """
+    Return the overlapping leaf quantity (sum of the elementwise minimum) between each pair of rows
+
+    Parameters
+    ---------
+    total : scipy.sparse.csr_matrix
+        Leaf requirement matrix with sorted indices
+    rows1, rows2 : numpy.ndarray
+        Row indices of the first and second item of each pair
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        Overlap of each pair
+    """
+    rows1 = np.asarray(rows1, dtype=np.int64)
+    rows2 = np.asarray(rows2, dtype=np.int64)
+    n_cols = np.int64(total.shape[1])
+    keys = np.repeat(np.arange(total.shape[0], dtype=np.int64), np.diff(total.indptr)) * n_cols + total.indices
+
+    # Look every entry of the first row up in the second row
+    counts = total.indptr[rows1 + 1] - total.indptr[rows1]
+    gather = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - total.indptr[rows1], counts)
+    pair = np.repeat(np.arange(len(rows1)), counts)
+    lookup = np.minimum(np.searchsorted(keys, rows2[pair] * n_cols + total.indices[gather]), len(keys) - 1)
+    shared = keys[lookup] == rows2[pair] * n_cols + total.indices[gather]
+    mins = np.minimum(total.data[gather[shared]], total.data[lookup[shared]])
+
+    return np.bincount(pair[shared], weights=mins, minlength=len(rows1))
+
+
+def where_used(skus, bom, top_level=False):
+    """
+    Return which items require each of the inputted skus as a sparse incidence matrix
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items whose usage we are extracting
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data
+    top_level : bool, default False
+        Only mark the top level items (finished goods) affected, like highestlevel_usage
+
+    Returns
+    ---------
+    out : scipy.sparse.csr_matrix
+        len(skus) x len(col_skus) boolean matrix. out[i, j] is True if col_skus[j] requires skus[i]
+    row_skus : numpy.ndarray
+        SKU code of each row
+    col_skus : numpy.ndarray
+        SKU code of each column, the SKUs of the compiled bom
+    """
+    bom = compile_bom(bom)
+    row_skus = np.array([str(sku) for sku in skus])
+    roffsets = bom.reverse_index()[0]
+    is_top = np.diff(roffsets) == 0
+
+    sets = []
+    for sku in row_skus:
+        code = bom.code(sku)
+        used = bom.ancestor_set(code) if code >= 0 else np.empty(0, dtype=np.int32)
+        if top_level:
+            used = used[is_top[used]]
+            if len(used) == 0 and code >= 0:  # Not required by anything : its own highest level usage
+                used = np.array([code], dtype=np.int32)
+        sets.append(used)
+
+    indptr = np.zeros(len(sets) + 1, dtype=np.int64)
+    np.cumsum([len(used) for used in sets], out=indptr[1:])
+    indices = np.concatenate(sets) if sets else np.empty(0, dtype=np.int32)
+    out = sp.csr_matrix((np.ones(len(indices), dtype=bool), indices, indptr), shape=(len(sets), len(bom.skus)))
+
+    return out, row_skus, bom.skus
@@ -0,0 +1,143 @@
+""" Material Requirements: Explode product demand into aggregated leaf component requirements
+
+Gross requirement planning needs the leaf components of every product × quantity row of a demand plan, summed per
+leaf. Rather than calling leafcomponents_qp once per row, the demand of each distinct product is summed first and
+multiplied by the leaf requirement matrix of those products (see 'j_prdctsim.matrix') in one sparse product. The
+streaming variant does the same one batch at a time into a running total over the leaf components. It explodes each
+product once, in the first batch demanding it, so memory depends on the batch size and the number of distinct
+products and leaves however long the forecast horizon is.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import numpy as np
+
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.matrix import leaf_matrix, usage_matrix
+
+
+def explode_demand(demand, bom, skus=None, decimals=6):
+    """
+    Return the total leaf component requirements of a demand plan
+
+    Parameters
+    ---------
+    demand : numpy.ndarray or list-like
+        [[SKU, Qty]] demand table, a SKU may appear on many rows. A vector of quantities when skus is given
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the items demanded, aligned with a demand vector
+    decimals : int, default 6
+        Number of decimal places the requirements are rounded to
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        dx2 ndarray of leaf component codes in SKU order in the first column and their total required quantity in the
+        second. Items that are not in the BoM are treated as leaves
+    """
+    bom = compile_bom(bom)
+    leaf_skus, qtys = demand_vector(demand, bom, skus)
+
+    return requirements(leaf_skus, qtys, decimals)
+
+
+def explode_demand_stream(batches, bom, decimals=6):
+    """
+    Return the total leaf component requirements of a demand plan read one batch at a time
+
+    Parameters
+    ---------
+    batches : iterable
+        [[SKU, Qty]] demand tables, for example a generator reading a forecast in chunks
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    decimals : int, default 6
+        Number of decimal places the requirements are rounded to
+
+    Returns
+    ---------
+    out : numpy.ndarray
+        dx2 ndarray of leaf component codes in SKU order and their total required quantity, see explode_demand
+    """
+    bom = compile_bom(bom)
+    bom_leaves = bom.skus[np.diff(bom.offsets) == 0]
+    out = np.zeros(len(bom_leaves), dtype=np.float64)
+    missing = {}
+
+    # Every product is exploded once, in the first batch demanding it, against one usage matrix
+    usage = usage_matrix(bom)
+    rows = {}
+    for batch in batches:
+        demanded, demand_qtys = demand_totals(batch)
+        found = np.array([bom.code(sku) >= 0 for sku in demanded.tolist()], dtype=bool)
+        for sku, qty in zip(demanded[~found].tolist(), demand_qtys[~found]):
+            missing[sku] = missing.get(sku, 0.0) + qty  # Items missing from the BoM are their own leaf
+        new = [sku for sku in demanded[found].tolist() if sku not in rows]
+        if new:
+            total = leaf_matrix(bom, skus=new, usage=usage)[0]
+            for row, sku in enumerate(new):
+                start, stop = total.indptr[row], total.indptr[row + 1]
+                rows[sku] = (total.indices[start:stop], total.data[start:stop])
+        if found.any():
+            exploded = [rows[sku] for sku in demanded[found].tolist()]
+            columns = np.concatenate([row[0] for row in exploded])
+            qtys = np.concatenate([row[1] for row in exploded]) * np.repeat(
+                demand_qtys[found], [len(row[0]) for row in exploded])
+            out += np.bincount(columns, weights=qtys, minlength=len(bom_leaves))
+
+    leaf_skus = np.concatenate([bom_leaves, np.array(list(missing), dtype=str)]).astype(str)
+    qtys = np.concatenate([out, np.array(list(missing.values()), dtype=np.float64)])
+
+    return requirements(leaf_skus, qtys, decimals)
+
+
+def demand_vector(demand, bom, skus=None):
+    """
+    Return the unrounded leaf requirements of a demand plan as (leaf_skus, quantities), one entry per column of the
+    leaf requirement matrix of the demanded items
+    """
+    demanded, demand_qtys = demand_totals(demand, skus)
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=demanded)
+
+    return leaf_skus, total.T @ demand_qtys
+
+
+def demand_totals(demand, skus=None):
+    """
+    Return the distinct skus of a demand plan and the summed demand of each. An empty plan has no skus
+    """
+    if skus is None:
+        demand = np.asarray(demand, dtype=object)
+        if demand.size == 0:
+            return np.empty(0, dtype=str), np.empty(0, dtype=np.float64)
+        assert demand.ndim == 2 and demand.shape[1] >= 2, \
+            "The demand has insufficient dimensions. Please format as [[SKU, Qty]]"
+        skus, qtys = demand[:, 0], demand[:, 1]
+    else:
+        qtys = demand
+    skus = np.array([str(sku) for sku in skus], dtype=str)
+    qtys = np.asarray(qtys, dtype=np.float64)
+    assert len(skus) == len(qtys), "Every demanded sku needs one quantity"
+
+    demanded, inverse = np.unique(skus, return_inverse=True)
+    return demanded, np.bincount(inverse.reshape(-1), weights=qtys, minlength=len(demanded))
+
+
+def requirements(leaf_skus, qtys, decimals=6):
+    """
+    Return the non zero requirements as a dx2 ndarray of leaf component codes in SKU order and rounded quantities
+    """
+    keep = qtys != 0
+    leaf_skus, qtys = leaf_skus[keep], qtys[keep]
+    order = np.argsort(leaf_skus, kind="stable")
+
+    out = np.empty((len(order), 2), dtype=object)
+    out[:, 0] = [str(sku) for sku in leaf_skus[order]]
+    out[:, 1] = list(np.around(qtys[order], decimals))
+
+    return out
@@ -0,0 +1,126 @@
+""" Profiling: Opt-in counters and phase timings for Bill of Materials traversals and similarity jobs
+
+The traversal and similarity functions report what they do to every active Profile: counters such as the items
+visited, BoM lines scanned, cache hits and misses and explosions performed, and the wall time spent in phases such
+as explosion and overlap. Nothing is recorded unless a Profile is active, in which case reporting costs one empty
+list check per call, so instrumentation can stay in the hot paths.
+
+    with Profile() as profile:
+        ravisim_matrix(skus, bom)
+    print(profile.report())
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+from collections import Counter
+from contextlib import nullcontext
+import time
+
+_profiles = []
+_disabled = nullcontext()
+
+
+class Profile:
+    """
+    Collect the counters and phase timings reported while the profile is active (used as a context manager).
+    Profiles can be nested, every active profile receives every report
+
+    Attributes
+    ---------
+    counters : collections.Counter
+        Count of each reported event
+    timings : collections.Counter
+        Wall time in seconds spent in each phase
+    calls : collections.Counter
+        Number of times each phase was entered
+    elapsed : float
+        Wall time in seconds the profile was active
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.timings = Counter()
+        self.calls = Counter()
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        _profiles.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _profiles.remove(self)
+        self.elapsed += time.perf_counter() - self._start
+
+    def as_dict(self):
+        """
+        Return the counters, timings and phase calls as plain dictionaries, for example to dump as JSON
+        """
+        return {"elapsed": self.elapsed, "counters": dict(self.counters),
+                "timings": dict(self.timings), "calls": dict(self.calls)}
+
+    def report(self):
+        """
+        Return a table of the phase timings, slowest first, followed by the counters
+        """
+        lines = ["{name:<28} {seconds:>10} {calls:>10}".format(name="phase", seconds="seconds", calls="calls")]
+        for name, seconds in self.timings.most_common():
+            lines.append("{name:<28} {seconds:>10.4f} {calls:>10}".format(
+                name=name, seconds=seconds, calls=self.calls[name]))
+        lines.append("{name:<28} {seconds:>10.4f}".format(name="total", seconds=self.elapsed))
+        lines.append("")
+        lines.append("{name:<28} {count:>10}".format(name="counter", count="count"))
+        for name, count in sorted(self.counters.items()):
+            lines.append("{name:<28} {count:>10}".format(name=name, count=count))
+
+        return "\n".join(lines)
+
+
+class _Phase:
+    """
+    Time one entry of a phase for the profiles active when it started
+    """
+
+    __slots__ = ("name", "profiles", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.profiles = list(_profiles)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        for profile in self.profiles:
+            profile.timings[self.name] += elapsed
+            profile.calls[self.name] += 1
+
+
+def enabled():
+    """
+    Return True if any profile is active
+    """
+    return bool(_profiles)
+
+
+def count(name, n=1):
+    """
+    Add n to the inputted counter of every active profile
+    """
+    for profile in _profiles:
+        profile.counters[name] += n
+
+
+def phase(name):
+    """
+    Return a context manager timing the inputted phase for every active profile, a no-op when none is active
+    """
+    if not _profiles:
+        return _disabled
+    return _Phase(name)
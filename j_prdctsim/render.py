@@ -0,0 +1,169 @@
+""" Batch Rendering: Render Bill of Materials tree images for a whole catalog
+
+'j_prdctsim.bom.image' renders one product at a time with matplotlib and graphviz. This module spreads those renders
+over a pool of processes and keys every image by the Merkle fingerprint of the product's subtree over the SKU codes
+of every parent -> component line below it (see 'j_prdctsim.bom.fingerprint'). A manifest of the fingerprints and
+image files is written next to the images so that the next run only renders the products whose structure has changed.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+
+from j_prdctsim.bom import fingerprint, image
+from j_prdctsim.compiled import compile_bom
+
+MANIFEST_NAME = "manifest.json"
+
+
+def subtree_fingerprint(sku, bom):
+    """
+    Return a hex digest of the tree rooted at the inputted sku: the SKU code of every item in it and their lines
+    in BoM row order, without the QtyPers image does not draw
+
+    Parameters
+    ---------
+    sku : str or int
+        The code of the item the tree is rooted on
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data
+
+    Returns
+    ---------
+    out : str
+    """
+    return fingerprint(sku, bom, names=True, qtys=False)
+
+
+def read_manifest(save_path):
+    """
+    Return the manifest of a previous run in save_path, or an empty one
+    """
+    path = os.path.join(save_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"images": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, save_path):
+    """
+    Write the manifest to save_path, replacing the previous one atomically
+    """
+    path = os.path.join(save_path, MANIFEST_NAME)
+    temp_path = "{path}.{pid}.tmp".format(path=path, pid=os.getpid())
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def plan_renders(skus, bom, save_path, img_type='jpeg'):
+    """
+    Return the skus whose image is missing or out of date and the manifest entry of every inputted sku
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to render
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data
+    save_path : str
+        Path to the directory images are saved in
+    img_type : 'png', 'jpg', default 'jpeg'
+        file type images are saved as
+
+    Returns
+    ---------
+    pending : list
+        Codes of the items to render
+    entries : dict
+        sku -> {"fingerprint", "file"} for every inputted sku
+    """
+    bom = compile_bom(bom)
+    previous = read_manifest(save_path)["images"]
+    pending, entries = [], {}
+
+    for sku in dict.fromkeys(str(sku) for sku in skus):
+        entry = {
+            "fingerprint": subtree_fingerprint(sku, bom),
+            "file": "{sku}_bom_tree.{img_type}".format(sku=sku, img_type=img_type),
+        }
+        entries[sku] = entry
+        if previous.get(sku) != entry or not os.path.exists(os.path.join(save_path, entry["file"])):
+            pending.append(sku)
+
+    return pending, entries
+
+
+def render_images(skus, bom, save_path, img_type='jpeg', workers=None, verbose=1):
+    """
+    Save the Bill of Materials tree image of every inputted sku whose structure changed since the last run and write
+    the manifest of all of them
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to render
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data
+    save_path : str
+        Path to the directory images are saved in
+    img_type : 'png', 'jpg', default 'jpeg'
+        file type images are saved as
+    workers : int, default None
+        Number of rendering processes, os.cpu_count() when None
+    verbose : 0, 1, default 1
+        verbosity of function
+
+    Returns
+    ---------
+    rendered : list
+        Codes of the items whose image was rendered
+    """
+    bom = compile_bom(bom)
+    os.makedirs(save_path, exist_ok=True)
+    pending, entries = plan_renders(skus, bom, save_path, img_type)
+    if verbose == 1:
+        print("Rendering {n} of {total} images".format(n=len(pending), total=len(entries)))
+
+    # Completed renders are recorded as they finish so an interrupted run resumes where it stopped
+    manifest = read_manifest(save_path)
+    manifest["images"] = {sku: entry for sku, entry in manifest["images"].items()
+                          if sku in entries and sku not in pending}
+    rendered = []
+    if pending:
+        chunksize = max(1, len(pending) // (4 * (workers or os.cpu_count() or 1)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker, initargs=(bom,)) as pool:
+            for sku in pool.map(_render_worker, pending, [save_path] * len(pending),
+                                [img_type] * len(pending), chunksize=chunksize):
+                manifest["images"][sku] = entries[sku]
+                rendered.append(sku)
+                if len(rendered) % 100 == 0:
+                    write_manifest(manifest, save_path)
+
+    manifest["images"] = entries
+    write_manifest(manifest, save_path)
+    if verbose == 1:
+        print("Rendered {n} images to {path}".format(n=len(rendered), path=save_path))
+
+    return rendered
+
+
+_render_bom = None
+
+
+def _init_render_worker(bom):
+    global _render_bom
+    import matplotlib
+    matplotlib.use("Agg")  # Render without a display
+    _render_bom = bom
+
+
+def _render_worker(sku, save_path, img_type):
+    image(sku, _render_bom, save_path=save_path, img_type=img_type, verbose=0)
+    return sku
@@ -0,0 +1,269 @@
+""" Similarity Service: A local HTTP/JSON server keeping a Bill of Materials and its explosions warm
+
+Short lived scripts reload and re-explode the Bill of Materials (BoM) on every call. This module serves the
+similarity, top-k, leaf explosion and where-used functions of the package from one long lived process. The leaf
+requirement matrix of every product is computed once at start up, similarity requests arriving within a few
+milliseconds of each other are coalesced into one vectorized batch, and all computations run on a single worker
+thread so the caches of the compiled BoM are never used concurrently. Only the standard library is used.
+
+    python -m j_prdctsim.server BomStructure.csv --port 8765
+
+Endpoints (POST a JSON object, responses are JSON):
+    /similarity   {"pairs": [[sku1, sku2], ...]}          -> {"proportions": [...]}
+    /topk         {"sku": sku, "k": 20, "min_score": 0.0}  -> {"skus": [...], "proportions": [...]}
+    /leaves       {"sku": sku, "qty": 1.0}                 -> {"leaves": [[leaf, qty], ...]}
+    /where_used   {"sku": sku, "top_level": false}         -> {"skus": [...]}
+    /health       (GET)                                    -> {"status": "ok", ...}
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from j_prdctsim.bom import highestlevel_usage, leafcomponents_qp, sku_usage
+from j_prdctsim.calc import ravisim_lookup
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.index import SimilarityIndex
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class Batcher:
+    """
+    Coalesce concurrent submissions into one call of function(items) on the inputted executor
+
+    Parameters
+    ---------
+    function : callable
+        Takes a list of items and returns a list with one result per item
+    executor : concurrent.futures.Executor
+        Where function runs, so the event loop keeps accepting requests meanwhile
+    delay : float, default 0.002
+        Seconds to wait for more submissions after the first one of a batch
+    max_batch : int, default 4096
+        Number of items that triggers a batch without waiting
+    """
+
+    def __init__(self, function, executor, delay=0.002, max_batch=4096):
+        self.function = function
+        self.executor = executor
+        self.delay = delay
+        self.max_batch = max_batch
+        self.batches = 0
+        self._pending = []
+        self._flush = None
+
+    async def submit(self, items):
+        """
+        Return the results of the inputted items once their batch has run
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((list(items), future))
+        if sum(len(pending[0]) for pending in self._pending) >= self.max_batch:
+            self._run()
+        elif self._flush is None:
+            self._flush = asyncio.get_running_loop().call_later(self.delay, self._run)
+
+        return await future
+
+    def _run(self):
+        if self._flush is not None:
+            self._flush.cancel()
+            self._flush = None
+        pending, self._pending = self._pending, []
+        if pending:
+            self.batches += 1
+            asyncio.ensure_future(self._compute(pending))
+
+    async def _compute(self, pending):
+        items = [item for submitted, _ in pending for item in submitted]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self.function, items)
+        except Exception as error:
+            if len(pending) > 1:
+                # Score every submission on its own so an error only reaches the request that caused it
+                for submission in pending:
+                    await self._compute([submission])
+                return
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        start = 0
+        for submitted, future in pending:
+            if not future.done():
+                future.set_result(results[start:start + len(submitted)])
+            start += len(submitted)
+
+
+class SimilarityService:
+    """
+    The computations behind the server, holding a compiled BoM and the similarity index of its products warm
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    skus : list-like, default None
+        Codes of the products to index for top-k queries. All top level products when None
+    delay : float, default 0.002
+        Seconds similarity requests wait to be batched with others
+    max_batch : int, default 4096
+        Number of pairs that triggers a batch without waiting
+    """
+
+    def __init__(self, bom, skus=None, delay=0.002, max_batch=4096):
+        self.bom = compile_bom(bom)
+        self.index = SimilarityIndex(self.bom, skus=skus)
+        self.executor = ThreadPoolExecutor(max_workers=1)  # The BoM caches are not thread safe
+        self.similarity_batcher = Batcher(self.similarity_batch, self.executor, delay, max_batch)
+
+    def similarity_batch(self, pairs):
+        """
+        Return the ravisim proportion of each (sku1, sku2) pair. Pairs of indexed products are read from the warm
+        leaf requirement matrix, the others are exploded together
+        """
+        skus1, skus2 = [pair[0] for pair in pairs], [pair[1] for pair in pairs]
+        out = ravisim_lookup(skus1, skus2, self.bom, self.index.total, self.index.totals, self.index.rows)
+
+        return out.tolist()
+
+    async def similarity(self, pairs):
+        return await self.similarity_batcher.submit(pairs)
+
+    async def top_k(self, sku, k=20, min_score=0.0):
+        skus, proportions = await self._call(self.index.query, sku, k, min_score)
+        return {"skus": skus.tolist(), "proportions": proportions.tolist()}
+
+    async def leaves(self, sku, qty=1.0):
+        out = await self._call(leafcomponents_qp, sku, self.bom, qty)
+        return [[str(leaf), float(leaf_qty)] for leaf, leaf_qty in out]
+
+    async def where_used(self, sku, top_level=False):
+        return await self._call(highestlevel_usage if top_level else sku_usage, sku, self.bom)
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def handle(self, method, path, body):
+        """
+        Return the (status, response object) of one request
+        """
+        if path == "/health":
+            return 200, {"status": "ok", "skus": len(self.bom.skus), "products": len(self.index),
+                         "batches": self.similarity_batcher.batches}
+        routes = {"/similarity", "/topk", "/leaves", "/where_used"}
+        if path not in routes:
+            return 404, {"error": "Unknown endpoint {path}".format(path=path)}
+        if method != "POST":
+            return 405, {"error": "{path} expects a POST request".format(path=path)}
+
+        try:
+            request = json.loads(body or b"{}")
+            if path == "/similarity":
+                pairs = request["pairs"] if "pairs" in request else [[request["sku1"], request["sku2"]]]
+                if not isinstance(pairs, list) or not all(isinstance(pair, list) and len(pair) == 2 for pair in pairs):
+                    return 400, {"error": "pairs must be a list of [sku1, sku2] pairs"}
+                return 200, {"proportions": await self.similarity(pairs)}
+            if path == "/topk":
+                k = int(request.get("k", 20))
+                if k < 1:
+                    return 400, {"error": "k must be at least 1"}
+                return 200, await self.top_k(request["sku"], k, float(request.get("min_score", 0.0)))
+            if path == "/leaves":
+                return 200, {"leaves": await self.leaves(request["sku"], float(request.get("qty", 1.0)))}
+            return 200, {"skus": await self.where_used(request["sku"], bool(request.get("top_level", False)))}
+        except (KeyError, TypeError, ValueError) as error:
+            return 400, {"error": "{name}: {error}".format(name=type(error).__name__, error=error)}
+
+
+async def _serve_connection(service, reader, writer):
+    """
+    Answer the HTTP/1.1 requests of one connection, keeping it alive until the client closes it
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target = request_line.decode("latin-1").split()[:2]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            try:
+                status, response = await service.handle(method, target.split("?")[0], body)
+            except Exception as error:
+                status, response = 500, {"error": "{name}: {error}".format(name=type(error).__name__, error=error)}
+            payload = json.dumps(response).encode()
+            keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+            writer.write("HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\nContent-Length: {length}\r\n"
+                         "Connection: {connection}\r\n\r\n".format(
+                             status=status, reason=_REASONS[status], length=len(payload),
+                             connection="keep-alive" if keep_alive else "close").encode() + payload)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(service, host="127.0.0.1", port=8765):
+    """
+    Start serving the inputted SimilarityService and return the asyncio.Server. port 0 picks a free port
+    """
+    return await asyncio.start_server(lambda reader, writer: _serve_connection(service, reader, writer), host, port)
+
+
+def serve(bom, host="127.0.0.1", port=8765, skus=None):
+    """
+    Serve similarity requests about the inputted bom until interrupted
+
+    Parameters
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    host : str, default "127.0.0.1"
+        Address to listen on
+    port : int, default 8765
+        Port to listen on
+    skus : list-like, default None
+        Codes of the products to index for top-k queries. All top level products when None
+    """
+    service = SimilarityService(bom, skus=skus)
+
+    async def main():
+        server = await start_server(service, host, port)
+        print("Serving {n} products on http://{host}:{port}".format(n=len(service.index), host=host, port=port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    from j_prdctsim.fileio import open_bom
+
+    parser = argparse.ArgumentParser(description="Serve ravisim similarity requests about a Bill of Materials")
+    parser.add_argument("bom", help="[[Parent, Component, QtyPer]] CSV or a file written by j_prdctsim.fileio.save_bom")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    serve(open_bom(args.bom), args.host, args.port)
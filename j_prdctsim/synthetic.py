@@ -0,0 +1,138 @@
+""" Synthetic Bill of Materials: Generate Bill of Materials of any size for benchmarks and tests
+
+'data/test_data/src/test_data_generator.py' builds the 21 product test BoM one row at a time. This module builds
+layered Bill of Materials (BoM) of millions of rows with vectorized numpy operations. Products sit on layer 0 and
+each item of layer d draws its components from layer d+1. The sharing ratio is the fraction of component references
+that reuse an item already used elsewhere, so layer d+1 holds about (1 - sharing) x the references made to it and
+every item of it is used at least once. Lines can skip layers and cycles can be injected to test error handling.
+
+SKU codes follow the test data: products are PROD000, ... and the components of layer d are Ld000, ...
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import numpy as np
+
+from j_prdctsim.compiled import CompiledBom
+
+
+def synthetic_bom(products=20, depth=2, fanout=(3, 10), sharing=0.5, skip=0.0, cycles=0, seed=0, compiled=False):
+    """
+    Generate a layered Bill of Materials
+
+    Parameters
+    ---------
+    products : int, default 20
+        Number of top level products
+    depth : int, default 2
+        Number of component layers below the products
+    fanout : tuple or callable, default (3, 10)
+        Number of components of each parent. (low, high) draws uniformly from low to high - 1, a callable is called
+        as fanout(rng, size) and returns size integers
+    sharing : float, default 0.5
+        Fraction of component references that reuse an item of the layer, in [0, 1). 0 builds trees
+    skip : float, default 0.0
+        Probability that a line takes its component from a random deeper layer instead of the next one
+    cycles : int, default 0
+        Number of cycles to inject. Each adds a line from a component back up to one of its ancestors
+    seed : int, default 0
+        Seed of the random generator, the same arguments always generate the same BoM
+    compiled : bool, default False
+        Return a CompiledBom built straight from integer codes instead of a [[Parent, Component, QtyPer]] table
+
+    Returns
+    ---------
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    product_skus : numpy.ndarray
+        SKU codes of the products
+    """
+    assert 0.0 <= sharing < 1.0, "sharing must be in [0, 1)"
+    rng = np.random.default_rng(seed)
+    draw = fanout if callable(fanout) else (lambda rng, size: rng.integers(fanout[0], fanout[1], size=size))
+
+    # Items are numbered globally, layer by layer
+    sizes = [products]
+    parents, components = [], []
+    for layer in range(depth):
+        counts = np.asarray(draw(rng, sizes[layer]), dtype=np.int64)
+        references = int(counts.sum())
+        size = max(1, int(np.ceil(references * (1.0 - sharing))))
+        start = sum(sizes)
+
+        # Every item of the layer is used at least once, the remaining references reuse random items
+        picks = np.concatenate([np.arange(min(size, references)), rng.integers(0, size, max(references - size, 0))])
+        rng.shuffle(picks)
+        parents.append(start - sizes[layer] + np.repeat(np.arange(sizes[layer]), counts))
+        components.append(start + picks)
+        sizes.append(size)
+    bounds = np.cumsum([0] + sizes)
+    parents = np.concatenate(parents) if parents else np.empty(0, dtype=np.int64)
+    components = np.concatenate(components) if components else np.empty(0, dtype=np.int64)
+    layers = np.searchsorted(bounds, parents, side="right") - 1
+
+    # Irregular lines take their component from a deeper layer
+    skipped = np.flatnonzero((rng.random(len(parents)) < skip) & (layers + 2 <= depth))
+    if len(skipped):
+        target = rng.integers(layers[skipped] + 2, depth + 1)
+        components[skipped] = bounds[target] + rng.integers(0, np.asarray(sizes)[target])
+
+    # Rational QtyPers in [0.1, 10] like the test data
+    qtys = np.around(rng.integers(1, 10, len(parents)) / rng.integers(1, 10, len(parents)), 3)
+
+    if cycles:
+        parents, components, qtys = _inject_cycles(parents, components, qtys, bounds[-1], cycles, rng)
+
+    skus = _layer_skus(sizes)
+    product_skus = skus[:products]
+    if compiled:
+        order = np.argsort(skus)
+        recode = np.empty(len(skus), dtype=np.int32)
+        recode[order] = np.arange(len(skus), dtype=np.int32)
+        return CompiledBom.from_edges(skus[order], recode[parents], recode[components], qtys), product_skus
+
+    bom = np.empty((len(parents), 3), dtype=object)
+    bom[:, 0] = skus[parents]
+    bom[:, 1] = skus[components]
+    bom[:, 2] = qtys
+
+    return bom, product_skus
+
+
+def _layer_skus(sizes):
+    """
+    Return the SKU code of every item, layer by layer: PROD000, ... then L1000, ... for layer 1 and so on
+    """
+    width = max(3, len(str(max(sizes) - 1)))
+    out = []
+    for layer, size in enumerate(sizes):
+        prefix = "PROD" if layer == 0 else "L{layer}".format(layer=layer)
+        out.append(np.char.add(prefix, np.char.zfill(np.arange(size).astype(str), width)))
+
+    return np.concatenate(out).astype(str)
+
+
+def _inject_cycles(parents, components, qtys, n, cycles, rng):
+    """
+    Append one line per cycle from a descendant of a random line's parent back up to that parent
+    """
+    order = np.argsort(parents, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parents, minlength=n), out=offsets[1:])
+    children = components[order]
+
+    added = []
+    for line in rng.integers(0, len(parents), cycles):
+        item = components[line]
+        for _ in range(int(rng.integers(0, 3))):  # Walk a few levels further down before closing the cycle
+            if offsets[item] == offsets[item + 1]:
+                break
+            item = children[rng.integers(offsets[item], offsets[item + 1])]
+        added.append((item, parents[line]))
+    added = np.array(added, dtype=np.int64).reshape(-1, 2)
+
+    return (np.concatenate([parents, added[:, 0]]), np.concatenate([components, added[:, 1]]),
+            np.concatenate([qtys, np.ones(len(added))]))
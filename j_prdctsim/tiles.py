@@ -0,0 +1,270 @@
+""" Tiled Similarity: Compute catalog sized ravisim matrices to disk, resumably
+
+'j_prdctsim.calc.ravisim_matrix' returns the whole similarity matrix in memory, which for a catalog of 200k products
+takes hundreds of gigabytes. This module compares the leaf requirement matrix of the products in square tiles and
+writes each tile to disk as it completes, either into a memory mapped .npy array or, with a threshold, as the sparse
+(row, column, value) entries of the scores at or above it. ravisim is symmetric, so only the tiles on and above the
+diagonal are computed. Completed tiles are appended to a checkpoint log, and a restarted job skips them.
+
+Proportions are rounded to 2 decimals by ravisim, so they are stored exactly as uint8 hundredths (value / 100 is the
+proportion, 255 marks an undefined 0 / 0 proportion) using an eighth of the space of float64.
+
+Author: J Leon Batulayan <jleon.batulayan@gmail.com>
+
+Created: 18th October, 2026
+"""
+
+# imports
+import hashlib
+import json
+import os
+import re
+import numpy as np
+
+from j_prdctsim.calc import ravisim_block
+from j_prdctsim.compiled import compile_bom
+
+META_NAME = "meta.json"
+SKUS_NAME = "skus.npy"
+MATRIX_NAME = "ravisim.npy"
+LOG_NAME = "completed.log"
+TILE_DIR = "tiles"
+TILE_NAME = re.compile(r"^\d+_\d+\.npz$")
+TEMP_SUFFIX = ".tmp"
+UNDEFINED = 255
+
+
+def ravisim_tiles(skus, bom, path, tile_size=4096, threshold=None, workers=None, verbose=1):
+    """
+    Write the ravisim similarity proportion between every pair of the inputted skus to the directory path, one
+    tile at a time. Rerunning an interrupted job with the same arguments computes only the missing tiles
+
+    Parameters
+    ---------
+    skus : list-like
+        Codes of the items to compare
+    bom : numpy.ndarray or CompiledBom
+        Bill of Materials - The table contining the parent component data and their respective quantity pers
+    path : str
+        Directory the matrix, the SKU codes of its rows and the checkpoint log are written to
+    tile_size : int, default 4096
+        Number of rows and columns of each tile, bounding the memory of each worker
+    threshold : float, default None
+        Keep only the proportions at or above threshold as sparse entries. Every proportion is written to a dense
+        memory mapped matrix when None
+    workers : int, default None
+        Number of processes computing tiles in parallel, sharing one copy of the BoM and the leaf matrix through
+        j_prdctsim.calc.shared_pool. Tiles are computed in this process when None
+    verbose : 0, 1, default 1
+        verbosity of function
+
+    Returns
+    ---------
+    out : int
+        Number of tiles computed by this call
+
+    Raises
+    ---------
+    ValueError
+        If path holds a job for other skus, another BoM or other arguments
+    """
+    bom = compile_bom(bom)
+    skus = [str(sku).strip("['']") for sku in skus]
+    os.makedirs(os.path.join(path, TILE_DIR), exist_ok=True)
+    _start_job(path, skus, bom, tile_size, threshold)
+
+    # Tiles written by an interrupted worker but never renamed into place
+    for name in os.listdir(os.path.join(path, TILE_DIR)):
+        if name.endswith(TEMP_SUFFIX):
+            os.remove(os.path.join(path, TILE_DIR, name))
+
+    n = len(skus)
+    bounds = [(start, min(start + tile_size, n)) for start in range(0, n, tile_size)]
+    done = _completed(path, repair=True)
+    tiles = [(i, j) for j in range(len(bounds)) for i in range(j + 1) if (i, j) not in done]  # Column block major
+    if verbose == 1:
+        print("Computing {n} of {total} tiles".format(n=len(tiles), total=len(bounds) * (len(bounds) + 1) // 2))
+    if not tiles:
+        return 0
+
+    with open(os.path.join(path, LOG_NAME), "a", encoding="utf-8") as log:
+        for k, (i, j) in enumerate(_run_tiles(tiles, bom, skus, (bounds, path, threshold), workers)):
+            log.write("{i} {j}\n".format(i=i, j=j))
+            log.flush()
+            os.fsync(log.fileno())
+            if verbose == 1 and (k + 1) % 100 == 0:
+                print("Computed {k} of {n} tiles".format(k=k + 1, n=len(tiles)))
+
+    return len(tiles)
+
+
+def read_tiles(path):
+    """
+    Return the similarity matrix written by ravisim_tiles and the SKU codes of its rows and columns
+
+    Parameters
+    ---------
+    path : str
+        Directory written by ravisim_tiles
+
+    Returns
+    ---------
+    out : numpy.memmap or scipy.sparse.coo_matrix
+        uint8 hundredths of the ravisim proportion between rows i and j. A read only memory mapped array, or a
+        symmetric coo_matrix of the entries at or above the threshold
+    skus : numpy.ndarray
+        SKU code of each row and column
+
+    Raises
+    ---------
+    ValueError
+        If some tiles of the job are not computed yet
+    """
+    with open(os.path.join(path, META_NAME), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    skus = np.load(os.path.join(path, SKUS_NAME))
+    n_blocks = -(-meta["skus"] // meta["tile_size"])
+    missing = n_blocks * (n_blocks + 1) // 2 - len(_completed(path))
+    if missing:
+        raise ValueError("{path} is missing {n} tiles, rerun ravisim_tiles to complete it".format(path=path, n=missing))
+    if meta["threshold"] is None:
+        return np.load(os.path.join(path, MATRIX_NAME), mmap_mode="r"), skus
+
+    import scipy.sparse as sp
+
+    rows, cols, values = [], [], []
+    for name in sorted(os.listdir(os.path.join(path, TILE_DIR))):
+        if TILE_NAME.match(name):
+            with np.load(os.path.join(path, TILE_DIR, name)) as tile:
+                rows.append(tile["rows"])
+                cols.append(tile["cols"])
+                values.append(tile["values"])
+    rows, cols, values = (np.concatenate(array) if array else np.empty(0, dtype=dtype)
+                          for array, dtype in ((rows, np.int32), (cols, np.int32), (values, np.uint8)))
+
+    # Tiles hold the upper triangle, mirror it below the diagonal
+    lower = rows != cols
+    return sp.coo_matrix((np.concatenate([values, values[lower]]),
+                          (np.concatenate([rows, cols[lower]]), np.concatenate([cols, rows[lower]]))),
+                         shape=(len(skus), len(skus))), skus
+
+
+def _start_job(path, skus, bom, tile_size, threshold):
+    """
+    Create the files of a new job in path, or check that path holds the same job
+    """
+    digest = hashlib.blake2b("\n".join(skus).encode(), digest_size=16).hexdigest()
+    meta = {"skus": len(skus), "skus_hash": digest, "bom_hash": bom.content_hash(), "tile_size": int(tile_size),
+            "threshold": None if threshold is None else float(threshold)}
+    meta_path = os.path.join(path, META_NAME)
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            if json.load(f) != meta:
+                raise ValueError("{path} holds a different similarity job".format(path=path))
+        return
+
+    # A new job starts without any completed tile
+    for name in (LOG_NAME, MATRIX_NAME):
+        if os.path.exists(os.path.join(path, name)):
+            os.remove(os.path.join(path, name))
+    for name in os.listdir(os.path.join(path, TILE_DIR)):
+        os.remove(os.path.join(path, TILE_DIR, name))
+    np.save(os.path.join(path, SKUS_NAME), np.array(skus, dtype=str))
+    if threshold is None:
+        np.lib.format.open_memmap(os.path.join(path, MATRIX_NAME), mode="w+", dtype=np.uint8,
+                                  shape=(len(skus), len(skus))).flush()
+    temp_path = "{path}.{pid}.tmp".format(path=meta_path, pid=os.getpid())
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(temp_path, meta_path)
+
+
+def _completed(path, repair=False):
+    """
+    Return the (row block, column block) of the tiles in the checkpoint log, ignoring a line left incomplete by an
+    interruption. With repair the incomplete line is also cut off the log, so that appended lines stay whole
+    """
+    log_path = os.path.join(path, LOG_NAME)
+    if not os.path.exists(log_path):
+        return set()
+    with open(log_path, "rb+" if repair else "rb") as f:
+        lines = f.read().split(b"\n")
+        if repair and lines[-1]:
+            f.truncate(f.tell() - len(lines[-1]))
+
+    return {tuple(int(block) for block in line.split()) for line in lines[:-1]}
+
+
+def _run_tiles(tiles, bom, skus, args, workers):
+    """
+    Yield the (row block, column block) of every tile once it is written, in completion order
+    """
+    global _tile_matrix, _tile_csc
+    from j_prdctsim.matrix import leaf_matrix, row_totals
+
+    if workers is None:
+        total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+        _tile_matrix = (total, row_totals(total), row_skus)
+        try:
+            for tile in tiles:
+                yield _tile_worker(*tile, *args)
+        finally:
+            _tile_matrix, _tile_csc = None, (None, None)
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from j_prdctsim.calc import shared_pool
+
+    with shared_pool(bom, workers, skus=skus) as pool:
+        pending, tiles = set(), iter(tiles)
+        for tile in tiles:
+            pending.add(pool.submit(_tile_worker, *tile, *args))
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+_tile_matrix = None
+_tile_csc = (None, None)
+
+
+def _tile_worker(i, j, bounds, path, threshold):
+    """
+    Compute one tile and write it, the inverted index of the column block is reused for consecutive tiles. A
+    shared_pool worker reads the leaf matrix from shared memory
+    """
+    global _tile_matrix, _tile_csc
+    if _tile_matrix is None:
+        from j_prdctsim import calc
+        bom, total, total_csc, totals, row_skus, rows, memory = calc._shared
+        _tile_matrix = (total, totals, row_skus)
+    total, totals, row_skus = _tile_matrix
+    (start, stop), (col_start, col_stop) = bounds[i], bounds[j]
+    if _tile_csc[0] != j:
+        _tile_csc = (j, total[col_start:col_stop].tocsc())
+    proportion = ravisim_block(total, _tile_csc[1], totals, row_skus, start, stop, col_start)
+    values = np.where(np.isnan(proportion), UNDEFINED, np.rint(proportion * 100)).astype(np.uint8)
+
+    if threshold is None:
+        matrix = np.load(os.path.join(path, MATRIX_NAME), mmap_mode="r+")
+        matrix[start:stop, col_start:col_stop] = values
+        matrix[col_start:col_stop, start:stop] = values.T
+        matrix.flush()
+        del matrix
+    else:
+        keep = proportion >= threshold
+        if i == j:  # Diagonal tiles keep their upper triangle
+            keep &= np.triu(np.ones(keep.shape, dtype=bool))
+        rows, cols = np.nonzero(keep)
+        tile_path = os.path.join(path, TILE_DIR, "{i}_{j}.npz".format(i=i, j=j))
+        # Written through a file object, so numpy does not append .npz to the temporary name read_tiles skips
+        temp_path = "{path}.{pid}{suffix}".format(path=tile_path, pid=os.getpid(), suffix=TEMP_SUFFIX)
+        with open(temp_path, "wb") as f:
+            np.savez(f, rows=(rows + start).astype(np.int32), cols=(cols + col_start).astype(np.int32),
+                     values=values[keep])
+        os.replace(temp_path, tile_path)
+
+    return i, j
@@ -22,5 +22,12 @@ setuptools.setup(
     ],
     package_dir={"j_prdctsim": "j_prdctsim"},
     packages=setuptools.find_packages(),
-    python_requires=">=3.6",
+    python_requires=">=3.8",
+    install_requires=["numpy", "scipy", "pandas"],
+    extras_require={
+        "plot": ["matplotlib", "networkx", "pydot"],
+    },
+    entry_points={
+        "console_scripts": ["j_prdctsim=j_prdctsim.cli:main"],
+    },
 )
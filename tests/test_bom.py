@@ -197,4 +197,42 @@ def test_components_PROD019(load_bom, load_skus):
     ]
     assert out==expected, out
 
-# python -m pytest tests/
\ No newline at end of file
+# python -m pytest tests/
+def test_sku_usage_L2013(load_bom):
+    """
+    Test j_prdctsim.bom.sku_usage on L2013, used directly by products and through L1 components
+    """
+    bom = load_bom.to_numpy()
+    out = j_prdctsim.bom.sku_usage("L2013", bom)
+    parents = sorted(set(bom[bom[:, 1] == "L2013"][:, 0]))
+    assert out[0] == parents[0]
+    assert set(parents) <= set(out) and len(out) == len(set(out))
+    for sku in out:
+        assert "L2013" in j_prdctsim.bom.components(sku, bom)
+
+def test_highestlevel_usage(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    out = j_prdctsim.bom.highestlevel_usage("L2013", bom)
+    expected = [sku for sku in j_prdctsim.bom.sku_usage("L2013", bom) if sku not in bom[:, 1]]
+    assert out == sorted(expected)
+    assert set(out) <= set(skus)
+    assert j_prdctsim.bom.highestlevel_usage("PROD000", bom) == ["PROD000"]
+    assert j_prdctsim.bom.highestlevel_usage("NEW_ITEM", bom) == ["NEW_ITEM"]
+
+def test_fingerprint_duplicate_products(load_bom):
+    bom = load_bom.to_numpy()
+    copies = np.array([["PROD900", comp, qty] for parent, comp, qty in bom if parent == "PROD003"], dtype=object)
+    bom = np.concatenate([bom, copies])
+    assert j_prdctsim.bom.fingerprint("PROD900", bom) == j_prdctsim.bom.fingerprint("PROD003", bom)
+    assert j_prdctsim.bom.fingerprint("PROD900", bom) != j_prdctsim.bom.fingerprint("PROD004", bom)
+    assert j_prdctsim.bom.fingerprint("PROD900", bom, names=True) != j_prdctsim.bom.fingerprint("PROD003", bom, names=True)
+    assert len(j_prdctsim.bom.fingerprint("NEW_ITEM", bom)) == 32
+    assert j_prdctsim.bom.duplicate_products(bom) == [["PROD003", "PROD900"]]
+    assert j_prdctsim.bom.duplicate_products(bom, skus=["PROD900", "PROD004", "NEW_ITEM"]) == []
+
+    # Products listing the same lines in another order are duplicates
+    bom = np.concatenate([bom, copies[::-1]])
+    bom[len(bom) - len(copies):, 0] = "PROD901"
+    assert j_prdctsim.bom.fingerprint("PROD901", bom) != j_prdctsim.bom.fingerprint("PROD003", bom)
+    assert j_prdctsim.bom.duplicate_products(bom) == [["PROD003", "PROD900", "PROD901"]]
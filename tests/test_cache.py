@@ -0,0 +1,110 @@
+import pytest
+from j_prdctsim.cache import ExplosionCache
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.matrix import leaf_matrix
+from j_prdctsim.profiling import Profile
+import j_prdctsim.bom
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+def cached_bom(bom, path, max_bytes=1 << 30):
+    cbom = compile_bom(bom, cache=False)
+    cbom.explosion_cache = ExplosionCache(path, max_bytes=max_bytes)
+    return cbom
+
+def test_leaf_matrix_cache(tmp_path, load_bom):
+    bom = load_bom.to_numpy()
+    skus = ["PROD003", "NEW_ITEM", "L1037", "PROD003", "PROD000"]
+    for rows in (None, skus):
+        expected, expected_rows, expected_leaves = leaf_matrix(bom, skus=rows, decimals=6)
+        for run in range(2):
+            with Profile() as profile:
+                total, row_skus, leaf_skus = leaf_matrix(cached_bom(bom, str(tmp_path)), skus=rows, decimals=6)
+            assert (total != expected).nnz == 0 and total.has_sorted_indices
+            assert list(row_skus) == list(expected_rows) and list(leaf_skus) == list(expected_leaves)
+        assert profile.counters["explosion_cache_misses"] == 0 and profile.counters["explosions"] == 0
+
+    # Raw and rounded explosions are kept apart
+    expected = leaf_matrix(bom, skus=skus)[0]
+    assert (leaf_matrix(cached_bom(bom, str(tmp_path)), skus=skus)[0] != expected).nnz == 0
+
+def test_leaf_matrix_cache_changed_bom(tmp_path, load_bom):
+    bom = load_bom.to_numpy()
+    leaf_matrix(cached_bom(bom, str(tmp_path)), decimals=6)
+
+    # Only the items above the edited line are exploded again
+    changed = bom.copy()
+    line = np.flatnonzero(changed[:, 0] == "L1037")[0]
+    changed[line, 2] = changed[line, 2] * 2
+    above = set(j_prdctsim.bom.sku_usage("L1037", bom)) | {"L1037"}
+    with Profile() as profile:
+        total, row_skus, leaf_skus = leaf_matrix(cached_bom(changed, str(tmp_path)), decimals=6)
+    assert profile.counters["explosions"] == len(above & set(row_skus))
+    assert (total != leaf_matrix(changed, decimals=6)[0]).nnz == 0
+
+def test_explosion_cache_eviction(tmp_path, load_bom):
+    bom = load_bom.to_numpy()
+    cache = ExplosionCache(str(tmp_path), max_bytes=None)
+    cbom = compile_bom(bom)
+    keys = cache.keys(cbom, np.arange(5))
+    for i, key in enumerate(keys):
+        cache.put(key, ["A", "B{i}".format(i=i)], [0.5, 1.25])
+        os.utime(cache._entry_path(key), ns=(i, i))
+    names, qtys = cache.get(keys[1])
+    assert list(names) == [b"A", b"B1"] and list(qtys) == [0.5, 1.25]
+
+    # Reading keys[1] made it the most recently used
+    cache.max_bytes = 2 * os.path.getsize(cache._entry_path(keys[0]))
+    assert cache.evict() == 3
+    assert cache.get(keys[0]) is None and cache.get(keys[4]) is not None and cache.get(keys[1]) is not None
+    with open(cache._entry_path(keys[4]), "r+b") as f:
+        f.truncate(20)
+    assert cache.get(keys[4]) is None
+    cache.clear()
+    assert cache.get(keys[1]) is None
+
+def test_explosion_cache_read_only(tmp_path, load_bom, monkeypatch):
+    cache = ExplosionCache(str(tmp_path))
+    key = cache.keys(compile_bom(load_bom.to_numpy()), [0])[0]
+    cache.put(key, ["A"], [2.0])
+
+    def utime(path, *args, **kwargs):
+        raise PermissionError(path)
+
+    monkeypatch.setattr(os, "utime", utime)
+    names, qtys = cache.get(key)
+    assert list(names) == [b"A"] and list(qtys) == [2.0]
+
+def test_explosion_cache_failed_put(tmp_path, load_bom, monkeypatch):
+    cache = ExplosionCache(str(tmp_path))
+    key = cache.keys(compile_bom(load_bom.to_numpy()), [0])[0]
+
+    def replace(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        cache.put(key, ["A"], [2.0])
+    assert os.listdir(os.path.dirname(cache._entry_path(key))) == []
+    with pytest.raises(TypeError):
+        cache.put(key, ["A"], None)
+    assert os.listdir(os.path.dirname(cache._entry_path(key))) == []
+
+def test_explosion_cache_threads(tmp_path, load_bom):
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = ExplosionCache(str(tmp_path))
+    key = cache.keys(compile_bom(load_bom.to_numpy()), [0])[0]
+    leaves = ["L{n}".format(n=n) for n in range(1000)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: cache.put(key, leaves, np.arange(1000.0)), range(64)))
+    names, qtys = cache.get(key)
+    assert len(names) == 1000 and list(qtys) == list(np.arange(1000.0))
+    assert os.listdir(os.path.dirname(cache._entry_path(key))) == [os.path.basename(cache._entry_path(key))]
@@ -2,9 +2,12 @@ from cgi import test
 from unittest import expectedFailure
 import pytest
 import j_prdctsim.calc 
+import j_prdctsim.matrix
 import numpy as np
 import pandas as pd
 import os
+import subprocess
+import sys
 
 
 @pytest.fixture
@@ -105,3 +108,83 @@ def test_ravisim_PROD007_PR013(load_bom):
     assert output == expected, f"Between items {sku1} annd {sku2}, ravisim calculates a proportion of {output} while {expected} was expected"
     assert inv_output == expected, f"Between items {sku2} annd {sku1}, ravisim calculates a proportion of {inv_output} while {expected} was expected"
 
+
+def test_ravisim_matrix_matches_ravisim(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1)) + ["SAMPLE_SKU", "L1025"]
+    output = j_prdctsim.calc.ravisim_matrix(skus, bom, block_size=5)
+    assert output.shape == (len(skus), len(skus))
+    for i, sku1 in enumerate(skus):
+        for j, sku2 in enumerate(skus):
+            expected = j_prdctsim.calc.ravisim(sku1, sku2, bom)
+            assert output[i, j] == expected, f"Between items {sku1} annd {sku2}, ravisim_matrix calculates a proportion of {output[i, j]} while {expected} was expected"
+
+def test_ravisim_matrix_workers(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    expected = j_prdctsim.calc.ravisim_matrix(skus, bom)
+    output = j_prdctsim.calc.ravisim_matrix(skus, bom, block_size=4, workers=2)
+    np.testing.assert_array_equal(output, expected)
+    assert (np.diag(output) == 1.0).all()
+    np.testing.assert_array_equal(output, output.T)
+
+def test_ravisim_pairs(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    skus1 = skus + ["SAMPLE_SKU", "PROD000"]
+    skus2 = skus[::-1] + ["PROD000", "PROD000"]
+    output = j_prdctsim.calc.ravisim_pairs(skus1, skus2, bom)
+    expected = [j_prdctsim.calc.ravisim(sku1, sku2, bom) for sku1, sku2 in zip(skus1, skus2)]
+    assert list(output) == expected
+    assert list(j_prdctsim.calc.ravisim_pairs(skus1, skus2, bom, workers=2, chunksize=5)) == expected
+
+def shared_worker_leaf_rows():
+    from j_prdctsim.matrix import leaf_matrix
+
+    return list(leaf_matrix(j_prdctsim.calc._shared[0], decimals=6)[1])
+
+def test_shared_pool_subset(load_bom):
+    bom = load_bom.to_numpy()
+    products = list(j_prdctsim.matrix.leaf_matrix(bom, decimals=6)[1])
+    with j_prdctsim.calc.shared_pool(bom, 2, skus=["PROD000", "PROD001"]) as pool:
+        assert pool.submit(shared_worker_leaf_rows).result() == products
+        output = pool.submit(j_prdctsim.calc.shared_ravisim, ["PROD000", "PROD005"], ["PROD001", "PROD000"]).result()
+    assert list(output) == [j_prdctsim.calc.ravisim("PROD000", "PROD001", bom),
+                            j_prdctsim.calc.ravisim("PROD005", "PROD000", bom)]
+
+def test_ravisim_profile(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    skus1 = skus + ["SAMPLE_SKU", "PROD000"]
+    skus2 = skus[::-1] + ["PROD000", "PROD000"]
+    profiles, combined = j_prdctsim.calc.ravisim_profile_pairs(skus1, skus2, bom, depth=2, weights=[1, 1, 2])
+    assert profiles.shape == (len(skus1), 3)
+    assert list(profiles[:, -1]) == [j_prdctsim.calc.ravisim(sku1, sku2, bom) for sku1, sku2 in zip(skus1, skus2)]
+    assert (profiles[-1] == 1.0).all() and combined[-1] == 1.0
+    assert (profiles[-2] == 0.0).all() and combined[-2] == 0.0
+
+    # Identical items are only compared at the depths they reach
+    profiles, combined = j_prdctsim.calc.ravisim_profile_pairs(["L2013", "L2013"], ["L2013", "L2014"], bom, depth=2)
+    assert np.isnan(profiles[:, :2]).all() and list(profiles[:, 2]) == [1.0, 0.0] and list(combined) == [1.0, 0.0]
+
+    # Depths neither item reaches are left out of the combination
+    profiles, combined = j_prdctsim.calc.ravisim_profile_pairs(["SAMPLE_SKU"], ["L1037"], bom, depth=2)
+    assert np.isnan(profiles[0, 1]) and combined[0] == round(np.nanmean(profiles[0]), 2)
+
+    # Equal weights average the defined depths
+    profile, combined = j_prdctsim.calc.ravisim_profile("PROD000", "PROD001", bom)
+    assert len(profile) == 4 and profile[-1] == j_prdctsim.calc.ravisim("PROD000", "PROD001", bom)
+    assert combined == round(np.nanmean(profile), 2)
+    with pytest.raises(ValueError):
+        j_prdctsim.calc.ravisim_profile("PROD000", "PROD001", bom, depth=2, weights=[1, 1])
+
+def test_numeric_import_is_light():
+    """
+    The numeric path must not load the plotting stack, scipy or pandas
+    """
+    code = ("import sys, j_prdctsim.calc, j_prdctsim.bom; "
+            "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))")
+    modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                             cwd=os.getcwd()).stdout.split()
+    for heavy in ["matplotlib", "networkx", "scipy", "pandas", "concurrent"]:
+        assert heavy not in modules, f"importing j_prdctsim.calc loads {heavy}"
@@ -0,0 +1,67 @@
+import pytest
+import j_prdctsim.cli
+from j_prdctsim.calc import ravisim
+import numpy as np
+import pandas as pd
+import csv
+import os
+
+
+@pytest.fixture
+def bom_path():
+    return os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv")
+
+@pytest.fixture
+def pairs_path(tmp_path):
+    skus = ["PROD{n:03d}".format(n=n) for n in range(21)] + ["L1037", "UNKNOWN"]
+    rng = np.random.default_rng(0)
+    path = os.path.join(str(tmp_path), "pairs.csv")
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sku1", "sku2"])
+        writer.writerows(rng.choice(skus, (57, 2)).tolist())
+    return path
+
+def expected_scores(bom_path, pairs_path):
+    bom = pd.read_csv(bom_path).to_numpy()
+    pairs = pd.read_csv(pairs_path).to_numpy()
+    return [ravisim(sku1, sku2, bom) for sku1, sku2 in pairs]
+
+def test_similarity(tmp_path, bom_path, pairs_path):
+    out_path = os.path.join(str(tmp_path), "scores.csv")
+    cache = ["--cache", os.path.join(str(tmp_path), "explosions")]
+    for options in (["--workers", "1"], ["--workers", "2"], ["--workers", "1", "--no-catalog"],
+                    ["--workers", "2"] + cache, ["--workers", "1"] + cache):
+        assert j_prdctsim.cli.main(["similarity", "--bom", bom_path, "--pairs", pairs_path, "--out", out_path,
+                                    "--chunksize", "10", "--quiet"] + options) == 0
+        scores = pd.read_csv(out_path)
+        assert list(scores.columns) == j_prdctsim.cli.OUTPUT_HEADER
+        assert scores["sku1"].tolist() == pd.read_csv(pairs_path)["sku1"].tolist()
+        assert scores["proportion"].tolist() == expected_scores(bom_path, pairs_path)
+
+def test_similarity_resume(tmp_path, bom_path, pairs_path):
+    bom = pd.read_csv(bom_path).to_numpy()
+    out_path = os.path.join(str(tmp_path), "scores.csv")
+    j_prdctsim.cli.main(["similarity", "--bom", bom_path, "--pairs", pairs_path, "--out", out_path, "--quiet"])
+    with open(out_path, "rb") as f:
+        complete = f.read()
+
+    # An interrupted job leaves some complete rows and one cut off row
+    lines = complete.split(b"\n")
+    with open(out_path, "wb") as f:
+        f.write(b"\n".join(lines[:21]) + b"\n" + lines[21][:5])
+    assert j_prdctsim.cli.scored_pairs(out_path) == 20
+    assert j_prdctsim.cli.similarity(bom, pairs_path, out_path, chunksize=7, resume=True, verbose=0) == 37
+    with open(out_path, "rb") as f:
+        assert f.read() == complete
+
+def test_similarity_bad_row(tmp_path, bom_path, pairs_path, capsys):
+    with open(pairs_path, "a", newline="") as f:
+        f.write("PROD001\nPROD002,PROD003\n")
+    with pytest.raises(ValueError, match="line 59"):
+        list(j_prdctsim.cli.read_pairs(pairs_path, chunksize=10))
+    out_path = os.path.join(str(tmp_path), "scores.csv")
+    assert j_prdctsim.cli.main(["similarity", "--bom", bom_path, "--pairs", pairs_path, "--out", out_path,
+                                "--chunksize", "10", "--quiet"]) == 1
+    assert "line 59" in capsys.readouterr().err
+    assert j_prdctsim.cli.scored_pairs(out_path) == 50  # The chunks before the bad row
@@ -0,0 +1,89 @@
+import pytest
+import j_prdctsim.cluster
+import j_prdctsim.tiles
+from j_prdctsim.calc import ravisim_matrix
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.spatial.distance import squareform
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def random_graph(seed, n=40):
+    rng = np.random.default_rng(seed)
+    similarity = rng.random((n, n))
+    similarity[rng.random((n, n)) < 0.5] = 0.0
+    similarity = np.triu(similarity, 1)
+    return similarity + similarity.T
+
+def test_similarity_graph(load_bom, load_skus, tmp_path):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    dense = ravisim_matrix(skus, bom)
+    expected = np.where(dense >= 0.1, dense, 0.0)
+    np.fill_diagonal(expected, 0.0)
+    graph, row_skus = j_prdctsim.cluster.similarity_graph(skus, bom, threshold=0.1, block_size=6)
+    assert list(row_skus) == skus
+    assert np.array_equal(graph.toarray(), expected)
+    assert np.array_equal(j_prdctsim.cluster.as_graph(dense, threshold=0.1, block_size=5).toarray(), expected)
+
+    j_prdctsim.tiles.ravisim_tiles(skus, bom, str(tmp_path), tile_size=8, verbose=0)
+    matrix = j_prdctsim.tiles.read_tiles(str(tmp_path))[0]
+    assert np.array_equal(j_prdctsim.cluster.as_graph(matrix, threshold=0.1).toarray(), expected)
+
+def test_connected_components():
+    similarity = random_graph(0)
+    labels = j_prdctsim.cluster.connected_components(sp.csr_matrix(similarity), threshold=0.8)
+    assert labels.dtype == np.int32 and labels[0] == 0
+    assert np.all(np.diff(np.maximum.accumulate(labels)) <= 1)  # Numbered in order of their first row
+    for i, j in zip(*np.nonzero(similarity >= 0.8)):
+        assert labels[i] == labels[j]
+    assert len(np.unique(labels)) == sp.csgraph.connected_components(sp.csr_matrix(similarity >= 0.8))[0]
+
+def test_average_linkage():
+    """
+    Missing pairs count as 0, so the clusters match average linkage of the dense 1 - similarity distances
+    """
+    for seed in range(5):
+        similarity = random_graph(seed)
+        distances = 1.0 - similarity
+        np.fill_diagonal(distances, 0.0)
+        tree = linkage(squareform(distances, checks=False), "average")
+        for threshold in (0.2, 0.35, 0.5):
+            labels = j_prdctsim.cluster.average_linkage(sp.csr_matrix(similarity), threshold)
+            expected = j_prdctsim.cluster._compact(fcluster(tree, 1.0 - threshold, "distance"))
+            assert np.array_equal(labels, expected)
+
+def test_medoid_clusters():
+    similarity = random_graph(1)
+    labels, medoids = j_prdctsim.cluster.medoid_clusters(sp.csr_matrix(similarity), threshold=0.3)
+    assert labels.dtype == np.int32 and medoids.dtype == np.int32
+    assert np.array_equal(labels[medoids], np.arange(len(medoids)))
+    for row, label in enumerate(labels):
+        assert row == medoids[label] or similarity[row, medoids[label]] >= 0.3
+
+def test_representatives():
+    similarity = np.array([[0, .9, .5, 0], [.9, 0, .8, 0], [.5, .8, 0, 0], [0, 0, 0, 0]])
+    out = j_prdctsim.cluster.representatives(sp.csr_matrix(similarity), np.array([0, 0, 0, 1]))
+    assert list(out) == [1, 3]
+
+def test_cluster_products(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    for method in ("components", "average", "medoid"):
+        labels, representatives, row_skus = j_prdctsim.cluster.cluster_products(skus, bom, threshold=0.2, method=method)
+        assert len(labels) == len(skus) and len(representatives) == labels.max() + 1
+        assert np.array_equal(labels[representatives], np.arange(len(representatives)))
+    with pytest.raises(ValueError):
+        j_prdctsim.cluster.cluster_products(skus, bom, method="kmeans")
@@ -0,0 +1,308 @@
+import pytest
+import j_prdctsim.bom
+import j_prdctsim.calc
+from j_prdctsim.compiled import BomCycleError, CompiledBom, LeafVector, compile_bom
+from j_prdctsim.profiling import Profile
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def test_compiled_structure(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    assert len(cbom.children) == len(bom)
+    assert cbom.offsets[0] == 0 and cbom.offsets[-1] == len(bom)
+    assert list(cbom.skus) == sorted(set(bom[:, 0]) | set(bom[:, 1]))
+    assert compile_bom(cbom) is cbom
+
+    # Every BoM line is represented once, children kept in row order
+    code = cbom.code("PROD000")
+    comps, qtys = cbom.children_of(code)
+    sku_table = bom[bom[:, 0] == "PROD000"]
+    assert list(cbom.skus[comps]) == list(sku_table[:, 1])
+    np.testing.assert_array_equal(qtys, sku_table[:, 2].astype(np.float64))
+
+def test_compile_bom_cache(load_bom):
+    """
+    A table is compiled once for every call with it, and again once it is edited
+    """
+    bom = load_bom.to_numpy()
+    with Profile() as profile:
+        cbom = compile_bom(bom)
+        assert compile_bom(bom) is cbom and compile_bom(load_bom.to_numpy()) is not cbom
+        assert compile_bom(list(bom)) is cbom
+    assert profile.counters["compilations"] == 2
+    assert compile_bom(bom, cache=False) is not cbom
+
+    edited = bom.copy()
+    edited[0, 2] = edited[0, 2] * 2
+    assert compile_bom(edited) is not cbom and compile_bom(bom) is cbom
+    bom[0, 2] = bom[0, 2] * 2
+    assert compile_bom(bom) is not cbom
+
+    # A compiled table edited through apply_changes no longer matches its table
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    cbom.apply_changes([("set", "PROD000", "L1043", 1.0)])
+    assert compile_bom(bom) is not cbom
+
+def test_compiled_code_lookup(load_bom):
+    cbom = compile_bom(load_bom.to_numpy())
+    assert cbom.skus[cbom.code("L1003")] == "L1003"
+    assert cbom.code("NEW_ITEM") == -1
+    assert cbom.is_leaf(cbom.code("L2024"))
+    assert not cbom.is_leaf(cbom.code("PROD000"))
+
+def test_compiled_parents(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    parents = cbom.skus[cbom.parents_of(cbom.code("L2013"))]
+    assert sorted(parents) == sorted(bom[bom[:, 1] == "L2013"][:, 0])
+
+def test_compiled_without_qtyper(load_bom):
+    cbom = CompiledBom.from_array(load_bom.to_numpy()[:, :2])
+    assert (cbom.qtys == 1.0).all()
+
+def test_compiled_matches_table(load_bom, load_skus):
+    """
+    Every function in j_prdctsim.bom returns the same output for the table and its compiled form
+    """
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    for prod in load_skus.to_numpy().reshape(-1):
+        assert j_prdctsim.bom.components(prod, cbom) == j_prdctsim.bom.components(prod, bom)
+        assert j_prdctsim.bom.edges(prod, cbom) == j_prdctsim.bom.edges(prod, bom)
+        np.testing.assert_array_equal(
+            j_prdctsim.bom.leafcomponents_qp(prod, cbom), j_prdctsim.bom.leafcomponents_qp(prod, bom))
+    assert j_prdctsim.bom.sku_usage("L2013", cbom) == j_prdctsim.bom.sku_usage("L2013", bom)
+
+def test_leaf_vector_shared_subassembly(load_bom):
+    """
+    L1004 is used by L1025 and directly by products, its explosion is computed once and reused
+    """
+    cbom = compile_bom(load_bom.to_numpy())
+    shared = cbom.code("L1004")
+    leaf_codes, unit_qtys = cbom.leaf_vector(cbom.code("L1025"))
+    assert shared in cbom._leaf_cache
+    assert (np.diff(leaf_codes) > 0).all()
+    assert cbom.leaf_vector(shared) is cbom._leaf_cache[shared]
+
+def test_leaf_cache_lru_bound(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom, cache=False)
+    cbom.leaf_cache_size = 5
+    for prod in load_skus.to_numpy().reshape(-1):
+        out = j_prdctsim.bom.leafcomponents_qp(prod, cbom, qty=2.5)
+        np.testing.assert_array_equal(out, j_prdctsim.bom.leafcomponents_qp(prod, bom, qty=2.5))
+        assert len(cbom._leaf_cache) <= 5
+    cbom.clear_cache()
+    assert len(cbom._leaf_cache) == 0
+
+def test_caches_through_table_calls(load_bom, load_skus):
+    """
+    Explosions and similarities are memoized for callers passing the numpy table
+    """
+    bom = load_bom.to_numpy()
+    prods = load_skus.to_numpy().reshape(-1)
+    expected = [j_prdctsim.bom.leafcomponents_qp(prod, compile_bom(bom, cache=False)) for prod in prods]
+    for prod in prods:
+        j_prdctsim.bom.leafcomponents_qp(prod, bom)
+    j_prdctsim.calc.ravisim(prods[0], prods[1], bom)
+    with Profile() as profile:
+        for prod, out in zip(prods, expected):
+            np.testing.assert_array_equal(j_prdctsim.bom.leafcomponents_qp(prod, bom), out)
+        j_prdctsim.calc.ravisim(prods[0], prods[1], bom)
+    assert profile.counters["compilations"] == 0 and profile.counters["nodes_visited"] == 0
+    assert profile.counters["leaf_cache_hits"] >= len(prods) and profile.counters["similarity_cache_hits"] == 1
+
+def test_rounded_leaf_vector_ties(load_bom):
+    """
+    PROD004 needs 1.8221875 of L2018 at qty 2.5, a rounding tie settled the same way as a path by path explosion
+    """
+    cbom = compile_bom(load_bom.to_numpy())
+    code, leaf = cbom.code("PROD004"), cbom.code("L2018")
+    leaf_codes, leaf_qtys = cbom.rounded_leaf_vector(code, 2.5)
+    assert leaf_qtys[np.searchsorted(leaf_codes, leaf)] == np.around(cbom.path_sum(code, leaf, 2.5), 6)
+
+def test_apply_changes_matches_rebuild(load_bom, load_skus):
+    """
+    Editing a compiled bom in place gives the same results as compiling the edited table
+    """
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    cbom = compile_bom(bom)
+    for prod in skus:
+        j_prdctsim.bom.leafcomponents_qp(prod, cbom)
+    j_prdctsim.calc.ravisim("PROD000", "PROD001", cbom)
+    j_prdctsim.calc.ravisim("PROD002", "PROD003", cbom)
+
+    dirty = cbom.apply_changes([
+        ("set", "L1043", "L2022", 4.5),
+        ("add", "L1043", "L3000", 2.0),
+        ("remove", "PROD002", "L2013"),
+        ("add", "NEW_PROD", "L1043", 1.0),
+    ])
+    assert "L1043" in dirty and "PROD000" in dirty and "NEW_PROD" in dirty and "PROD002" in dirty
+    assert "PROD001" not in dirty and "L2022" not in dirty
+
+    edited = pd.DataFrame(bom, columns=["Parent", "Component", "QtyPer"])
+    edited.loc[(edited.Parent == "L1043") & (edited.Component == "L2022"), "QtyPer"] = 4.5
+    edited = edited[~((edited.Parent == "PROD002") & (edited.Component == "L2013"))]
+    edited = pd.concat([edited, pd.DataFrame([["L1043", "L3000", 2.0], ["NEW_PROD", "L1043", 1.0]], columns=edited.columns)])
+    rebuilt = compile_bom(edited.to_numpy())
+    np.testing.assert_array_equal(cbom.skus, rebuilt.skus)
+    np.testing.assert_array_equal(cbom.offsets, rebuilt.offsets)
+    np.testing.assert_array_equal(cbom.children, rebuilt.children)
+    np.testing.assert_array_equal(cbom.qtys, rebuilt.qtys)
+
+    for prod in list(skus) + ["NEW_PROD"]:
+        np.testing.assert_array_equal(
+            j_prdctsim.bom.leafcomponents_qp(prod, cbom), j_prdctsim.bom.leafcomponents_qp(prod, rebuilt))
+    for sku1, sku2 in [("PROD000", "PROD001"), ("PROD002", "PROD003"), ("NEW_PROD", "PROD000")]:
+        assert j_prdctsim.calc.ravisim(sku1, sku2, cbom) == j_prdctsim.calc.ravisim(sku1, sku2, rebuilt)
+
+def test_apply_changes_keeps_clean_cache(load_bom):
+    cbom = compile_bom(load_bom.to_numpy())
+    j_prdctsim.calc.ravisim("PROD000", "PROD001", cbom)
+    j_prdctsim.calc.ravisim("PROD003", "PROD004", cbom)
+    clean = cbom.leaf_vector(cbom.code("PROD003"))
+    dirty = cbom.apply_changes([("set", "PROD000", "L1043", 1.0)])
+    assert list(dirty) == ["PROD000"]
+    assert cbom.leaf_vector(cbom.code("PROD003")) is clean
+    assert cbom.cached_similarity(cbom.code("PROD003"), cbom.code("PROD004")) is not None
+    assert cbom.cached_similarity(cbom.code("PROD000"), cbom.code("PROD001")) is None
+    with pytest.raises(ValueError):
+        cbom.apply_changes([("remove", "PROD000", "L2000")])
+
+def test_apply_changes_failure_leaves_bom(load_bom):
+    """
+    A change that closes a cycle or removes a missing line leaves the BoM and its caches unchanged
+    """
+    cbom = compile_bom(load_bom.to_numpy(), cache=False)
+    j_prdctsim.calc.ravisim("PROD000", "PROD001", cbom)
+    expected = j_prdctsim.bom.leafcomponents_qp("PROD000", cbom)
+    arrays = [array.copy() for array in (cbom.skus, cbom.offsets, cbom.children, cbom.qtys)]
+    for changes, error in [([("add", "L2033", "PROD000", 1.0)], BomCycleError),
+                           ([("add", "NEW_PROD", "L1043", 1.0), ("remove", "PROD000", "NEW_ITEM")], ValueError)]:
+        with pytest.raises(error):
+            cbom.apply_changes(changes)
+        for array, before in zip((cbom.skus, cbom.offsets, cbom.children, cbom.qtys), arrays):
+            np.testing.assert_array_equal(array, before)
+        np.testing.assert_array_equal(j_prdctsim.bom.leafcomponents_qp("PROD000", cbom), expected)
+        assert cbom.cached_similarity(cbom.code("PROD000"), cbom.code("PROD001")) is not None
+    assert list(cbom.apply_changes([("add", "NEW_PROD", "L1043", 1.0)])) == ["NEW_PROD"]
+
+def test_low_level_codes(load_bom):
+    cbom = compile_bom(load_bom.to_numpy())
+    levels = cbom.low_level_codes()
+    parents = cbom.parent_codes()
+    assert (levels[cbom.children] > levels[parents]).all()
+    assert levels[cbom.code("PROD000")] == 0
+    assert levels[cbom.code("L1003")] >= 1
+
+def test_deep_bom_is_iterative():
+    n = 5000
+    bom = np.array([["N{i:05d}".format(i=i), "N{i:05d}".format(i=i + 1), 1.0] for i in range(n)], dtype=object)
+    cbom = compile_bom(bom)
+    assert len(j_prdctsim.bom.components("N00000", cbom)) == n
+    assert len(j_prdctsim.bom.edges("N00000", cbom)) == n
+    assert j_prdctsim.bom.highestlevel_usage("N05000", cbom) == ["N00000"]
+    assert cbom.low_level_codes()[-1] == n
+    out = j_prdctsim.bom.leafcomponents_qp("N00000", cbom)
+    assert list(out[:, 0]) == ["N05000"] and out[0, 1] == 1.0
+
+def test_cycle_is_reported(load_bom):
+    bom = load_bom.to_numpy()
+    bom = np.vstack([bom, [["L2033", "PROD000", 1.0]]])
+    cbom = compile_bom(bom)
+    with pytest.raises(BomCycleError) as error:
+        j_prdctsim.bom.components("PROD000", cbom)
+    assert error.value.cycle[0] == error.value.cycle[-1] == "PROD000"
+    assert error.value.cycle == ["PROD000", "L1037", "L2033", "PROD000"]
+    for call in (lambda: cbom.leaf_vector(cbom.code("PROD000")),
+                 lambda: cbom.ancestor_set(cbom.code("L2033")),
+                 lambda: cbom.low_level_codes(),
+                 lambda: j_prdctsim.bom.edges("PROD000", cbom)):
+        with pytest.raises(BomCycleError):
+            call()
+
+def test_leaf_vector_type(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    for sku in ["PROD000", "PROD002", "L1003", "L2024", "NEW_ITEM"]:
+        vector = j_prdctsim.bom.leafcomponents_qp(sku, cbom, 2.0, as_vector=True)
+        assert isinstance(vector, LeafVector) and vector.codes.dtype == np.int32
+        np.testing.assert_array_equal(vector.to_array(), j_prdctsim.bom.leafcomponents_qp(sku, bom, 2.0))
+    with pytest.raises(AttributeError):
+        vector.extra = 1
+
+def test_leaf_vector_overlap(load_bom):
+    bom = load_bom.to_numpy()
+    leaves1 = j_prdctsim.bom.leafcomponents_qp("PROD000", bom)
+    leaves2 = j_prdctsim.bom.leafcomponents_qp("PROD001", bom)
+    vector1 = j_prdctsim.bom.leafcomponents_qp("PROD000", bom, as_vector=True)
+    vector2 = j_prdctsim.bom.leafcomponents_qp("PROD001", bom, as_vector=True)
+    shared = sorted(set(leaves1[:, 0]) & set(leaves2[:, 0]))
+    positions, other_positions = vector1.intersection(vector2)
+    assert list(vector1.leaf_skus()[positions]) == shared == list(vector2.leaf_skus()[other_positions])
+    expected = sum(min(leaves1[leaves1[:, 0] == leaf][0][1], leaves2[leaves2[:, 0] == leaf][0][1]) for leaf in shared)
+    assert vector1.min_sum(vector2) == pytest.approx(expected)
+    assert vector1.total() == np.sum(leaves1[:, 1])
+
+    # Vectors from different dictionaries are compared on their SKU codes
+    missing = LeafVector(np.array([0, 1], dtype=np.int32), np.array([1.0, 5.0]), np.array([shared[0], "NEW_ITEM"]))
+    assert vector1.min_sum(missing) == min(1.0, leaves1[leaves1[:, 0] == shared[0]][0][1])
+
+def duplicated_bom(bom):
+    """
+    PROD900 repeats the lines of PROD000. PROD901 and PROD902 use different copies (M1 and M2) of the PROD001 module
+    """
+    copies = [["PROD900", comp, qty] for parent, comp, qty in bom if parent == "PROD000"]
+    for module in ["M1", "M2"]:
+        copies += [[module, comp, qty] for parent, comp, qty in bom if parent == "PROD001"]
+    copies += [["PROD901", "M1", 2.0], ["PROD902", "M2", 2.0]]
+    return np.concatenate([bom, np.array(copies, dtype=object)])
+
+def test_fingerprints(load_bom):
+    bom = duplicated_bom(load_bom.to_numpy())
+    cbom = compile_bom(bom)
+    codes = [cbom.code(sku) for sku in ["PROD000", "PROD900", "PROD901", "PROD902", "PROD001"]]
+    hashes = cbom.fingerprints()
+    assert hashes.shape == (len(cbom.skus), 2) and hashes.dtype == np.uint64
+    np.testing.assert_array_equal(compile_bom(bom).fingerprints(codes), hashes[codes])
+    assert len(np.unique(hashes, axis=0)) == len(hashes) - 4  # PROD900, M1, M2 and PROD902 repeat a structure
+
+    assert cbom.identical(codes[0], codes[1]) and cbom.identical(codes[2], codes[3])
+    assert not cbom.identical(codes[0], codes[4])
+    named = cbom.fingerprints(codes, names=True)
+    assert not np.array_equal(named[0], named[1]) and not np.array_equal(named[2], named[3])
+
+    # Line order is part of the fingerprint, an edit only rehashes the items above it
+    reordered = compile_bom(np.concatenate([bom[bom[:, 0] != "PROD900"], bom[bom[:, 0] == "PROD900"][::-1]]))
+    assert not reordered.identical(reordered.code("PROD000"), reordered.code("PROD900"))
+    unordered = reordered.fingerprints([reordered.code("PROD000"), reordered.code("PROD900")], ordered=False)
+    assert np.array_equal(unordered[0], unordered[1])
+    line = np.flatnonzero(bom[:, 0] == "M2")[0]
+    cbom.apply_changes([("set", "M2", bom[line, 1], 9.0)])
+    assert not cbom.identical(codes[2], codes[3])
+    np.testing.assert_array_equal(cbom.fingerprints(codes[:3]), hashes[codes[:3]])
+    bom[line, 2] = 9.0
+    np.testing.assert_array_equal(cbom.fingerprints(), compile_bom(bom).fingerprints())
+
+def test_ravisim_identical(load_bom):
+    bom = duplicated_bom(load_bom.to_numpy())
+    cbom = compile_bom(bom)
+    assert j_prdctsim.calc.ravisim("PROD901", "PROD902", cbom) == 1.0
+    for sku in ["PROD001", "PROD005", "PROD900"]:
+        assert j_prdctsim.calc.ravisim("PROD900", sku, cbom) == j_prdctsim.calc.ravisim("PROD000", sku, bom)
@@ -0,0 +1,107 @@
+import pytest
+from j_prdctsim.compiled import compile_bom
+import j_prdctsim.fileio
+from j_prdctsim.matrix import leaf_matrix
+import j_prdctsim.bom
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def bom_path():
+    return os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv")
+
+@pytest.fixture
+def load_bom(bom_path):
+    BomStructure = pd.read_csv(bom_path)
+    return BomStructure
+
+def test_read_bom_csv(bom_path, load_bom):
+    expected = compile_bom(load_bom.to_numpy())
+    for chunksize in (1000000, 50, 7):
+        cbom = j_prdctsim.fileio.read_bom_csv(bom_path, chunksize=chunksize)
+        np.testing.assert_array_equal(cbom.skus, expected.skus)
+        np.testing.assert_array_equal(cbom.offsets, expected.offsets)
+        np.testing.assert_array_equal(cbom.children, expected.children)
+        np.testing.assert_array_equal(cbom.qtys, expected.qtys)
+        assert cbom.children.dtype == np.int32 and cbom.qtys.dtype == np.float64
+
+def test_read_bom_csv_columns(tmp_path, load_bom):
+    """
+    Columns may be picked by name in any order, a BoM without QtyPers is read with QtyPers of 1
+    """
+    path = os.path.join(tmp_path, "bom.csv")
+    load_bom[["QtyPer", "Component", "Parent"]].to_csv(path, index=False)
+    cbom = j_prdctsim.fileio.read_bom_csv(path, chunksize=100, usecols=("Parent", "Component", "QtyPer"))
+    bom = load_bom.to_numpy()
+    assert j_prdctsim.bom.edges("PROD012", cbom) == j_prdctsim.bom.edges("PROD012", bom)
+    np.testing.assert_array_equal(
+        j_prdctsim.bom.leafcomponents_qp("PROD000", cbom), j_prdctsim.bom.leafcomponents_qp("PROD000", bom))
+
+    cbom = j_prdctsim.fileio.read_bom_csv(path, usecols=(2, 1))
+    assert (cbom.qtys == 1.0).all()
+    assert j_prdctsim.bom.components("PROD019", cbom) == j_prdctsim.bom.components("PROD019", bom)
+
+def test_save_load_bom(tmp_path, bom_path, load_bom):
+    bom = load_bom.to_numpy()
+    cbom = j_prdctsim.fileio.read_bom_csv(bom_path)
+    path = os.path.join(tmp_path, "bom.jpbom")
+    j_prdctsim.fileio.save_bom(cbom, path, source=bom_path)
+
+    loaded = j_prdctsim.fileio.load_bom(path, source=bom_path, expected_hash=cbom.content_hash(), verify=True)
+    assert isinstance(loaded.children, np.memmap) and not loaded.children.flags.writeable
+    np.testing.assert_array_equal(loaded.skus, cbom.skus)
+    np.testing.assert_array_equal(loaded.qtys, cbom.qtys)
+    assert j_prdctsim.bom.sku_usage("L2013", loaded) == j_prdctsim.bom.sku_usage("L2013", bom)
+    np.testing.assert_array_equal(
+        j_prdctsim.bom.leafcomponents_qp("PROD002", loaded), j_prdctsim.bom.leafcomponents_qp("PROD002", bom))
+
+def test_save_load_leaf_matrix(tmp_path, load_bom):
+    cbom = compile_bom(load_bom.to_numpy())
+    leaves = leaf_matrix(cbom, decimals=6)
+    path = os.path.join(tmp_path, "bom.jpbom")
+    j_prdctsim.fileio.save_bom(cbom, path, leaf_matrix=leaves)
+
+    loaded = j_prdctsim.fileio.load_bom(path)
+    total, row_skus, leaf_skus = leaf_matrix(loaded, decimals=6)
+    assert (total != leaves[0]).nnz == 0
+    np.testing.assert_array_equal(row_skus, leaves[1])
+    np.testing.assert_array_equal(leaf_skus, leaves[2])
+
+def test_load_bom_stale(tmp_path, load_bom):
+    source = os.path.join(tmp_path, "bom.csv")
+    path = os.path.join(tmp_path, "bom.jpbom")
+    load_bom.to_csv(source, index=False)
+    cbom = j_prdctsim.fileio.read_bom_csv(source)
+    j_prdctsim.fileio.save_bom(cbom, path, source=source)
+
+    load_bom.iloc[:10].to_csv(source, index=False)
+    with pytest.raises(ValueError):
+        j_prdctsim.fileio.load_bom(path, source=source)
+    with pytest.raises(ValueError):
+        j_prdctsim.fileio.load_bom(path, expected_hash=j_prdctsim.fileio.read_bom_csv(source).content_hash())
+    with open(path, "r+b") as f:
+        f.write(b"NOTABOM!")
+    with pytest.raises(ValueError):
+        j_prdctsim.fileio.load_bom(path)
+
+def test_share_attach_bom(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    leaves = leaf_matrix(cbom, decimals=6)
+    memory = j_prdctsim.fileio.share_bom(cbom, leaf_matrix=leaves)
+    try:
+        attached = j_prdctsim.fileio.attach_bom(memory.name)
+        assert attached.content_hash() == cbom.content_hash()
+        assert not attached.children.flags.writeable and not attached.leaf_matrix_cache[0].data.flags.writeable
+        np.testing.assert_array_equal(attached.skus, cbom.skus)
+        assert j_prdctsim.bom.sku_usage("L2013", attached) == j_prdctsim.bom.sku_usage("L2013", bom)
+        np.testing.assert_array_equal(
+            j_prdctsim.bom.leafcomponents_qp("PROD002", attached), j_prdctsim.bom.leafcomponents_qp("PROD002", bom))
+        assert (attached.leaf_matrix_cache[0] != leaves[0]).nnz == 0
+        np.testing.assert_array_equal(attached.leaf_matrix_cache[1], leaves[1])
+        del attached
+    finally:
+        memory.close()
+        memory.unlink()
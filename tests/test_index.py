@@ -0,0 +1,47 @@
+import pytest
+import j_prdctsim.calc
+from j_prdctsim.index import SimilarityIndex
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def test_index_query_matches_ravisim(load_bom, load_skus):
+    """
+    The top k products of a query are the k highest ravisim proportions over the catalog
+    """
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    index = SimilarityIndex(bom, skus)
+    for sku in list(skus) + ["L1025"]:
+        expected = sorted((j_prdctsim.calc.ravisim(sku, other, bom) for other in skus if other != sku), reverse=True)
+        for k in (1, 5, 20):
+            out_skus, proportions = index.query(sku, k=k)
+            assert len(proportions) <= k and list(proportions) == expected[:len(proportions)]
+            for other, proportion in zip(out_skus, proportions):
+                assert proportion == j_prdctsim.calc.ravisim(sku, other, bom)
+
+def test_index_min_score(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    index = SimilarityIndex(bom, load_skus.to_numpy().reshape(-1))
+    out_skus, proportions = index.query("PROD000", k=20, min_score=0.05)
+    assert (proportions >= 0.05).all()
+    assert "PROD000" not in out_skus
+    assert "PROD001" in out_skus  # ravisim of 0.11
+    for k in (0, -1):
+        with pytest.raises(ValueError):
+            index.query("PROD000", k=k)
+
+def test_index_sku_not_in_bom(load_bom):
+    index = SimilarityIndex(load_bom.to_numpy())
+    out_skus, proportions = index.query("SAMPLE_SKU")
+    assert len(out_skus) == 0 and len(proportions) == 0
@@ -0,0 +1,54 @@
+import pytest
+import j_prdctsim.calc
+import j_prdctsim.lsh
+from j_prdctsim.matrix import leaf_matrix
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def test_weighted_minhash_incremental(load_bom, load_skus):
+    """
+    A product's sketch only depends on its own leaf components, so sketching a subset gives the same rows
+    """
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+    sketches = j_prdctsim.lsh.weighted_minhash(total, leaf_skus, num_perm=64)
+    assert sketches.shape == (len(skus), 64) and sketches.dtype == np.uint64
+
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus[5:8], decimals=6)
+    np.testing.assert_array_equal(j_prdctsim.lsh.weighted_minhash(total, leaf_skus, num_perm=64), sketches[5:8])
+
+def test_weighted_minhash_estimates_ravisim(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = load_skus.to_numpy().reshape(-1)
+    total, row_skus, leaf_skus = leaf_matrix(bom, skus=skus, decimals=6)
+    sketches = j_prdctsim.lsh.weighted_minhash(total, leaf_skus, num_perm=512)
+    estimate = (sketches[:, None, :] == sketches[None, :, :]).mean(axis=-1)
+    expected = j_prdctsim.calc.ravisim_matrix(skus, bom)
+    assert np.abs(estimate - expected).mean() < 0.02
+
+def test_similar_pairs(load_bom):
+    bom = load_bom.to_numpy()
+    skus = np.array(sorted(set(bom[:, 0]) | set(bom[:, 1])))
+    expected = j_prdctsim.calc.ravisim_matrix(skus, bom)
+    rows1, rows2 = np.triu_indices(len(skus), 1)
+    above = expected[rows1, rows2] >= 0.3
+
+    skus1, skus2, proportions = j_prdctsim.lsh.similar_pairs(skus, bom, threshold=0.3)
+    assert (proportions >= 0.3).all()
+    assert set(zip(skus1, skus2)) <= set(zip(skus[rows1[above]], skus[rows2[above]]))
+    assert len(skus1) >= 0.9 * above.sum()
+    for sku1, sku2, proportion in zip(skus1, skus2, proportions):
+        assert proportion == j_prdctsim.calc.ravisim(sku1, sku2, bom)
@@ -0,0 +1,108 @@
+import pytest
+import j_prdctsim.bom
+import j_prdctsim.matrix
+from j_prdctsim.compiled import compile_bom
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def test_usage_matrix(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    A = j_prdctsim.matrix.usage_matrix(cbom)
+    assert A.shape == (len(cbom.skus), len(cbom.skus))
+    assert A[cbom.code("PROD000"), cbom.code("L1043")] == 2.25
+    assert np.isclose(A.sum(), bom[:, 2].astype(np.float64).sum())
+
+    # The compiled arrays keep Bill of Materials row order
+    comps = cbom.children_of(cbom.code("PROD000"))[0]
+    assert list(cbom.skus[comps]) == list(bom[bom[:, 0] == "PROD000"][:, 1])
+
+def test_leaf_matrix_products(load_bom, load_skus):
+    """
+    By default the rows are the top level items (products and unused L1 components) and each row matches leafcomponents_qp
+    """
+    bom = load_bom.to_numpy()
+    out, row_skus, leaf_skus = j_prdctsim.matrix.leaf_matrix(bom, decimals=6)
+    assert set(load_skus.to_numpy().reshape(-1)) <= set(row_skus)
+    assert not set(row_skus) & set(bom[:, 1])
+    assert out.shape == (len(row_skus), len(leaf_skus))
+    for i, prod in enumerate(row_skus):
+        row = out.getrow(i)
+        got = dict(zip(leaf_skus[row.indices], row.data))
+        expected = dict(j_prdctsim.bom.leafcomponents_qp(prod, bom))
+        assert got == expected, prod
+
+def test_leaf_matrix_leaves_and_missing(load_bom):
+    bom = load_bom.to_numpy()
+    out, row_skus, leaf_skus = j_prdctsim.matrix.leaf_matrix(bom, skus=["L2024", "NEW_ITEM", "L1025", 11111])
+    assert list(row_skus) == ["L2024", "NEW_ITEM", "L1025", "11111"]
+    assert list(leaf_skus[-2:]) == ["11111", "NEW_ITEM"]
+    dense = out.toarray()
+    assert dense[0, list(leaf_skus).index("L2024")] == 1.0 and dense[0].sum() == 1.0
+    assert dense[1, list(leaf_skus).index("NEW_ITEM")] == 1.0 and dense[1].sum() == 1.0
+    expected = dict(j_prdctsim.bom.leafcomponents_qp("L1025", bom))
+    assert {leaf_skus[j]: np.around(v, 6) for j, v in enumerate(dense[2]) if v} == expected
+
+def test_leaf_matrix_cycle():
+    bom = np.array([["A", "B", 1.0], ["B", "C", 2.0], ["C", "B", 1.0], ["C", "D", 1.0]], dtype=object)
+    with pytest.raises(ValueError):
+        j_prdctsim.matrix.leaf_matrix(bom, skus=["A"])
+
+def test_where_used(load_bom):
+    bom = load_bom.to_numpy()
+    skus = ["L2013", "L1004", "PROD000", "NEW_ITEM"]
+    out, row_skus, col_skus = j_prdctsim.matrix.where_used(skus, bom)
+    assert out.shape == (4, len(col_skus)) and out.dtype == bool
+    for i, sku in enumerate(skus):
+        assert sorted(col_skus[out.getrow(i).indices]) == sorted(j_prdctsim.bom.sku_usage(sku, bom))
+
+    out, row_skus, col_skus = j_prdctsim.matrix.where_used(skus, bom, top_level=True)
+    for i, sku in enumerate(skus[:3]):
+        assert list(col_skus[out.getrow(i).indices]) == j_prdctsim.bom.highestlevel_usage(sku, bom)
+    assert out.getrow(3).nnz == 0
+
+def test_leaf_matrix_duplicates(load_bom):
+    bom = load_bom.to_numpy()
+    copies = np.array([["PROD900", comp, qty] for parent, comp, qty in bom if parent == "PROD000"], dtype=object)
+    bom = np.concatenate([bom, copies])
+    skus = ["PROD900", "PROD001", "PROD000", "NEW_ITEM", "PROD900"]
+    out, row_skus, leaf_skus = j_prdctsim.matrix.leaf_matrix(bom, skus=skus, decimals=6)
+    assert list(row_skus) == skus
+    for i, sku in enumerate(skus):
+        row = out.getrow(i)
+        assert dict(zip(leaf_skus[row.indices], row.data)) == dict(j_prdctsim.bom.leafcomponents_qp(sku, bom)), sku
+
+def test_level_matrices(load_bom):
+    bom = load_bom.to_numpy()
+    compiled = compile_bom(bom)
+    skus = ["PROD000", "PROD007", "L1037", "NEW_ITEM"]
+    levels, leaves, row_skus, leaf_skus = j_prdctsim.matrix.level_matrices(bom, skus=skus, depth=2)
+    assert len(levels) == 2 and list(row_skus) == skus
+    expected, _, expected_leaves = j_prdctsim.matrix.leaf_matrix(bom, skus=skus, decimals=6)
+    assert list(leaf_skus) == list(expected_leaves) and (leaves != expected).nnz == 0
+
+    # Depth 1 holds the direct components, depth 2 their components
+    for i, sku in enumerate(skus[:3]):
+        direct = {comp: qty for parent, comp, qty in bom if parent == sku}
+        row = levels[0].getrow(i)
+        assert dict(zip(compiled.skus[row.indices], row.data)) == pytest.approx(direct)
+        below = {}
+        for comp, qty in direct.items():
+            for parent, child, child_qty in bom:
+                if parent == comp:
+                    below[child] = below.get(child, 0) + qty * child_qty
+        row = levels[1].getrow(i)
+        assert dict(zip(compiled.skus[row.indices], row.data)) == pytest.approx(below)
+    assert levels[0].getrow(3).nnz == 0
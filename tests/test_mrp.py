@@ -0,0 +1,65 @@
+import pytest
+import j_prdctsim.bom
+import j_prdctsim.mrp
+from j_prdctsim.profiling import Profile
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+@pytest.fixture
+def demand(load_skus):
+    skus = load_skus.to_numpy().reshape(-1)
+    rng = np.random.default_rng(0)
+    rows = rng.choice(skus, 200)
+    qtys = rng.integers(1, 50, 200).astype(float)
+    return np.column_stack([np.concatenate([rows, ["L2013", "NEW_ITEM"]]), np.concatenate([qtys, [3.0, 2.0]])])
+
+def expected_requirements(demand, bom):
+    out = {}
+    for sku, qty in demand:
+        for leaf, leaf_qty in j_prdctsim.bom.leafcomponents_qp(sku, bom, float(qty)):
+            out[leaf] = out.get(leaf, 0.0) + leaf_qty
+    return out
+
+def test_explode_demand(load_bom, demand):
+    bom = load_bom.to_numpy()
+    out = j_prdctsim.mrp.explode_demand(demand, bom)
+    expected = expected_requirements(demand, bom)
+    assert list(out[:, 0]) == sorted(expected)
+    np.testing.assert_allclose(out[:, 1].astype(float), [expected[leaf] for leaf in out[:, 0]], atol=1e-5)
+    assert out[list(out[:, 0]).index("NEW_ITEM"), 1] == 2.0
+
+def test_explode_demand_vector(load_bom, demand):
+    bom = load_bom.to_numpy()
+    out = j_prdctsim.mrp.explode_demand(demand[:, 1].astype(float), bom, skus=demand[:, 0])
+    np.testing.assert_array_equal(out, j_prdctsim.mrp.explode_demand(demand, bom))
+
+def test_explode_demand_stream(load_bom, demand):
+    bom = load_bom.to_numpy()
+    batches = (demand[start:start + 25] for start in range(0, len(demand), 25))
+    out = j_prdctsim.mrp.explode_demand_stream(batches, bom)
+    expected = j_prdctsim.mrp.explode_demand(demand, bom)
+    assert list(out[:, 0]) == list(expected[:, 0])
+    np.testing.assert_allclose(out[:, 1].astype(float), expected[:, 1].astype(float), atol=1e-9)
+    assert len(j_prdctsim.mrp.explode_demand_stream(iter([]), bom)) == 0
+
+    # Empty batches add nothing
+    batches = [[], demand[:25], np.empty((0, 2), dtype=object), demand[25:]]
+    np.testing.assert_array_equal(j_prdctsim.mrp.explode_demand_stream(iter(batches), bom), out)
+    assert len(j_prdctsim.mrp.explode_demand([], bom)) == 0
+
+    # Every product is exploded once, however many batches demand it
+    with Profile() as profile:
+        j_prdctsim.mrp.explode_demand_stream((demand[start:start + 25] for start in range(0, len(demand), 25)), bom)
+    assert profile.counters["explosions"] == len(set(demand[:, 0]) & set(bom[:, :2].reshape(-1)))
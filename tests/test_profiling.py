@@ -0,0 +1,49 @@
+import pytest
+import j_prdctsim.bom
+import j_prdctsim.calc
+from j_prdctsim.compiled import compile_bom
+from j_prdctsim.profiling import Profile, count, enabled, phase
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+def test_profile_counters(load_bom):
+    cbom = compile_bom(load_bom.to_numpy())
+    assert not enabled()
+    with Profile() as profile:
+        assert enabled()
+        j_prdctsim.calc.ravisim("PROD000", "PROD001", cbom)
+        j_prdctsim.calc.ravisim("PROD000", "PROD001", cbom)
+        out = j_prdctsim.bom.components("PROD002", cbom)
+    assert not enabled()
+
+    assert profile.counters["explosions"] == 2
+    assert profile.counters["similarity_cache_hits"] == 1
+    assert profile.counters["similarity_cache_misses"] == 1
+    assert profile.counters["leaf_cache_misses"] > 0
+    assert profile.counters["nodes_visited"] >= len(out)
+    assert profile.calls["explosion"] == 1 and profile.calls["overlap"] == 1
+    assert profile.timings["explosion"] > 0 and profile.elapsed >= profile.timings["explosion"]
+    assert "explosion" in profile.report()
+    assert profile.as_dict()["counters"]["explosions"] == 2
+
+def test_profile_nested():
+    with Profile() as outer:
+        count("events")
+        with Profile() as inner:
+            count("events", 2)
+            with phase("work"):
+                pass
+    assert outer.counters["events"] == 3 and inner.counters["events"] == 2
+    assert outer.calls["work"] == inner.calls["work"] == 1
+
+    # Nothing is recorded without an active profile
+    count("events")
+    with phase("work"):
+        pass
+    assert outer.counters["events"] == 3
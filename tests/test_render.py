@@ -0,0 +1,42 @@
+import pytest
+import j_prdctsim.render
+from j_prdctsim.compiled import compile_bom
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+def test_subtree_fingerprint(load_bom):
+    bom = load_bom.to_numpy()
+    cbom = compile_bom(bom)
+    fingerprint = j_prdctsim.render.subtree_fingerprint("PROD000", cbom)
+    assert fingerprint == j_prdctsim.render.subtree_fingerprint("PROD000", bom)
+    assert fingerprint != j_prdctsim.render.subtree_fingerprint("PROD001", cbom)
+    unchanged = j_prdctsim.render.subtree_fingerprint("PROD003", cbom)
+
+    # QtyPers are not drawn, structure is
+    cbom.apply_changes([("set", "PROD000", "L1043", 7.0)])
+    assert j_prdctsim.render.subtree_fingerprint("PROD000", cbom) == fingerprint
+    cbom.apply_changes([("add", "L1043", "L2099", 1.0)])
+    assert j_prdctsim.render.subtree_fingerprint("PROD000", cbom) != fingerprint
+    assert j_prdctsim.render.subtree_fingerprint("PROD003", cbom) == unchanged
+
+def test_plan_renders(load_bom, tmp_path):
+    bom = compile_bom(load_bom.to_numpy())
+    skus = ["PROD000", "PROD001", "PROD002"]
+    pending, entries = j_prdctsim.render.plan_renders(skus, bom, str(tmp_path))
+    assert pending == skus
+
+    # Images recorded in the manifest with the same fingerprint are skipped
+    for sku in ["PROD000", "PROD001"]:
+        open(os.path.join(str(tmp_path), entries[sku]["file"]), "w").close()
+    j_prdctsim.render.write_manifest({"images": entries}, str(tmp_path))
+    os.remove(os.path.join(str(tmp_path), entries["PROD001"]["file"]))
+    bom.apply_changes([("add", "PROD002", "L2099", 1.0)])
+    pending, entries = j_prdctsim.render.plan_renders(skus, bom, str(tmp_path))
+    assert pending == ["PROD001", "PROD002"]
+    assert j_prdctsim.render.read_manifest(str(tmp_path))["images"]["PROD000"] == entries["PROD000"]
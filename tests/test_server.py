@@ -0,0 +1,109 @@
+import pytest
+import asyncio
+import json
+import j_prdctsim.bom
+import j_prdctsim.calc
+from j_prdctsim.server import Batcher, SimilarityService, start_server
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+async def post(port, path, request, method="POST"):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(request).encode()
+    writer.write("{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {length}\r\nConnection: close\r\n\r\n".format(
+        method=method, path=path, length=len(body)).encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+def run_client(service, client):
+    async def main():
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await client(port)
+    return asyncio.run(main())
+
+def test_server_endpoints(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    service = SimilarityService(bom, skus=skus)
+
+    async def client(port):
+        return await asyncio.gather(
+            post(port, "/similarity", {"pairs": [["PROD000", "PROD001"], ["PROD002", "L1003"], ["NEW", "PROD000"]]}),
+            post(port, "/topk", {"sku": "PROD000", "k": 3}),
+            post(port, "/leaves", {"sku": "PROD000", "qty": 2}),
+            post(port, "/where_used", {"sku": "L2013", "top_level": True}),
+            post(port, "/health", {}, method="GET"),
+            post(port, "/unknown", {}),
+            post(port, "/leaves", {"qty": 2}))
+
+    similarity, topk, leaves, where_used, health, unknown, bad = run_client(service, client)
+    assert similarity == (200, {"proportions": [j_prdctsim.calc.ravisim(sku1, sku2, bom) for sku1, sku2 in
+                                                [("PROD000", "PROD001"), ("PROD002", "L1003"), ("NEW", "PROD000")]]})
+    assert topk[0] == 200 and len(topk[1]["skus"]) == 3
+    assert topk[1]["proportions"][0] == j_prdctsim.calc.ravisim("PROD000", topk[1]["skus"][0], bom)
+    expected = j_prdctsim.bom.leafcomponents_qp("PROD000", bom, 2)
+    assert leaves == (200, {"leaves": [[str(leaf), float(qty)] for leaf, qty in expected]})
+    assert where_used == (200, {"skus": j_prdctsim.bom.highestlevel_usage("L2013", bom)})
+    assert health[0] == 200 and health[1]["products"] == len(skus)
+    assert unknown[0] == 404 and bad[0] == 400
+
+def test_server_batches_concurrent_requests(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    service = SimilarityService(bom, skus=skus, delay=0.05)
+    pairs = [(sku1, sku2) for sku1 in skus[:10] for sku2 in skus[:10]]
+
+    async def client(port):
+        return await asyncio.gather(*[post(port, "/similarity", {"sku1": sku1, "sku2": sku2}) for sku1, sku2 in pairs])
+
+    responses = run_client(service, client)
+    assert [response[1]["proportions"][0] for response in responses] == \
+        [j_prdctsim.calc.ravisim(sku1, sku2, bom) for sku1, sku2 in pairs]
+    assert service.similarity_batcher.batches < len(pairs)
+
+def test_server_isolates_bad_requests(load_bom, load_skus):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    service = SimilarityService(bom, skus=skus, delay=0.05)
+
+    async def client(port):
+        return await asyncio.gather(
+            post(port, "/similarity", {"pairs": [["PROD000"]]}),
+            post(port, "/similarity", {"pairs": [["PROD000", "PROD001"]]}),
+            post(port, "/topk", {"sku": "PROD000", "k": 0}))
+
+    bad, good, topk = run_client(service, client)
+    assert bad[0] == 400 and topk[0] == 400
+    assert good == (200, {"proportions": [j_prdctsim.calc.ravisim("PROD000", "PROD001", bom)]})
+
+def test_batcher_isolates_failures():
+    from concurrent.futures import ThreadPoolExecutor
+
+    def function(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return [item.upper() for item in items]
+
+    async def main():
+        batcher = Batcher(function, ThreadPoolExecutor(max_workers=1), delay=0.05)
+        return await asyncio.gather(batcher.submit(["a", "b"]), batcher.submit(["bad"]), batcher.submit(["c"]),
+                                    return_exceptions=True), batcher.batches
+
+    (first, failed, last), batches = asyncio.run(main())
+    assert batches == 1 and first == ["A", "B"] and last == ["C"] and isinstance(failed, ValueError)
@@ -0,0 +1,39 @@
+import pytest
+import j_prdctsim.bom
+from j_prdctsim.compiled import BomCycleError, compile_bom
+from j_prdctsim.synthetic import synthetic_bom
+import numpy as np
+
+
+def test_synthetic_bom_shape():
+    bom, products = synthetic_bom(products=30, depth=3, fanout=(2, 5), sharing=0.5, seed=1)
+    assert bom.shape[1] == 3 and len(products) == 30
+    assert list(products[:2]) == ["PROD000", "PROD001"]
+    cbom = compile_bom(bom)
+    levels = cbom.low_level_codes()
+    assert levels.max() == 3
+    assert all(levels[cbom.code(sku)] == 0 for sku in products)
+
+    # Every generated component is used by a product
+    used = set(j_prdctsim.bom.components(products[0], cbom))
+    for sku in products[1:]:
+        used.update(j_prdctsim.bom.components(sku, cbom))
+    assert used == set(bom[:, 1])
+
+def test_synthetic_bom_sharing():
+    tree, _ = synthetic_bom(products=50, depth=2, sharing=0.0, seed=2)
+    assert len(set(tree[:, 1])) == len(tree)
+    shared, _ = synthetic_bom(products=50, depth=2, sharing=0.9, seed=2)
+    assert len(set(shared[:, 1])) < 0.2 * len(shared)
+
+def test_synthetic_bom_reproducible():
+    bom1, _ = synthetic_bom(products=40, depth=3, skip=0.2, seed=3)
+    bom2, _ = synthetic_bom(products=40, depth=3, skip=0.2, seed=3)
+    np.testing.assert_array_equal(bom1, bom2)
+    cbom, _ = synthetic_bom(products=40, depth=3, skip=0.2, seed=3, compiled=True)
+    assert cbom.content_hash() == compile_bom(bom1).content_hash()
+
+def test_synthetic_bom_cycles():
+    bom, products = synthetic_bom(products=40, depth=3, cycles=2, seed=4)
+    with pytest.raises(BomCycleError):
+        compile_bom(bom).low_level_codes()
@@ -0,0 +1,91 @@
+import pytest
+import j_prdctsim.tiles
+import j_prdctsim.cli
+from j_prdctsim.calc import ravisim_matrix
+import numpy as np
+import pandas as pd
+import os
+
+
+@pytest.fixture
+def load_bom():
+    BomStructure = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv"))
+    return BomStructure
+
+@pytest.fixture
+def load_skus():
+    ProductSKUs = pd.read_csv(os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv"))
+    return ProductSKUs
+
+def test_ravisim_tiles_dense(load_bom, load_skus, tmp_path):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1)) + ["L1037", "NEW_ITEM"]
+    expected = ravisim_matrix(skus, bom)
+    path = str(tmp_path)
+    assert j_prdctsim.tiles.ravisim_tiles(skus, bom, path, tile_size=5, verbose=0) == 15
+    matrix, row_skus = j_prdctsim.tiles.read_tiles(path)
+    assert list(row_skus) == skus and matrix.dtype == np.uint8
+    assert np.array_equal(matrix / 100, expected)
+
+    # An interrupted job leaves some tiles in the log and one cut off line, a rerun only computes the others
+    log_path = os.path.join(path, j_prdctsim.tiles.LOG_NAME)
+    with open(log_path) as f:
+        lines = f.readlines()
+    with open(log_path, "w") as f:
+        f.writelines(lines[:9] + [lines[9][:2]])
+    matrix = np.load(os.path.join(path, j_prdctsim.tiles.MATRIX_NAME), mmap_mode="r+")
+    matrix[15:20, 15:20] = 0  # The tiles that are not in the log: (3, 3) and the last column block
+    matrix[20:, :] = 0
+    matrix[:, 20:] = 0
+    matrix.flush()
+    del matrix
+    with pytest.raises(ValueError):
+        j_prdctsim.tiles.read_tiles(path)
+    assert j_prdctsim.tiles.ravisim_tiles(skus, bom, path, tile_size=5, verbose=0) == 6
+    assert np.array_equal(j_prdctsim.tiles.read_tiles(path)[0] / 100, expected)
+    assert j_prdctsim.tiles.ravisim_tiles(skus, bom, path, tile_size=5, verbose=0) == 0
+
+    # A different job can not resume this one
+    with pytest.raises(ValueError):
+        j_prdctsim.tiles.ravisim_tiles(skus[:-1], bom, path, tile_size=5, verbose=0)
+
+def test_ravisim_tiles_sparse(load_bom, load_skus, tmp_path):
+    bom = load_bom.to_numpy()
+    skus = list(load_skus.to_numpy().reshape(-1))
+    expected = ravisim_matrix(skus, bom)
+    j_prdctsim.tiles.ravisim_tiles(skus, bom, str(tmp_path), tile_size=4, threshold=0.1, workers=2, verbose=0)
+    matrix, row_skus = j_prdctsim.tiles.read_tiles(str(tmp_path))
+    assert matrix.shape == (len(skus), len(skus))
+    assert np.array_equal(matrix.toarray() / 100, np.where(expected >= 0.1, expected, 0.0))
+
+    # A worker killed before renaming its tile into place leaves a temporary copy that is never read
+    tile_dir = os.path.join(str(tmp_path), j_prdctsim.tiles.TILE_DIR)
+    stale = os.path.join(tile_dir, "0_0.npz.999.tmp")
+    with open(os.path.join(tile_dir, "0_0.npz"), "rb") as f, open(stale, "wb") as copy:
+        copy.write(f.read())
+    assert np.array_equal(j_prdctsim.tiles.read_tiles(str(tmp_path))[0].toarray() / 100,
+                          np.where(expected >= 0.1, expected, 0.0))
+
+    # Reading leaves a cut off log line alone, resuming removes it and the temporary copy
+    log_path = os.path.join(str(tmp_path), j_prdctsim.tiles.LOG_NAME)
+    with open(log_path, "a") as f:
+        f.write("0")
+    with open(log_path, "rb") as f:
+        log = f.read()
+    j_prdctsim.tiles.read_tiles(str(tmp_path))
+    with open(log_path, "rb") as f:
+        assert f.read() == log
+    assert j_prdctsim.tiles.ravisim_tiles(skus, bom, str(tmp_path), tile_size=4, threshold=0.1, verbose=0) == 0
+    with open(log_path, "rb") as f:
+        assert f.read() == log[:-1]
+    assert not os.path.exists(stale)
+
+def test_matrix_command(load_bom, load_skus, tmp_path):
+    bom_path = os.path.join(os.getcwd(), "data", "test_data", "test_BomStructure.csv")
+    skus_path = os.path.join(os.getcwd(), "data", "test_data", "test_ProductSKUs.csv")
+    out_path = os.path.join(str(tmp_path), "matrix")
+    assert j_prdctsim.cli.main(["matrix", "--bom", bom_path, "--skus", skus_path, "--out", out_path,
+                                "--workers", "1", "--tile-size", "8", "--quiet"]) == 0
+    matrix, row_skus = j_prdctsim.tiles.read_tiles(out_path)
+    assert list(row_skus) == list(load_skus.to_numpy().reshape(-1))
+    assert np.array_equal(matrix / 100, ravisim_matrix(row_skus, load_bom.to_numpy()))